@@ -4,6 +4,9 @@ export interface AutomationRequest {
   action: string
   target: string
   parameters: Record<string, any>
+  confirm_risky?: boolean
+  // Token from a requires_confirmation response; reusable for the same actions until it expires
+  confirmation_token?: string
 }
 
 export interface AutomationResponse {
@@ -11,6 +14,29 @@ export interface AutomationResponse {
   result?: Record<string, any>
   error?: string
   execution_time?: number
+  requires_confirmation?: boolean
+  confirmation_message?: string
+  confirmation_token?: string
+}
+
+export interface BatchAutomationOptions {
+  mode?: "parallel" | "sequential"
+  concurrency?: number
+  stopOnError?: boolean
+  confirmationToken?: string
+}
+
+export interface BatchItemResult extends AutomationResponse {
+  index: number
+  skipped: boolean
+}
+
+export interface BatchAutomationResponse {
+  success: boolean
+  results: BatchItemResult[]
+  succeeded: number
+  failed: number
+  execution_time: number
 }
 
 const PYTHON_SERVER_URL = "http://localhost:8000"
@@ -52,6 +78,35 @@ export async function executeAutomation(request: AutomationRequest): Promise<Aut
   }
 }
 
+export async function executeAutomationBatch(
+  requests: AutomationRequest[],
+  options: BatchAutomationOptions = {},
+): Promise<BatchAutomationResponse> {
+  try {
+    const response = await fetch(`${PYTHON_SERVER_URL}/automate/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        requests,
+        mode: options.mode ?? "parallel",
+        concurrency: options.concurrency ?? 4,
+        stop_on_error: options.stopOnError ?? false,
+        confirmation_token: options.confirmationToken,
+      }),
+    })
+
+    if (!response.ok) {
+      const errorText = await response.text()
+      throw new Error(`Server returned ${response.status}: ${errorText}`)
+    }
+
+    return await response.json()
+  } catch (error) {
+    console.error("Error executing automation batch:", error)
+    throw error
+  }
+}
+
 export async function executeAsyncAutomation(request: AutomationRequest): Promise<string> {
   try {
     const response = await fetch(`${PYTHON_SERVER_URL}/automate/async`, {
@@ -73,9 +128,47 @@ export async function executeAsyncAutomation(request: AutomationRequest): Promis
   }
 }
 
+// Last response per task, revalidated with If-None-Match so unchanged polls return 304 without a body
+const taskStatusCache = new Map<string, { etag: string; body: Record<string, any> }>()
+
 export async function getTaskStatus(taskId: string): Promise<Record<string, any>> {
   try {
+    const cached = taskStatusCache.get(taskId)
+    const headers: Record<string, string> = { "Content-Type": "application/json" }
+    if (cached) {
+      headers["If-None-Match"] = cached.etag
+    }
+
     const response = await fetch(`${PYTHON_SERVER_URL}/tasks/${taskId}`, {
+      method: "GET",
+      headers,
+    })
+
+    if (response.status === 304 && cached) {
+      return cached.body
+    }
+
+    if (!response.ok) {
+      const errorText = await response.text()
+      throw new Error(`Server returned ${response.status}: ${errorText}`)
+    }
+
+    const body = await response.json()
+    const etag = response.headers.get("ETag")
+    if (etag) {
+      taskStatusCache.set(taskId, { etag, body })
+    }
+    return body
+  } catch (error) {
+    console.error(`Error getting task status for ${taskId}:`, error)
+    throw error
+  }
+}
+
+// Resolves when the task finishes, or with its current state after timeoutSeconds
+export async function waitForTask(taskId: string, timeoutSeconds = 30): Promise<Record<string, any>> {
+  try {
+    const response = await fetch(`${PYTHON_SERVER_URL}/tasks/${taskId}/wait?timeout=${timeoutSeconds}`, {
       method: "GET",
       headers: { "Content-Type": "application/json" },
     })
@@ -87,7 +180,7 @@ export async function getTaskStatus(taskId: string): Promise<Record<string, any>
 
     return await response.json()
   } catch (error) {
-    console.error(`Error getting task status for ${taskId}:`, error)
+    console.error(`Error waiting for task ${taskId}:`, error)
     throw error
   }
 }
@@ -17,20 +17,11 @@ async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, An
     """Route to the appropriate browser automation function based on the action"""
     logger.info(f"Handling browser action: {action}")
     
-    action_map = {
-        "open": open_browser,
-        "navigate": navigate_to_url,
-        "search": search_web,
-        "fill_form": fill_form,
-        "click": click_element,
-        "screenshot": take_screenshot,
-        "extract": extract_data
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported browser action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
 async def open_browser(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Open a web browser"""
@@ -263,3 +254,14 @@ async def extract_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "items_count": len(data),
         "data": data
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "open": open_browser,
+    "navigate": navigate_to_url,
+    "search": search_web,
+    "fill_form": fill_form,
+    "click": click_element,
+    "screenshot": take_screenshot,
+    "extract": extract_data
+}
@@ -17,20 +17,11 @@ async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, An
     """Route to the appropriate clipboard/screenshot automation function based on the action"""
     logger.info(f"Handling clipboard/screenshot action: {action}")
     
-    action_map = {
-        "copy_text": copy_text_to_clipboard,
-        "paste_text": paste_text_from_clipboard,
-        "get_clipboard": get_clipboard_content,
-        "take_screenshot": take_screenshot,
-        "take_region_screenshot": take_region_screenshot,
-        "capture_active_window": capture_active_window,
-        "save_clipboard_image": save_clipboard_image
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported clipboard/screenshot action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
 async def copy_text_to_clipboard(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Copy text to the clipboard"""
@@ -286,3 +277,14 @@ async def save_clipboard_image(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "preview": img_base64,
         "timestamp": datetime.now().isoformat()
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "copy_text": copy_text_to_clipboard,
+    "paste_text": paste_text_from_clipboard,
+    "get_clipboard": get_clipboard_content,
+    "take_screenshot": take_screenshot,
+    "take_region_screenshot": take_region_screenshot,
+    "capture_active_window": capture_active_window,
+    "save_clipboard_image": save_clipboard_image
+}
@@ -1,16 +1,23 @@
 import asyncio
 import logging
 from typing import Dict, Any
-import imaplib
-import smtplib
-import email
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.header import decode_header
 import re
 import os
 from datetime import datetime, timedelta
 
+# In a real implementation, we would use (imported inside the handlers so the
+# mail stack is only loaded when an email action actually runs):
+# import imaplib
+# import smtplib
+# import email
+# from email.mime.text import MIMEText
+# from email.mime.multipart import MIMEMultipart
+# from email.header import decode_header
+# from utils.executors import run_io
+
+from utils.result_cache import cacheable, invalidates
+from utils.single_flight import coalescible
+
 logger = logging.getLogger("email-automation")
 
 # Email configuration - in production, use environment variables or secure storage
@@ -26,21 +33,14 @@ async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, An
     """Route to the appropriate email automation function based on the action"""
     logger.info(f"Handling email action: {action}")
     
-    action_map = {
-        "summarize": summarize_emails,
-        "compose": compose_email,
-        "send": send_email,
-        "search": search_emails,
-        "mark_read": mark_emails_read,
-        "move": move_emails,
-        "delete": delete_emails
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported email action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
+@coalescible
+@cacheable(ttl=30)
 async def summarize_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Summarize emails from inbox or specified folder"""
     folder = parameters.get("folder", "INBOX")
@@ -75,14 +75,18 @@ async def summarize_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         }
     ]
     
-    # In a real implementation, we would connect to the email server:
-    # mail = imaplib.IMAP4_SSL(EMAIL_CONFIG["imap_server"])
-    # mail.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
-    # mail.select(folder)
-    # date_since = (datetime.now() - timedelta(days=days)).strftime("%d-%b-%Y")
-    # result, data = mail.search(None, f'(SINCE {date_since})')
-    # email_ids = data[0].split()
-    # Then process the emails...
+    # In a real implementation, we would connect to the email server. imaplib
+    # blocks on every round trip, so the session runs in the I/O thread pool:
+    # def fetch_recent():
+    #     import imaplib
+    #     mail = imaplib.IMAP4_SSL(EMAIL_CONFIG["imap_server"])
+    #     mail.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
+    #     mail.select(folder)
+    #     date_since = (datetime.now() - timedelta(days=days)).strftime("%d-%b-%Y")
+    #     result, data = mail.search(None, f'(SINCE {date_since})')
+    #     email_ids = data[0].split()
+    #     Then process the emails...
+    # emails = await run_io(fetch_recent)
     
     return {
         "summary": f"You have {len(emails)} recent emails in {folder}",
@@ -116,18 +120,24 @@ async def send_email(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not to or not subject or not body:
         raise ValueError("Missing required parameters: to, subject, and body are required")
     
-    # In a real implementation, we would send the email:
-    # msg = MIMEMultipart()
-    # msg["From"] = EMAIL_CONFIG["username"]
-    # msg["To"] = to
-    # msg["Subject"] = subject
-    # msg.attach(MIMEText(body, "plain"))
-    # 
-    # server = smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"])
-    # server.starttls()
-    # server.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
-    # server.send_message(msg)
-    # server.quit()
+    # In a real implementation, we would send the email from the I/O thread pool:
+    # def deliver():
+    #     import smtplib
+    #     from email.mime.text import MIMEText
+    #     from email.mime.multipart import MIMEMultipart
+    #
+    #     msg = MIMEMultipart()
+    #     msg["From"] = EMAIL_CONFIG["username"]
+    #     msg["To"] = to
+    #     msg["Subject"] = subject
+    #     msg.attach(MIMEText(body, "plain"))
+    #
+    #     server = smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"])
+    #     server.starttls()
+    #     server.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
+    #     server.send_message(msg)
+    #     server.quit()
+    # await run_io(deliver)
     
     # Simulate sending delay
     await asyncio.sleep(1)
@@ -139,6 +149,8 @@ async def send_email(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "timestamp": datetime.now().isoformat()
     }
 
+@coalescible
+@cacheable(ttl=30)
 async def search_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Search for emails matching criteria"""
     query = parameters.get("query", "")
@@ -174,6 +186,7 @@ async def search_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "results": results[:limit]
     }
 
+@invalidates("summarize", "search")
 async def mark_emails_read(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Mark emails as read"""
     email_ids = parameters.get("email_ids", [])
@@ -189,6 +202,7 @@ async def mark_emails_read(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "email_ids": email_ids
     }
 
+@invalidates("summarize", "search")
 async def move_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Move emails to a different folder"""
     email_ids = parameters.get("email_ids", [])
@@ -206,6 +220,7 @@ async def move_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "destination": destination
     }
 
+@invalidates("summarize", "search")
 async def delete_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Delete emails"""
     email_ids = parameters.get("email_ids", [])
@@ -220,3 +235,14 @@ async def delete_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "deleted": len(email_ids),
         "email_ids": email_ids
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "summarize": summarize_emails,
+    "compose": compose_email,
+    "send": send_email,
+    "search": search_emails,
+    "mark_read": mark_emails_read,
+    "move": move_emails,
+    "delete": delete_emails
+}
@@ -11,24 +11,20 @@ logger = logging.getLogger("excel-automation")
 # import openpyxl
 # import pandas as pd
 # import win32com.client
+# from utils.executors import run_io
+
+from utils.result_cache import cacheable, invalidates, path_scope
+from utils.single_flight import coalescible
 
 async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Route to the appropriate Excel automation function based on the action"""
     logger.info(f"Handling Excel action: {action}")
     
-    action_map = {
-        "open": open_workbook,
-        "read": read_data,
-        "write": write_data,
-        "create_chart": create_chart,
-        "run_macro": run_macro,
-        "export": export_data
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported Excel action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
 async def open_workbook(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Open an Excel workbook"""
@@ -51,6 +47,8 @@ async def open_workbook(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "sheets": ["Sheet1", "Sheet2", "Data"]
     }
 
+@coalescible
+@cacheable(ttl=5, scope=path_scope("file_path"))
 async def read_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Read data from an Excel workbook"""
     file_path = parameters.get("file_path", "")
@@ -60,12 +58,15 @@ async def read_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not file_path:
         raise ValueError("Missing required parameter: file_path")
     
-    # In a real implementation:
-    # wb = openpyxl.load_workbook(file_path)
-    # ws = wb[sheet]
-    # data = []
-    # for row in ws[range_str]:
-    #     data.append([cell.value for cell in row])
+    # In a real implementation (blocking I/O, so it runs in the thread pool):
+    # def read_range():
+    #     wb = openpyxl.load_workbook(file_path)
+    #     ws = wb[sheet]
+    #     data = []
+    #     for row in ws[range_str]:
+    #         data.append([cell.value for cell in row])
+    #     return data
+    # data = await run_io(read_range)
     
     # Simulate reading data
     data = [
@@ -84,6 +85,7 @@ async def read_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "columns": len(data[0]) if data else 0
     }
 
+@invalidates("read", scope=path_scope("file_path"))
 async def write_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Write data to an Excel workbook"""
     file_path = parameters.get("file_path", "")
@@ -94,15 +96,17 @@ async def write_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not file_path or not data:
         raise ValueError("Missing required parameters: file_path and data")
     
-    # In a real implementation:
-    # wb = openpyxl.load_workbook(file_path)
-    # ws = wb[sheet]
-    # for i, row in enumerate(data):
-    #     for j, value in enumerate(row):
-    #         col = openpyxl.utils.get_column_letter(j + 1)
-    #         row_num = i + 1
-    #         ws[f"{col}{row_num}"] = value
-    # wb.save(file_path)
+    # In a real implementation (blocking I/O, so it runs in the thread pool):
+    # def write_range():
+    #     wb = openpyxl.load_workbook(file_path)
+    #     ws = wb[sheet]
+    #     for i, row in enumerate(data):
+    #         for j, value in enumerate(row):
+    #             col = openpyxl.utils.get_column_letter(j + 1)
+    #             row_num = i + 1
+    #             ws[f"{col}{row_num}"] = value
+    #     wb.save(file_path)
+    # await run_io(write_range)
     
     # Simulate writing delay
     await asyncio.sleep(1)
@@ -116,6 +120,7 @@ async def write_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "columns_written": len(data[0]) if data else 0
     }
 
+@invalidates("read", scope=path_scope("file_path"))
 async def create_chart(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Create a chart in an Excel workbook"""
     file_path = parameters.get("file_path", "")
@@ -147,6 +152,7 @@ async def create_chart(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "title": title
     }
 
+@invalidates("read", scope=path_scope("file_path"))
 async def run_macro(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Run a macro in an Excel workbook"""
     file_path = parameters.get("file_path", "")
@@ -206,3 +212,13 @@ async def export_data(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "format": format,
         "output_path": output_path
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "open": open_workbook,
+    "read": read_data,
+    "write": write_data,
+    "create_chart": create_chart,
+    "run_macro": run_macro,
+    "export": export_data
+}
@@ -4,127 +4,143 @@ from typing import Dict, Any, List
 import json
 import os
 import shutil
+import sys
 from datetime import datetime
 
+from utils.content_search import ContentQuery, search_content
+from utils.executors import run_io
+from utils.file_index import get_file_index
+from utils.trigram_index import get_trigram_index
+from utils.file_transfer import run_transfers
+from utils.fs_walk import WalkFilter, cursor_source, list_page
+from utils.result_cache import cacheable, invalidates, path_scope
+from utils.single_flight import coalescible
+
+# Files returned per list_files page unless "limit" asks for another size
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+# Files searched concurrently by a content search
+CONTENT_SEARCH_SHARDS = 8
+# Files copied or moved concurrently
+TRANSFER_WORKERS = 8
+
 logger = logging.getLogger("file-automation")
 
 async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Route to the appropriate file automation function based on the action"""
     logger.info(f"Handling file action: {action}")
     
-    action_map = {
-        "list_files": list_files,
-        "search_files": search_files,
-        "organize_files": organize_files,
-        "rename_files": rename_files,
-        "move_files": move_files,
-        "copy_files": copy_files,
-        "delete_files": delete_files,
-        "read_file": read_file,
-        "write_file": write_file
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported file action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
+
+async def _matching_files(directory: str, file_pattern: str) -> List[Dict[str, Any]]:
+    """Files directly in a directory whose name matches a glob (with the platform's case rules)"""
+    walk_filter = WalkFilter(glob=file_pattern, case_sensitive=os.path.normcase("A") == "A")
+    page = await run_io(list_page, directory, False, walk_filter, None, sys.maxsize, sys.maxsize)
+    return page["files"]
 
+@coalescible
+@cacheable(ttl=5, scope=path_scope("directory"))
 async def list_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """List files in a directory"""
+    """
+    List files in a directory, one page at a time.
+
+    Filters are applied during the walk, so only matching files are stat'ed
+    into the result; pass the returned next_cursor back as "cursor" to get
+    the following page (it is None after the last one). Directories under an
+    indexed root are answered from the file index instead of the disk.
+    """
     directory = parameters.get("directory", ".")
     recursive = parameters.get("recursive", False)
     file_types = parameters.get("file_types", [])  # e.g., [".txt", ".pdf"]
-    
-    # In a real implementation:
-    # if recursive:
-    #     all_files = []
-    #     for root, dirs, files in os.walk(directory):
-    #         for file in files:
-    #             if not file_types or os.path.splitext(file)[1].lower() in file_types:
-    #                 all_files.append(os.path.join(root, file))
-    # else:
-    #     all_files = [
-    #         os.path.join(directory, f) for f in os.listdir(directory)
-    #         if os.path.isfile(os.path.join(directory, f)) and
-    #         (not file_types or os.path.splitext(f)[1].lower() in file_types)
-    #     ]
-    
-    # Simulate file listing
-    await asyncio.sleep(0.8)
-    
-    # Simulate file list
-    all_files = [
-        {"name": "document1.pdf", "path": os.path.join(directory, "document1.pdf"), "size": 1024000, "modified": "2023-04-10T14:30:00"},
-        {"name": "spreadsheet.xlsx", "path": os.path.join(directory, "spreadsheet.xlsx"), "size": 512000, "modified": "2023-04-15T09:45:00"},
-        {"name": "presentation.pptx", "path": os.path.join(directory, "presentation.pptx"), "size": 2048000, "modified": "2023-04-18T16:20:00"}
-    ]
-    
-    # Filter by file types if specified
-    if file_types:
-        all_files = [f for f in all_files if os.path.splitext(f["name"])[1].lower() in file_types]
-    
-    return {
-        "directory": directory,
-        "recursive": recursive,
-        "file_types": file_types,
-        "file_count": len(all_files),
-        "files": all_files
-    }
+    limit = max(1, min(int(parameters.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+
+    walk_filter = WalkFilter(
+        file_types=file_types,
+        glob=parameters.get("pattern"),
+        min_size=parameters.get("min_size"),
+        max_size=parameters.get("max_size"),
+        modified_after=parameters.get("modified_after"),
+        modified_before=parameters.get("modified_before"),
+        include_hidden=parameters.get("include_hidden", True)
+    )
+    cursor = parameters.get("cursor")
+    index = get_file_index()
+    # A listing stays with the source that issued its cursor
+    use_index = cursor_source(cursor) == "index" if cursor else index is not None and index.covers(directory)
+    if use_index:
+        if index is None or not index.covers(directory):
+            raise ValueError("Cursor expired: the file index is no longer available, restart the listing")
+        page = await run_io(index.page, directory, recursive, walk_filter, cursor, limit)
+    else:
+        page = await run_io(list_page, directory, recursive, walk_filter, cursor, limit)
+    page["file_types"] = file_types
+    return page
 
+@coalescible
+@cacheable(ttl=5, scope=path_scope("directory"))
 async def search_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Search for files matching criteria"""
+    """
+    Search for files by name and, with content_search, by content.
+
+    The pattern is a filename glob; for content it is a literal (or a regex
+    with "regex": true). Content matches report each matching line with its
+    line number and context_lines lines around it, and stop after
+    max_results lines.
+    """
     directory = parameters.get("directory", ".")
     pattern = parameters.get("pattern", "")
     content_search = parameters.get("content_search", False)
     case_sensitive = parameters.get("case_sensitive", False)
+    max_results = int(parameters.get("max_results", 1000))
     
     if not pattern:
         raise ValueError("Missing required parameter: pattern")
     
-    # In a real implementation:
-    # import re
-    # import fnmatch
-    # 
-    # matches = []
-    # for root, dirs, files in os.walk(directory):
-    #     for filename in files:
-    #         filepath = os.path.join(root, filename)
-    #         
-    #         # Check filename match
-    #         filename_match = False
-    #         if case_sensitive:
-    #             filename_match = fnmatch.fnmatch(filename, pattern)
-    #         else:
-    #             filename_match = fnmatch.fnmatch(filename.lower(), pattern.lower())
-    #         
-    #         # Check content match if requested
-    #         content_match = False
-    #         if content_search and os.path.isfile(filepath):
-    #             try:
-    #                 with open(filepath, 'r', errors='ignore') as f:
-    #                     content = f.read()
-    #                     if case_sensitive:
-    #                         content_match = pattern in content
-    #                     else:
-    #                         content_match = pattern.lower() in content.lower()
-    #             except:
-    #                 pass
-    #         
-    #         if filename_match or content_match:
-    #             matches.append({
-    #                 "name": filename,
-    #                 "path": filepath,
-    #                 "match_type": "filename" if filename_match else "content"
-    #             })
-    
-    # Simulate file search
-    await asyncio.sleep(1.5)
-    
-    # Simulate search results
-    matches = [
-        {"name": "report2023.pdf", "path": os.path.join(directory, "reports", "report2023.pdf"), "match_type": "filename"},
-        {"name": "notes.txt", "path": os.path.join(directory, "notes.txt"), "match_type": "content"}
-    ]
+    # Filename matches come from the file index when the directory is under
+    # an indexed root, otherwise from a walk of the tree
+    walk_filter = WalkFilter(glob=pattern, case_sensitive=case_sensitive)
+    index = get_file_index()
+    if index is not None and index.covers(directory):
+        found = await run_io(index.list, directory, True, walk_filter, None, max_results)
+    else:
+        found = (await run_io(list_page, directory, True, walk_filter, None, max_results, sys.maxsize))["files"]
+    matches = [{"name": f["name"], "path": f["path"], "match_type": "filename"} for f in found]
+
+    search_stats = None
+    if content_search:
+        regex = parameters.get("regex", False)
+        query = ContentQuery(
+            pattern,
+            regex=regex,
+            case_sensitive=case_sensitive,
+            context_lines=int(parameters.get("context_lines", 1))
+        )
+        candidate_filter = WalkFilter(file_types=parameters.get("file_types", []))
+        content_index = get_trigram_index()
+        narrowed = None
+        if content_index is not None and content_index.covers(directory):
+            # Only files holding every trigram the pattern requires can match
+            narrowed = await run_io(content_index.candidates, directory, pattern, regex)
+        if narrowed is not None:
+            candidates = [{"path": path} for path in narrowed if candidate_filter.matches_name(os.path.basename(path), path)]
+        elif index is not None and index.covers(directory):
+            candidates = await run_io(index.list, directory, True, candidate_filter, None, sys.maxsize)
+        else:
+            candidates = (await run_io(list_page, directory, True, candidate_filter, None, sys.maxsize, sys.maxsize))["files"]
+        matched_paths = {m["path"] for m in matches}
+        paths = [f["path"] for f in candidates if f["path"] not in matched_paths]
+
+        found = await search_content(query, paths, max_results, CONTENT_SEARCH_SHARDS)
+        matches.extend(
+            {"name": os.path.basename(f["path"]), "path": f["path"], "match_type": "content", "lines": f["lines"]}
+            for f in found["files"]
+        )
+        search_stats = {key: value for key, value in found.items() if key != "files"}
+        search_stats["indexed"] = narrowed is not None
     
     return {
         "directory": directory,
@@ -132,88 +148,77 @@ async def search_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "content_search": content_search,
         "case_sensitive": case_sensitive,
         "matches_count": len(matches),
-        "matches": matches
+        "matches": matches,
+        "content_stats": search_stats
     }
 
+@invalidates(scope=path_scope("source_directory", "destination_directory"))
 async def organize_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Organize files into folders based on criteria"""
+    """
+    Organize files into folders based on criteria.
+
+    Files are moved (a rename on the same filesystem) unless "operation" is
+    "copy".
+    """
     source_directory = parameters.get("source_directory", ".")
     organize_by = parameters.get("organize_by", "extension")  # extension, date, name, size
     destination_directory = parameters.get("destination_directory", "")
+    operation = parameters.get("operation", "move")
     
     if not destination_directory:
         destination_directory = os.path.join(source_directory, "Organized")
+    if organize_by not in ("extension", "date", "name", "size"):
+        raise ValueError(f"Unsupported organize_by value: {organize_by}")
+    
+    def category(entry: Dict[str, Any]) -> str:
+        filename = entry["name"]
+        if organize_by == "extension":
+            ext = os.path.splitext(filename)[1].lower()
+            return ext[1:] if ext else "no_extension"
+        if organize_by == "date":
+            # "modified" is local time in ISO format, so its date part is the day
+            return entry["modified"][:10]
+        if organize_by == "name":
+            return filename[0].upper() if filename else "Other"
+        if entry["size"] < 1024 * 1024:
+            return "Small"
+        if entry["size"] < 10 * 1024 * 1024:
+            return "Medium"
+        return "Large"
+    
+    entries = await _matching_files(source_directory, "*")
+    pairs = [
+        (entry["path"], os.path.join(destination_directory, category(entry), entry["name"]), entry["size"])
+        for entry in entries
+    ]
+    outcome = await run_transfers(
+        pairs, operation, TRANSFER_WORKERS, parameters.get("verify", False), parameters.get("on_conflict", "overwrite")
+    )
     
-    # In a real implementation:
-    # import time
-    # 
-    # if not os.path.exists(destination_directory):
-    #     os.makedirs(destination_directory)
-    # 
-    # organized_files = []
-    # for filename in os.listdir(source_directory):
-    #     filepath = os.path.join(source_directory, filename)
-    #     if os.path.isfile(filepath):
-    #         if organize_by == "extension":
-    #             # Organize by file extension
-    #             ext = os.path.splitext(filename)[1].lower()
-    #             if not ext:
-    #                 ext = "no_extension"
-    #             else:
-    #                 ext = ext[1:]  # Remove the dot
-    #             target_dir = os.path.join(destination_directory, ext)
-    #         elif organize_by == "date":
-    #             # Organize by modification date
-    #             mod_time = os.path.getmtime(filepath)
-    #             date_str = time.strftime("%Y-%m-%d", time.localtime(mod_time))
-    #             target_dir = os.path.join(destination_directory, date_str)
-    #         elif organize_by == "name":
-    #             # Organize by first letter
-    #             first_letter = filename[0].upper() if filename else "Other"
-    #             target_dir = os.path.join(destination_directory, first_letter)
-    #         elif organize_by == "size":
-    #             # Organize by file size
-    #             size = os.path.getsize(filepath)
-    #             if size < 1024 * 1024:  # < 1MB
-    #                 size_category = "Small"
-    #             elif size < 10 * 1024 * 1024:  # < 10MB
-    #                 size_category = "Medium"
-    #             else:
-    #                 size_category = "Large"
-    #             target_dir = os.path.join(destination_directory, size_category)
-    #         else:
-    #             raise ValueError(f"Unsupported organize_by value: {organize_by}")
-    #         
-    #         if not os.path.exists(target_dir):
-    #             os.makedirs(target_dir)
-    #         
-    #         target_path = os.path.join(target_dir, filename)
-    #         shutil.copy2(filepath, target_path)
-    #         organized_files.append({
-    #             "name": filename,
-    #             "source": filepath,
-    #             "destination": target_path,
-    #             "category": os.path.basename(target_dir)
-    #         })
-    
-    # Simulate file organization
-    await asyncio.sleep(2)
-    
-    # Simulate organized files
     organized_files = [
-        {"name": "document.pdf", "source": os.path.join(source_directory, "document.pdf"), "destination": os.path.join(destination_directory, "pdf", "document.pdf"), "category": "pdf"},
-        {"name": "image.jpg", "source": os.path.join(source_directory, "image.jpg"), "destination": os.path.join(destination_directory, "jpg", "image.jpg"), "category": "jpg"},
-        {"name": "spreadsheet.xlsx", "source": os.path.join(source_directory, "spreadsheet.xlsx"), "destination": os.path.join(destination_directory, "xlsx", "spreadsheet.xlsx"), "category": "xlsx"}
+        {
+            "name": os.path.basename(f["source"]),
+            "source": f["source"],
+            "destination": f["destination"],
+            "category": os.path.basename(os.path.dirname(f["destination"]))
+        }
+        for f in outcome["files"] if f["method"] != "skipped"
     ]
     
     return {
         "source_directory": source_directory,
         "destination_directory": destination_directory,
         "organize_by": organize_by,
+        "operation": operation,
         "files_organized": len(organized_files),
-        "organized_files": organized_files
+        "organized_files": organized_files,
+        "files_skipped": outcome["skipped"],
+        "failed": outcome["failed"],
+        "bytes_transferred": outcome["bytes_transferred"],
+        "elapsed": outcome["elapsed"]
     }
 
+@invalidates(scope=path_scope("directory"))
 async def rename_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Rename files based on pattern"""
     directory = parameters.get("directory", ".")
@@ -224,26 +229,29 @@ async def rename_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not pattern:
         raise ValueError("Missing required parameter: pattern")
     
-    # In a real implementation:
-    # import re
-    # 
-    # renamed_files = []
-    # for filename in os.listdir(directory):
-    #     filepath = os.path.join(directory, filename)
-    #     if os.path.isfile(filepath):
-    #         if use_regex:
-    #             new_filename = re.sub(pattern, replacement, filename)
-    #         else:
-    #             new_filename = filename.replace(pattern, replacement)
-    #         
-    #         if new_filename != filename:
-    #             new_filepath = os.path.join(directory, new_filename)
-    #             os.rename(filepath, new_filepath)
-    #             renamed_files.append({
-    #                 "old_name": filename,
-    #                 "new_name": new_filename,
-    #                 "path": directory
-    #             })
+    # In a real implementation (blocking I/O, so it runs in the thread pool):
+    # def rename_matching():
+    #     import re
+    #
+    #     renamed_files = []
+    #     for filename in os.listdir(directory):
+    #         filepath = os.path.join(directory, filename)
+    #         if os.path.isfile(filepath):
+    #             if use_regex:
+    #                 new_filename = re.sub(pattern, replacement, filename)
+    #             else:
+    #                 new_filename = filename.replace(pattern, replacement)
+    #
+    #             if new_filename != filename:
+    #                 new_filepath = os.path.join(directory, new_filename)
+    #                 os.rename(filepath, new_filepath)
+    #                 renamed_files.append({
+    #                     "old_name": filename,
+    #                     "new_name": new_filename,
+    #                     "path": directory
+    #                 })
+    #     return renamed_files
+    # renamed_files = await run_io(rename_matching)
     
     # Simulate file renaming
     await asyncio.sleep(1)
@@ -263,6 +271,7 @@ async def rename_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "renamed_files": renamed_files
     }
 
+@invalidates(scope=path_scope("source_directory", "destination_directory"))
 async def move_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Move files from one location to another"""
     source_directory = parameters.get("source_directory", ".")
@@ -272,31 +281,15 @@ async def move_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not destination_directory:
         raise ValueError("Missing required parameter: destination_directory")
     
-    # In a real implementation:
-    # import fnmatch
-    # 
-    # if not os.path.exists(destination_directory):
-    #     os.makedirs(destination_directory)
-    # 
-    # moved_files = []
-    # for filename in os.listdir(source_directory):
-    #     filepath = os.path.join(source_directory, filename)
-    #     if os.path.isfile(filepath) and fnmatch.fnmatch(filename, file_pattern):
-    #         destination_path = os.path.join(destination_directory, filename)
-    #         shutil.move(filepath, destination_path)
-    #         moved_files.append({
-    #             "name": filename,
-    #             "source": filepath,
-    #             "destination": destination_path
-    #         })
-    
-    # Simulate file moving
-    await asyncio.sleep(1.2)
-    
-    # Simulate moved files
+    entries = await _matching_files(source_directory, file_pattern)
+    pairs = [(entry["path"], os.path.join(destination_directory, entry["name"]), entry["size"]) for entry in entries]
+    outcome = await run_transfers(
+        pairs, "move", TRANSFER_WORKERS, parameters.get("verify", False), parameters.get("on_conflict", "overwrite")
+    )
+    
     moved_files = [
-        {"name": "report.pdf", "source": os.path.join(source_directory, "report.pdf"), "destination": os.path.join(destination_directory, "report.pdf")},
-        {"name": "data.xlsx", "source": os.path.join(source_directory, "data.xlsx"), "destination": os.path.join(destination_directory, "data.xlsx")}
+        {"name": os.path.basename(f["source"]), "source": f["source"], "destination": f["destination"]}
+        for f in outcome["files"] if f["method"] != "skipped"
     ]
     
     return {
@@ -304,9 +297,15 @@ async def move_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "destination_directory": destination_directory,
         "file_pattern": file_pattern,
         "files_moved": len(moved_files),
-        "moved_files": moved_files
+        "moved_files": moved_files,
+        "files_skipped": outcome["skipped"],
+        "failed": outcome["failed"],
+        "bytes_transferred": outcome["bytes_transferred"],
+        "verified": outcome["verified"],
+        "elapsed": outcome["elapsed"]
     }
 
+@invalidates(scope=path_scope("destination_directory"))
 async def copy_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Copy files from one location to another"""
     source_directory = parameters.get("source_directory", ".")
@@ -316,31 +315,15 @@ async def copy_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not destination_directory:
         raise ValueError("Missing required parameter: destination_directory")
     
-    # In a real implementation:
-    # import fnmatch
-    # 
-    # if not os.path.exists(destination_directory):
-    #     os.makedirs(destination_directory)
-    # 
-    # copied_files = []
-    # for filename in os.listdir(source_directory):
-    #     filepath = os.path.join(source_directory, filename)
-    #     if os.path.isfile(filepath) and fnmatch.fnmatch(filename, file_pattern):
-    #         destination_path = os.path.join(destination_directory, filename)
-    #         shutil.copy2(filepath, destination_path)
-    #         copied_files.append({
-    #             "name": filename,
-    #             "source": filepath,
-    #             "destination": destination_path
-    #         })
-    
-    # Simulate file copying
-    await asyncio.sleep(1)
+    entries = await _matching_files(source_directory, file_pattern)
+    pairs = [(entry["path"], os.path.join(destination_directory, entry["name"]), entry["size"]) for entry in entries]
+    outcome = await run_transfers(
+        pairs, "copy", TRANSFER_WORKERS, parameters.get("verify", False), parameters.get("on_conflict", "overwrite")
+    )
     
-    # Simulate copied files
     copied_files = [
-        {"name": "document.pdf", "source": os.path.join(source_directory, "document.pdf"), "destination": os.path.join(destination_directory, "document.pdf")},
-        {"name": "image.jpg", "source": os.path.join(source_directory, "image.jpg"), "destination": os.path.join(destination_directory, "image.jpg")}
+        {"name": os.path.basename(f["source"]), "source": f["source"], "destination": f["destination"]}
+        for f in outcome["files"] if f["method"] != "skipped"
     ]
     
     return {
@@ -348,9 +331,15 @@ async def copy_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "destination_directory": destination_directory,
         "file_pattern": file_pattern,
         "files_copied": len(copied_files),
-        "copied_files": copied_files
+        "copied_files": copied_files,
+        "files_skipped": outcome["skipped"],
+        "failed": outcome["failed"],
+        "bytes_transferred": outcome["bytes_transferred"],
+        "verified": outcome["verified"],
+        "elapsed": outcome["elapsed"]
     }
 
+@invalidates(scope=path_scope("directory"))
 async def delete_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Delete files matching a pattern"""
     directory = parameters.get("directory", ".")
@@ -359,18 +348,21 @@ async def delete_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not file_pattern:
         raise ValueError("Missing required parameter: file_pattern")
     
-    # In a real implementation:
-    # import fnmatch
-    # 
-    # deleted_files = []
-    # for filename in os.listdir(directory):
-    #     filepath = os.path.join(directory, filename)
-    #     if os.path.isfile(filepath) and fnmatch.fnmatch(filename, file_pattern):
-    #         os.remove(filepath)
-    #         deleted_files.append({
-    #             "name": filename,
-    #             "path": filepath
-    #         })
+    # In a real implementation (blocking I/O, so it runs in the thread pool):
+    # def delete_matching():
+    #     import fnmatch
+    #
+    #     deleted_files = []
+    #     for filename in os.listdir(directory):
+    #         filepath = os.path.join(directory, filename)
+    #         if os.path.isfile(filepath) and fnmatch.fnmatch(filename, file_pattern):
+    #             os.remove(filepath)
+    #             deleted_files.append({
+    #                 "name": filename,
+    #                 "path": filepath
+    #             })
+    #     return deleted_files
+    # deleted_files = await run_io(delete_matching)
     
     # Simulate file deletion
     await asyncio.sleep(0.8)
@@ -388,6 +380,8 @@ async def delete_files(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "deleted_files": deleted_files
     }
 
+@coalescible
+@cacheable(ttl=5, scope=path_scope("file_path"))
 async def read_file(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Read the contents of a file"""
     file_path = parameters.get("file_path", "")
@@ -396,15 +390,18 @@ async def read_file(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not file_path:
         raise ValueError("Missing required parameter: file_path")
     
-    # In a real implementation:
-    # try:
-    #     with open(file_path, 'r', encoding=encoding) as f:
-    #         content = f.read()
-    # except UnicodeDecodeError:
-    #     # Try binary mode if text mode fails
-    #     with open(file_path, 'rb') as f:
-    #         content = f.read()
-    #         content = str(content)
+    # In a real implementation (blocking I/O, so it runs in the thread pool):
+    # def read_content():
+    #     try:
+    #         with open(file_path, 'r', encoding=encoding) as f:
+    #             content = f.read()
+    #     except UnicodeDecodeError:
+    #         # Try binary mode if text mode fails
+    #         with open(file_path, 'rb') as f:
+    #             content = f.read()
+    #             content = str(content)
+    #     return content
+    # content = await run_io(read_content)
     
     # Simulate file reading
     await asyncio.sleep(0.5)
@@ -419,6 +416,7 @@ async def read_file(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "content": content
     }
 
+@invalidates(scope=path_scope("file_path"))
 async def write_file(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Write content to a file"""
     file_path = parameters.get("file_path", "")
@@ -429,10 +427,12 @@ async def write_file(parameters: Dict[str, Any]) -> Dict[str, Any]:
     if not file_path:
         raise ValueError("Missing required parameter: file_path")
     
-    # In a real implementation:
-    # mode = 'a' if append else 'w'
-    # with open(file_path, mode, encoding=encoding) as f:
-    #     f.write(content)
+    # In a real implementation (blocking I/O, so it runs in the thread pool):
+    # def write_content():
+    #     mode = 'a' if append else 'w'
+    #     with open(file_path, mode, encoding=encoding) as f:
+    #         f.write(content)
+    # await run_io(write_content)
     
     # Simulate file writing
     await asyncio.sleep(0.5)
@@ -444,3 +444,16 @@ async def write_file(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "bytes_written": len(content),
         "timestamp": datetime.now().isoformat()
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "list_files": list_files,
+    "search_files": search_files,
+    "organize_files": organize_files,
+    "rename_files": rename_files,
+    "move_files": move_files,
+    "copy_files": copy_files,
+    "delete_files": delete_files,
+    "read_file": read_file,
+    "write_file": write_file
+}
@@ -13,24 +13,46 @@ logger = logging.getLogger("ocr-automation")
 # from PIL import Image
 # import cv2
 # import numpy as np
+# from utils.executors import cpu_bound
+#
+# OCR is CPU-bound and would hold the event loop for seconds, so the work runs
+# in the process pool. @cpu_bound makes awaiting these run them there; they
+# must be module-level functions so the worker process can look them up:
+#
+# @cpu_bound
+# def _ocr_image(image_path: str, language: str) -> str:
+#     return pytesseract.image_to_string(Image.open(image_path), lang=language)
+#
+# @cpu_bound
+# def _ocr_screen(region, language: str, screenshot_path) -> str:
+#     screenshot = pyautogui.screenshot(region=region)
+#     if screenshot_path:
+#         screenshot.save(screenshot_path)
+#     return pytesseract.image_to_string(screenshot, lang=language)
+#
+# @cpu_bound
+# def _extract_tables(image_path: str, output_format: str) -> str:
+#     img = cv2.imread(image_path)
+#     tables = pytesseract.image_to_data(img, output_type=pytesseract.Output.DATAFRAME)
+#     if output_format == "csv":
+#         return tables.to_csv(index=False)
+#     elif output_format == "html":
+#         return tables.to_html(index=False)
+#     return tables.to_json(orient="records")
+
+from utils.single_flight import coalescible
 
 async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Route to the appropriate OCR automation function based on the action"""
     logger.info(f"Handling OCR action: {action}")
     
-    action_map = {
-        "extract_text": extract_text_from_image,
-        "extract_from_screen": extract_text_from_screen,
-        "extract_from_region": extract_text_from_region,
-        "extract_tables": extract_tables_from_image,
-        "recognize_document": recognize_document
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported OCR action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
+@coalescible
 async def extract_text_from_image(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Extract text from an image file"""
     image_path = parameters.get("image_path", "")
@@ -40,8 +62,7 @@ async def extract_text_from_image(parameters: Dict[str, Any]) -> Dict[str, Any]:
         raise ValueError("Missing required parameter: image_path")
     
     # In a real implementation:
-    # img = Image.open(image_path)
-    # text = pytesseract.image_to_string(img, lang=language)
+    # text = await _ocr_image(image_path, language)
     
     # Simulate OCR processing
     await asyncio.sleep(1.5)
@@ -58,6 +79,7 @@ async def extract_text_from_image(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "timestamp": datetime.now().isoformat()
     }
 
+@coalescible
 async def extract_text_from_screen(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Extract text from the current screen"""
     language = parameters.get("language", "eng")
@@ -65,10 +87,7 @@ async def extract_text_from_screen(parameters: Dict[str, Any]) -> Dict[str, Any]
     screenshot_path = parameters.get("screenshot_path", f"ocr_screenshot_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png")
     
     # In a real implementation:
-    # screenshot = pyautogui.screenshot()
-    # if save_screenshot:
-    #     screenshot.save(screenshot_path)
-    # text = pytesseract.image_to_string(screenshot, lang=language)
+    # text = await _ocr_screen(None, language, screenshot_path if save_screenshot else None)
     
     # Simulate OCR processing
     await asyncio.sleep(2)
@@ -86,6 +105,7 @@ async def extract_text_from_screen(parameters: Dict[str, Any]) -> Dict[str, Any]
         "timestamp": datetime.now().isoformat()
     }
 
+@coalescible
 async def extract_text_from_region(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Extract text from a specific region of the screen"""
     region = parameters.get("region", [0, 0, 500, 500])  # [x, y, width, height]
@@ -97,10 +117,7 @@ async def extract_text_from_region(parameters: Dict[str, Any]) -> Dict[str, Any]
         raise ValueError("Invalid region parameter: must be [x, y, width, height]")
     
     # In a real implementation:
-    # screenshot = pyautogui.screenshot(region=region)
-    # if save_screenshot:
-    #     screenshot.save(screenshot_path)
-    # text = pytesseract.image_to_string(screenshot, lang=language)
+    # text = await _ocr_screen(tuple(region), language, screenshot_path if save_screenshot else None)
     
     # Simulate OCR processing
     await asyncio.sleep(1)
@@ -119,6 +136,7 @@ async def extract_text_from_region(parameters: Dict[str, Any]) -> Dict[str, Any]
         "timestamp": datetime.now().isoformat()
     }
 
+@coalescible
 async def extract_tables_from_image(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Extract tables from an image"""
     image_path = parameters.get("image_path", "")
@@ -128,15 +146,7 @@ async def extract_tables_from_image(parameters: Dict[str, Any]) -> Dict[str, Any
         raise ValueError("Missing required parameter: image_path")
     
     # In a real implementation:
-    # img = cv2.imread(image_path)
-    # tables = pytesseract.image_to_data(img, output_type=pytesseract.Output.DATAFRAME)
-    # 
-    # if output_format == "csv":
-    #     output_data = tables.to_csv(index=False)
-    # elif output_format == "html":
-    #     output_data = tables.to_html(index=False)
-    # else:
-    #     output_data = tables.to_json(orient="records")
+    # output_data = await _extract_tables(image_path, output_format)
     
     # Simulate table extraction
     await asyncio.sleep(2)
@@ -165,6 +175,7 @@ async def extract_tables_from_image(parameters: Dict[str, Any]) -> Dict[str, Any
         "timestamp": datetime.now().isoformat()
     }
 
+@coalescible
 async def recognize_document(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Recognize and extract structured information from a document"""
     image_path = parameters.get("image_path", "")
@@ -175,8 +186,7 @@ async def recognize_document(parameters: Dict[str, Any]) -> Dict[str, Any]:
     
     # In a real implementation:
     # This would use more advanced OCR and document understanding techniques
-    # img = Image.open(image_path)
-    # text = pytesseract.image_to_string(img)
+    # text = await _ocr_image(image_path, "eng")
     # 
     # # Process the text based on document type
     # if document_type == "invoice":
@@ -235,3 +245,12 @@ async def recognize_document(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "confidence": 0.92,
         "timestamp": datetime.now().isoformat()
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "extract_text": extract_text_from_image,
+    "extract_from_screen": extract_text_from_screen,
+    "extract_from_region": extract_text_from_region,
+    "extract_tables": extract_tables_from_image,
+    "recognize_document": recognize_document
+}
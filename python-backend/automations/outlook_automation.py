@@ -11,27 +11,20 @@ logger = logging.getLogger("outlook-automation")
 # import win32com.client
 # from win32com.client import constants
 
+from utils.result_cache import cacheable, invalidates
+from utils.single_flight import coalescible
+
 async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Route to the appropriate Outlook automation function based on the action"""
     logger.info(f"Handling Outlook action: {action}")
     
-    action_map = {
-        "send_email": send_email,
-        "read_emails": read_emails,
-        "create_meeting": create_meeting,
-        "create_task": create_task,
-        "create_contact": create_contact,
-        "search_emails": search_emails,
-        "get_calendar": get_calendar,
-        "move_emails": move_emails,
-        "delete_emails": delete_emails
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported Outlook action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
+@invalidates("read_emails", "search_emails")
 async def send_email(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Send an email using Outlook"""
     to = parameters.get("to", "")
@@ -94,6 +87,8 @@ async def send_email(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "timestamp": datetime.now().isoformat()
     }
 
+@coalescible
+@cacheable(ttl=30)
 async def read_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Read emails from Outlook"""
     folder = parameters.get("folder", "Inbox")
@@ -200,6 +195,7 @@ async def read_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "total_found": len(email_list)
     }
 
+@invalidates("get_calendar")
 async def create_meeting(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Create a meeting invitation in Outlook"""
     subject = parameters.get("subject", "")
@@ -346,6 +342,8 @@ async def create_contact(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "timestamp": datetime.now().isoformat()
     }
 
+@coalescible
+@cacheable(ttl=30)
 async def search_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Search for emails in Outlook"""
     query = parameters.get("query", "")
@@ -432,6 +430,8 @@ async def search_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "results": results
     }
 
+@coalescible
+@cacheable(ttl=60)
 async def get_calendar(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Get calendar events from Outlook"""
     start_date = parameters.get("start_date", datetime.now().strftime("%Y-%m-%d"))
@@ -509,6 +509,7 @@ async def get_calendar(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "events": events
     }
 
+@invalidates("read_emails", "search_emails")
 async def move_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Move emails to a different folder in Outlook"""
     query = parameters.get("query", "")
@@ -582,6 +583,7 @@ async def move_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "timestamp": datetime.now().isoformat()
     }
 
+@invalidates("read_emails", "search_emails")
 async def delete_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Delete emails from Outlook"""
     query = parameters.get("query", "")
@@ -645,3 +647,16 @@ async def delete_emails(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "emails_deleted": deleted_count,
         "timestamp": datetime.now().isoformat()
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "send_email": send_email,
+    "read_emails": read_emails,
+    "create_meeting": create_meeting,
+    "create_task": create_task,
+    "create_contact": create_contact,
+    "search_emails": search_emails,
+    "get_calendar": get_calendar,
+    "move_emails": move_emails,
+    "delete_emails": delete_emails
+}
@@ -14,25 +14,19 @@ logger = logging.getLogger("system-automation")
 # import subprocess
 # import win32com.client (on Windows)
 
+from utils.executors import io_bound
+from utils.result_cache import cacheable
+from utils.single_flight import coalescible
+
 async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Route to the appropriate system automation function based on the action"""
     logger.info(f"Handling system action: {action}")
     
-    action_map = {
-        "open_app": open_application,
-        "close_app": close_application,
-        "type_text": type_text,
-        "press_keys": press_keys,
-        "get_system_info": get_system_info,
-        "run_command": run_command,
-        "take_screenshot": take_screenshot,
-        "monitor_process": monitor_process
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported system action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
 async def open_application(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Open an application on the system"""
@@ -133,6 +127,13 @@ async def press_keys(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "timestamp": datetime.now().isoformat()
     }
 
+@io_bound
+def _platform_info() -> Dict[str, str]:
+    # platform.platform() reads the interpreter binary to find the libc version
+    return {"system": platform.system(), "platform": platform.platform()}
+
+@coalescible
+@cacheable(ttl=2)
 async def get_system_info(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Get system information"""
     # In a real implementation:
@@ -140,11 +141,12 @@ async def get_system_info(parameters: Dict[str, Any]) -> Dict[str, Any]:
     # memory = psutil.virtual_memory()
     # disk = psutil.disk_usage('/')
     # battery = psutil.sensors_battery()
+    info = await _platform_info()
     
     # Simulate system info
     return {
-        "system": platform.system(),
-        "platform": platform.platform(),
+        "system": info["system"],
+        "platform": info["platform"],
         "processor": "Intel(R) Core(TM) i7-10700K CPU @ 3.80GHz",
         "cpu_usage": 35.2,
         "memory": {
@@ -261,3 +263,15 @@ async def monitor_process(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "processes": processes,
         "timestamp": datetime.now().isoformat()
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "open_app": open_application,
+    "close_app": close_application,
+    "type_text": type_text,
+    "press_keys": press_keys,
+    "get_system_info": get_system_info,
+    "run_command": run_command,
+    "take_screenshot": take_screenshot,
+    "monitor_process": monitor_process
+}
@@ -15,22 +15,11 @@ async def handle_action(action: str, parameters: Dict[str, Any]) -> Dict[str, An
     """Route to the appropriate Word automation function based on the action"""
     logger.info(f"Handling Word action: {action}")
     
-    action_map = {
-        "create_document": create_document,
-        "open_document": open_document,
-        "edit_document": edit_document,
-        "add_text": add_text,
-        "add_table": add_table,
-        "add_image": add_image,
-        "save_document": save_document,
-        "export_pdf": export_to_pdf,
-        "mail_merge": perform_mail_merge
-    }
-    
-    if action.lower() not in action_map:
+    handler = ACTION_MAP.get(action.lower())
+    if handler is None:
         raise ValueError(f"Unsupported Word action: {action}")
     
-    return await action_map[action.lower()](parameters)
+    return await handler(parameters)
 
 async def create_document(parameters: Dict[str, Any]) -> Dict[str, Any]:
     """Create a new Word document"""
@@ -395,3 +384,16 @@ async def perform_mail_merge(parameters: Dict[str, Any]) -> Dict[str, Any]:
         "output_path": output_path,
         "timestamp": datetime.now().isoformat()
     }
+
+# Action name -> handler, built once at import time and shared with the action registry
+ACTION_MAP = {
+    "create_document": create_document,
+    "open_document": open_document,
+    "edit_document": edit_document,
+    "add_text": add_text,
+    "add_table": add_table,
+    "add_image": add_image,
+    "save_document": save_document,
+    "export_pdf": export_to_pdf,
+    "mail_merge": perform_mail_merge
+}
@@ -0,0 +1,125 @@
+import os
+from typing import Dict, List
+
+# Server configuration - every value can be overridden with an environment variable
+
+def _env_list(name: str, default: str = "") -> List[str]:
+    """Read a comma-separated list from the environment"""
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+def _env_limits(name: str, default: str = "") -> Dict[str, int]:
+    """Read per-target limits such as "outlook=1,files=8" from the environment"""
+    limits = {}
+    for item in _env_list(name, default):
+        target, _, value = item.partition("=")
+        limits[target.strip().lower()] = int(value)
+    return limits
+
+def _env_levels(name: str, default: str = "") -> Dict[str, str]:
+    """Read per-logger levels such as "action-registry=DEBUG,uvicorn=WARNING" from the environment"""
+    levels = {}
+    for item in _env_list(name, default):
+        logger_name, _, level = item.partition("=")
+        levels[logger_name.strip()] = level.strip().upper()
+    return levels
+
+SERVER_CONFIG = {
+    # Automation targets imported in the background right after startup,
+    # e.g. AUTOMATION_WARM_UP_TARGETS="files,system". Everything else is
+    # imported on its first request.
+    "warm_up_targets": _env_list("AUTOMATION_WARM_UP_TARGETS"),
+
+    # Task storage: "sqlite" (durable, WAL mode) or "memory"
+    "task_store_backend": os.environ.get("AUTOMATION_TASK_STORE", "sqlite"),
+    "task_store_path": os.environ.get("AUTOMATION_TASK_DB", "automation_tasks.db"),
+    # Task records kept in memory in front of the store
+    "task_cache_size": int(os.environ.get("AUTOMATION_TASK_CACHE_SIZE", "1000")),
+    # Seconds a completed/failed task is kept before eviction
+    "finished_task_ttl": float(os.environ.get("AUTOMATION_FINISHED_TASK_TTL", str(7 * 24 * 3600))),
+    # Seconds between eviction sweeps
+    "task_eviction_interval": float(os.environ.get("AUTOMATION_TASK_EVICTION_INTERVAL", "300")),
+    # Longest a GET /tasks/{id}/wait request is held open
+    "task_wait_max_timeout": float(os.environ.get("AUTOMATION_TASK_WAIT_MAX_TIMEOUT", "60")),
+
+    # Scheduler: concurrent scheduled runs per target (e.g. "outlook=1,files=8")
+    "scheduler_target_limits": _env_limits("AUTOMATION_SCHEDULER_TARGET_LIMITS"),
+    "scheduler_default_target_limit": int(os.environ.get("AUTOMATION_SCHEDULER_DEFAULT_LIMIT", "4")),
+    # Seconds a run may start late before the misfire policy applies
+    "scheduler_misfire_grace_time": float(os.environ.get("AUTOMATION_SCHEDULER_MISFIRE_GRACE", "60")),
+    # Collapse several missed runs of a job into one
+    "scheduler_coalesce": os.environ.get("AUTOMATION_SCHEDULER_COALESCE", "true").lower() == "true",
+
+    # Workflow steps allowed to run at once when branches are independent
+    "workflow_max_concurrency": int(os.environ.get("AUTOMATION_WORKFLOW_CONCURRENCY", "4")),
+    # Compiled workflow plans kept, keyed by definition hash
+    "workflow_plan_cache_size": int(os.environ.get("AUTOMATION_WORKFLOW_PLAN_CACHE", "256")),
+
+    # /automate/async workers per target; COM-backed targets need a single worker
+    "worker_target_counts": _env_limits("AUTOMATION_WORKERS", "outlook=1"),
+    "worker_default_count": int(os.environ.get("AUTOMATION_DEFAULT_WORKERS", "4")),
+    # Queued tasks beyond this are rejected with 429 and Retry-After
+    "worker_max_queue_length": int(os.environ.get("AUTOMATION_MAX_QUEUE", "1000")),
+
+    # Thread pool for blocking I/O and process pool for CPU-heavy actions (OCR);
+    # 0 keeps the defaults (cpu_count + 4 threads, cpu_count processes)
+    "executor_io_workers": int(os.environ.get("AUTOMATION_IO_WORKERS", "0")),
+    "executor_cpu_workers": int(os.environ.get("AUTOMATION_CPU_WORKERS", "0")),
+    # Threads for copy/move workers, kept apart so a long transfer cannot starve
+    # the I/O pool; also caps the files transferred at once (0 keeps 8)
+    "executor_transfer_workers": int(os.environ.get("AUTOMATION_TRANSFER_WORKERS", "0")),
+
+    # Events kept in memory for /events subscribers resuming from a cursor
+    "event_buffer_size": int(os.environ.get("AUTOMATION_EVENT_BUFFER", "10000")),
+    # Seconds events are batched before one write to stdout for the Tauri shell
+    "event_flush_interval": float(os.environ.get("AUTOMATION_EVENT_FLUSH_INTERVAL", "0.05")),
+    # The web build has no Tauri process reading stdout and can turn this off
+    "event_stdout": os.environ.get("AUTOMATION_EVENT_STDOUT", "true").lower() == "true",
+
+    # /automate/batch: requests accepted per batch and requests run at once
+    "batch_max_items": int(os.environ.get("AUTOMATION_BATCH_MAX_ITEMS", "500")),
+    "batch_max_concurrency": int(os.environ.get("AUTOMATION_BATCH_MAX_CONCURRENCY", "16")),
+
+    # Results of read-only actions (list_files, get_system_info, ...) reused within their TTL
+    "result_cache_enabled": os.environ.get("AUTOMATION_RESULT_CACHE", "true").lower() == "true",
+    "result_cache_max_bytes": int(os.environ.get("AUTOMATION_RESULT_CACHE_BYTES", str(32 * 1024 * 1024))),
+
+    # Where finished trace spans go: "jsonl" (local file), "otlp" (OTLP/HTTP collector) or "none"
+    "tracing_exporter": os.environ.get("AUTOMATION_TRACING_EXPORTER", "jsonl"),
+    "tracing_jsonl_path": os.environ.get("AUTOMATION_TRACING_JSONL_PATH", "automation_traces.jsonl"),
+    "tracing_otlp_endpoint": os.environ.get("AUTOMATION_TRACING_OTLP_ENDPOINT", "http://localhost:4318"),
+    # Traces kept in memory for GET /tasks/{id}/trace
+    "trace_retention": int(os.environ.get("AUTOMATION_TRACE_RETENTION", "500")),
+
+    # Logging: records are queued and written by a background thread to a
+    # file rotated by size and age; AUTOMATION_LOG_LEVELS sets per-logger levels
+    "log_file": os.environ.get("AUTOMATION_LOG_FILE", "automation_server.log"),
+    "log_level": os.environ.get("AUTOMATION_LOG_LEVEL", "INFO"),
+    "log_json": os.environ.get("AUTOMATION_LOG_JSON", "true").lower() == "true",
+    "log_max_bytes": int(os.environ.get("AUTOMATION_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    "log_backup_count": int(os.environ.get("AUTOMATION_LOG_BACKUP_COUNT", "5")),
+    "log_rotate_interval": float(os.environ.get("AUTOMATION_LOG_ROTATE_INTERVAL", str(24 * 3600))),
+    "log_module_levels": _env_levels("AUTOMATION_LOG_LEVELS"),
+
+    # Declarative rules deciding which actions need confirmation (or are refused)
+    "risk_policy_path": os.environ.get(
+        "AUTOMATION_RISK_POLICY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_policy.json")
+    ),
+    # Confirmation tokens are valid this many seconds; without a configured
+    # secret they are signed with a per-process key and die with the server
+    "confirmation_token_ttl": float(os.environ.get("AUTOMATION_CONFIRMATION_TTL", "300")),
+    "confirmation_secret": os.environ.get("AUTOMATION_CONFIRMATION_SECRET", ""),
+
+    # Background file metadata index used by list_files/search_files for
+    # directories under these roots (os.pathsep-separated; empty disables it)
+    "file_index_roots": [root for root in os.environ.get("AUTOMATION_FILE_INDEX_ROOTS", "").split(os.pathsep) if root],
+    "file_index_path": os.environ.get("AUTOMATION_FILE_INDEX_PATH", "automation_file_index.db"),
+    # Full re-scan against the disk; catches anything inotify missed
+    "file_index_reconcile_interval": float(os.environ.get("AUTOMATION_FILE_INDEX_RECONCILE_INTERVAL", "300")),
+    "file_index_inotify": os.environ.get("AUTOMATION_FILE_INDEX_INOTIFY", "true").lower() == "true",
+
+    # Opt-in trigram index of file contents under the file index roots, used
+    # to narrow content searches to files that can match
+    "content_index": os.environ.get("AUTOMATION_CONTENT_INDEX", "false").lower() == "true",
+    "content_index_path": os.environ.get("AUTOMATION_CONTENT_INDEX_PATH", "automation_content_index.db"),
+    "content_index_max_file_size": int(os.environ.get("AUTOMATION_CONTENT_INDEX_MAX_FILE_SIZE", str(4 * 1024 * 1024))),
+}
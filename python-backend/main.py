@@ -1,42 +1,60 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import time
+
+# Measured before the heavier imports so /health can report real cold-start time
+SERVER_START_TIME = time.time()
+
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Header, Response
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, PrivateAttr
+from typing import Dict, Any, List, Optional, Literal, AsyncIterator, Set
 import uvicorn
 import os
 import json
-import time
+import asyncio
 import logging
 from datetime import datetime
 
-# Import automation modules
-from automations import (
-    email_automation,
-    excel_automation,
-    browser_automation,
-    system_automation,
-    ocr_automation,
-    file_automation,
-    word_automation,
-    outlook_automation,
-    clipboard_automation
-)
+from config import SERVER_CONFIG
 
 # Import event emitter
-from utils.event_emitter import emit_log, emit_progress, emit_result, emit_error
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("automation_server.log"),
-        logging.StreamHandler()
-    ]
+from utils.event_emitter import emit_log, emit_progress, emit_result, emit_error, event_bus, current_task_id
+from utils.action_registry import ActionRegistry
+from utils.result_cache import ResultCache
+from utils.single_flight import SingleFlight
+from utils.metrics import metrics, monitor_event_loop_lag
+from utils.tracing import create_tracer, Span
+from utils.serialization import FastJSONResponse, RawJSON, serialize, json_object, json_array, dumps
+from utils.task_store import create_task_store
+from utils.task_ids import new_task_id
+from utils.scheduler import Scheduler, Job, parse_schedule
+from utils.worker_pool import WorkerPool, WorkItem, QueueFullError
+from utils.executors import configure_executors, executor_stats, shutdown_executors
+from utils.workflow_engine import run_workflow
+from utils.workflow_compiler import WorkflowCompiler, WorkflowPlan, PlanStep, WorkflowValidationError
+from utils.logging_setup import configure_logging, shutdown_logging
+from utils.risk_policy import RiskPolicy, RiskDecision, ConfirmationTokens
+from utils.workflow_checkpoints import CheckpointLog
+from utils.file_index import configure_file_index
+from utils.trigram_index import configure_trigram_index
+
+# Configure logging; handlers only enqueue, a background thread does the writing
+configure_logging(
+    SERVER_CONFIG["log_file"],
+    level=SERVER_CONFIG["log_level"],
+    json_format=SERVER_CONFIG["log_json"],
+    max_bytes=SERVER_CONFIG["log_max_bytes"],
+    backup_count=SERVER_CONFIG["log_backup_count"],
+    rotate_interval=SERVER_CONFIG["log_rotate_interval"],
+    module_levels=SERVER_CONFIG["log_module_levels"]
 )
 logger = logging.getLogger("automation-server")
 
-app = FastAPI(title="Desktop Automation API", description="Python-based desktop automation API for AI Assistant")
+app = FastAPI(
+    title="Desktop Automation API",
+    description="Python-based desktop automation API for AI Assistant",
+    default_response_class=FastJSONResponse
+)
 
 # Configure CORS
 app.add_middleware(
@@ -47,12 +65,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+event_bus.configure(
+    buffer_size=SERVER_CONFIG["event_buffer_size"],
+    flush_interval=SERVER_CONFIG["event_flush_interval"],
+    stdout=SERVER_CONFIG["event_stdout"]
+)
+
+# Thread/process pools that blocking and CPU-heavy actions are offloaded to
+configure_executors(
+    io_workers=SERVER_CONFIG["executor_io_workers"],
+    cpu_workers=SERVER_CONFIG["executor_cpu_workers"],
+    transfer_workers=SERVER_CONFIG["executor_transfer_workers"]
+)
+
+# Results of read-only actions, reused until their TTL or a mutating action on the same paths
+result_cache = ResultCache(
+    max_bytes=SERVER_CONFIG["result_cache_max_bytes"]
+) if SERVER_CONFIG["result_cache_enabled"] else None
+
+# Build the (target, action) -> coroutine table once at startup. Automation
+# modules are imported on their first request (or by the warm-up below).
+action_registry = ActionRegistry({
+    "email": "automations.email_automation",
+    "excel": "automations.excel_automation",
+    "browser": "automations.browser_automation",
+    "system": "automations.system_automation",
+    "ocr": "automations.ocr_automation",
+    "files": "automations.file_automation",
+    "word": "automations.word_automation",
+    "outlook": "automations.outlook_automation",
+    "clipboard": "automations.clipboard_automation"
+}, result_cache=result_cache, single_flight=SingleFlight())
+
+# Per-action latency and errors are recorded by the registry; these cover whole workflows
+WORKFLOW_DURATION = metrics.histogram(
+    "automation_workflow_duration_seconds", "Time to run a workflow", ("status",)
+)
+WORKFLOW_STEPS = metrics.counter(
+    "automation_workflow_steps_total", "Workflow steps by outcome", ("target", "action", "outcome")
+)
+
+# Compiles workflow definitions into validated plans, cached by content hash
+workflow_compiler = WorkflowCompiler(
+    action_registry,
+    default_concurrency=SERVER_CONFIG["workflow_max_concurrency"],
+    cache_size=SERVER_CONFIG["workflow_plan_cache_size"]
+)
+
+# Spans for /automate calls, background tasks and workflow steps; viewable at /tasks/{id}/trace
+tracer = create_tracer(
+    exporter=SERVER_CONFIG["tracing_exporter"],
+    jsonl_path=SERVER_CONFIG["tracing_jsonl_path"],
+    otlp_endpoint=SERVER_CONFIG["tracing_otlp_endpoint"],
+    max_traces=SERVER_CONFIG["trace_retention"]
+)
+
+# Which actions need confirmation, compiled once from the policy file
+risk_policy = RiskPolicy.from_file(SERVER_CONFIG["risk_policy_path"])
+confirmation_tokens = ConfirmationTokens(
+    secret=SERVER_CONFIG["confirmation_secret"].encode("utf-8") or None,
+    ttl=SERVER_CONFIG["confirmation_token_ttl"]
+)
+
+# Time from process start until the app accepted requests
+startup_time: Optional[float] = None
+
 # Models
 class AutomationRequest(BaseModel):
     action: str
     target: str
     parameters: Dict[str, Any] = {}
     confirm_risky: bool = False
+    # Token from an earlier requires_confirmation response; covers the actions it was issued for
+    confirmation_token: Optional[str] = None
+    # Queue priority for /automate/async; higher runs first
+    priority: int = 0
 
 class AutomationResponse(BaseModel):
     success: bool
@@ -61,12 +148,150 @@ class AutomationResponse(BaseModel):
     execution_time: float
     requires_confirmation: bool = False
     confirmation_message: Optional[str] = None
+    # Resend the request (or a batch/workflow using the same actions) with this to confirm it
+    confirmation_token: Optional[str] = None
+    # Look up the request's spans at /tasks/{trace_id}/trace
+    trace_id: Optional[str] = None
+    # The result as already serialized for the task-result event, reused for the HTTP body
+    _result_json: Optional[RawJSON] = PrivateAttr(default=None)
+
+    def to_json(self) -> RawJSON:
+        fields = dict(self)
+        if self._result_json is not None:
+            fields["result"] = self._result_json
+        return json_object(fields)
+
+class BatchRequest(BaseModel):
+    requests: List[AutomationRequest]
+    # "parallel" runs up to `concurrency` requests at once, "sequential" one at a time in order
+    mode: Literal["parallel", "sequential"] = "parallel"
+    concurrency: int = 4
+    # Order of streamed NDJSON lines: request order, or as soon as each request finishes
+    order: Literal["input", "completion"] = "input"
+    # Skip requests that have not started yet once one fails
+    stop_on_error: bool = False
+    stream: bool = False
+    # Applied to every request that does not carry its own token
+    confirmation_token: Optional[str] = None
+
+class BatchItemResult(AutomationResponse):
+    index: int
+    skipped: bool = False
+
+class BatchResponse(BaseModel):
+    success: bool
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+    execution_time: float
 
 # Store running tasks
-running_tasks = {}
+running_tasks = create_task_store(
+    SERVER_CONFIG["task_store_backend"],
+    SERVER_CONFIG["task_store_path"],
+    "tasks",
+    SERVER_CONFIG["task_cache_size"],
+    SERVER_CONFIG["finished_task_ttl"]
+)
+
+# Store scheduled tasks (never evicted; they are removed explicitly)
+scheduled_tasks = create_task_store(
+    SERVER_CONFIG["task_store_backend"],
+    SERVER_CONFIG["task_store_path"],
+    "scheduled_tasks",
+    SERVER_CONFIG["task_cache_size"],
+    None
+)
+
+# Per-step results of workflows, so an interrupted workflow can be resumed
+workflow_checkpoints = CheckpointLog(
+    SERVER_CONFIG["task_store_path"] if SERVER_CONFIG["task_store_backend"] == "sqlite" else ":memory:"
+)
+# Workflows executing in this process; anything else marked running was interrupted
+active_workflows: Set[str] = set()
+
+# File metadata index for the configured roots (None when no roots are set)
+file_index = configure_file_index(
+    SERVER_CONFIG["file_index_path"],
+    SERVER_CONFIG["file_index_roots"],
+    SERVER_CONFIG["file_index_reconcile_interval"],
+    SERVER_CONFIG["file_index_inotify"]
+)
+# Trigram index of file contents, following the file index
+trigram_index = configure_trigram_index(
+    SERVER_CONFIG["content_index_path"],
+    file_index,
+    SERVER_CONFIG["content_index_max_file_size"]
+) if SERVER_CONFIG["content_index"] else None
+
+async def warm_up_targets(targets: List[str]):
+    """Import the configured automation modules without blocking request handling"""
+    for target in targets:
+        try:
+            await asyncio.to_thread(action_registry.load_target, target)
+        except Exception as e:
+            logger.error(f"Error warming up {target} automation: {str(e)}", exc_info=True)
+
+async def evict_finished_tasks():
+    """Periodically drop finished tasks that are older than the configured TTL"""
+    while True:
+        await asyncio.sleep(SERVER_CONFIG["task_eviction_interval"])
+        try:
+            running_tasks.evict_expired()
+            if SERVER_CONFIG["finished_task_ttl"] is not None:
+                workflow_checkpoints.purge(time.time() - SERVER_CONFIG["finished_task_ttl"])
+        except Exception as e:
+            logger.error(f"Error evicting finished tasks: {str(e)}", exc_info=True)
+
+def mark_interrupted_workflows():
+    """Workflows still marked running at startup were cut off by a crash or restart"""
+    cursor = None
+    while True:
+        page = running_tasks.list(status="running", limit=500, cursor=cursor)
+        for task in page["tasks"]:
+            if "workflow" in task and task["id"] not in active_workflows:
+                running_tasks.update(task["id"], status="interrupted")
+                logger.info(f"Workflow {task['id']} was interrupted; resume it with POST /workflow/{task['id']}/resume")
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
 
-# Store scheduled tasks
-scheduled_tasks = {}
+@app.on_event("startup")
+async def on_startup():
+    global startup_time
+    startup_time = time.time() - SERVER_START_TIME
+    logger.info(f"Automation server ready in {startup_time:.2f}s")
+
+    event_bus.attach(asyncio.get_running_loop())
+    register_metric_collectors()
+    tracer.start()
+
+    asyncio.create_task(evict_finished_tasks())
+    asyncio.create_task(monitor_event_loop_lag())
+
+    mark_interrupted_workflows()
+    restore_scheduled_jobs()
+    scheduler.start()
+    if file_index is not None:
+        file_index.start()
+    if trigram_index is not None:
+        trigram_index.start()
+
+    if SERVER_CONFIG["warm_up_targets"]:
+        asyncio.create_task(warm_up_targets(SERVER_CONFIG["warm_up_targets"]))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await scheduler.stop()
+    await worker_pool.stop()
+    if trigram_index is not None:
+        trigram_index.stop()
+    if file_index is not None:
+        file_index.stop()
+    shutdown_executors()
+    event_bus.flush()
+    tracer.stop()
+    shutdown_logging()
 
 @app.get("/")
 async def root():
@@ -77,94 +302,177 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "running_tasks": len(running_tasks),
-        "scheduled_tasks": len(scheduled_tasks),
-        "available_targets": [
-            "email", "excel", "browser", "system", "ocr", "files", 
-            "word", "outlook", "clipboard"
-        ]
+        "running_tasks": running_tasks.count("running"),
+        "task_waiters": running_tasks.waiting(),
+        "scheduled_tasks": scheduled_tasks.count(),
+        "available_targets": action_registry.targets,
+        "startup_time": startup_time,
+        "module_load_times": action_registry.load_times(),
+        "worker_pool": worker_pool.stats(),
+        "executors": executor_stats(),
+        "events": event_bus.stats(),
+        "result_cache": result_cache.stats() if result_cache else None,
+        "single_flight": action_registry.single_flight.stats(),
+        "risk_policy": risk_policy.stats(),
+        "workflow_checkpoints": workflow_checkpoints.stats(),
+        "file_index": file_index.stats() if file_index else None,
+        "content_index": trigram_index.stats() if trigram_index else None,
+        "tracing": tracer.stats()
     }
 
-def is_risky_action(action: str, target: str, parameters: Dict[str, Any]) -> tuple[bool, str]:
-    """Check if an action is risky and requires confirmation"""
-    risky_keywords = ["delete", "remove", "clear", "send", "email", "mail", "post", "publish", "share", "execute"]
-    
-    # Check action name
-    if any(keyword in action.lower() for keyword in risky_keywords):
-        return True, f"This action ({action}) might perform sensitive operations. Are you sure you want to proceed?"
-    
-    # Check specific combinations
-    if target.lower() == "email" and action.lower() in ["send", "compose"]:
-        return True, f"This will send an email to {parameters.get('to', 'recipients')}. Are you sure you want to proceed?"
-    
-    if target.lower() == "files" and any(keyword in action.lower() for keyword in ["delete", "move", "rename"]):
-        return True, f"This will modify files in {parameters.get('directory', 'your filesystem')}. Are you sure you want to proceed?"
-    
-    if target.lower() == "system" and action.lower() == "run_command":
-        return True, f"This will execute a system command: {parameters.get('command', '')}. Are you sure you want to proceed?"
-    
-    return False, ""
+def register_metric_collectors():
+    """Expose counters other components already keep; read only when /metrics is scraped"""
+    def by_target(field: str) -> Dict[tuple, float]:
+        return {(target,): stats[field] for target, stats in worker_pool.stats()["targets"].items()}
+
+    def per_pool(field: str) -> Dict[tuple, float]:
+        return {(pool,): stats[field] for pool, stats in executor_stats().items()}
+
+    metrics.gauge("automation_queue_depth", "Tasks waiting in the worker pool", ("target",),
+                  collector=lambda: by_target("queued"))
+    metrics.gauge("automation_tasks_running", "Background tasks running in the worker pool",
+                  collector=lambda: worker_pool.stats()["running"])
+    metrics.counter("automation_tasks_rejected_total", "Background tasks rejected because the queue was full",
+                    collector=lambda: worker_pool.stats()["rejected"])
+    metrics.gauge("automation_executor_active", "Blocking calls running in each executor pool", ("pool",),
+                  collector=lambda: per_pool("active"))
+    metrics.counter("automation_executor_completed_total", "Blocking calls finished by each executor pool", ("pool",),
+                    collector=lambda: per_pool("completed"))
+    metrics.gauge("automation_scheduled_jobs", "Jobs registered with the scheduler",
+                  collector=lambda: scheduled_tasks.count())
+    metrics.gauge("automation_event_subscribers", "Open /events streams",
+                  collector=lambda: event_bus.stats()["subscribers"])
+    metrics.gauge("automation_workflow_plan_cache_entries", "Compiled workflow plans cached",
+                  collector=lambda: workflow_compiler.stats()["cached_plans"])
+    metrics.counter("automation_single_flight_coalesced_total", "Calls that joined an identical call in flight",
+                    collector=lambda: action_registry.single_flight.stats()["coalesced"])
+    if result_cache is not None:
+        metrics.counter("automation_result_cache_hits_total", "Result cache hits",
+                        collector=lambda: result_cache.hits)
+        metrics.counter("automation_result_cache_misses_total", "Result cache misses",
+                        collector=lambda: result_cache.misses)
+        metrics.gauge("automation_result_cache_hit_ratio", "Result cache hits / lookups",
+                      collector=lambda: result_cache.stats()["hit_ratio"])
+        metrics.gauge("automation_result_cache_bytes", "Serialized size of cached results",
+                      collector=lambda: result_cache.bytes)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/capabilities")
+async def get_capabilities():
+    return action_registry.capabilities()
+
+def check_risk(target: str, action: str, parameters: Dict[str, Any], confirm_risky: bool = False,
+               confirmation_token: Optional[str] = None) -> Optional[RiskDecision]:
+    """
+    Apply the risk policy to a request.
+
+    Args:
+        target: The automation target
+        action: The action name
+        parameters: The action parameters
+        confirm_risky: The caller confirmed the request explicitly
+        confirmation_token: A token issued for this target and action
+
+    Returns:
+        The decision stopping the request ("confirm" or "deny"), or None if it may run
+    """
+    decision = risk_policy.evaluate(target, action, parameters)
+    if decision.allowed:
+        return None
+    if decision.decision == "confirm" and (
+        confirm_risky or confirmation_tokens.verify(confirmation_token, target, action)
+    ):
+        return None
+    return decision
 
 @app.post("/automate", response_model=AutomationResponse)
 async def run_automation(request: AutomationRequest, background_tasks: BackgroundTasks):
+    response = await execute_request(request)
+    return FastJSONResponse(response.to_json())
+
+async def execute_request(request: AutomationRequest, quiet: bool = False) -> AutomationResponse:
+    """
+    Risk-check and run one automation request.
+
+    Args:
+        request: The automation request
+        quiet: Skip the per-request log/progress/result events (batches report progress as a whole)
+
+    Returns:
+        The response for the request; errors are reported in it rather than raised
+    """
+    trace_id = new_task_id()
+    with tracer.span(f"automate {request.target}.{request.action}", task_id=trace_id,
+                     attributes={"target": request.target, "action": request.action}) as span:
+        response = await run_traced_request(request, span, quiet)
+        response.trace_id = trace_id
+        if not response.success:
+            span.status = "error"
+            span.error = response.error or response.confirmation_message
+        return response
+
+async def run_traced_request(request: AutomationRequest, span: Span, quiet: bool) -> AutomationResponse:
     start_time = time.time()
     logger.info(f"Received automation request: {request.action} on {request.target}")
-    emit_log(f"Received request: {request.action} on {request.target}")
+    if not quiet:
+        with span.phase("events"):
+            emit_log(f"Received request: {request.action} on {request.target}")
     
     # Check if action is risky and requires confirmation
-    is_risky, confirmation_message = is_risky_action(request.action, request.target, request.parameters)
+    with span.phase("risk_check"):
+        blocked = check_risk(request.target, request.action, request.parameters,
+                             request.confirm_risky, request.confirmation_token)
     
-    if is_risky and not request.confirm_risky:
+    if blocked is not None:
         execution_time = time.time() - start_time
+        if blocked.decision == "deny":
+            return AutomationResponse(success=False, error=blocked.message, execution_time=execution_time)
         return AutomationResponse(
             success=False,
             requires_confirmation=True,
-            confirmation_message=confirmation_message,
+            confirmation_message=blocked.message,
+            confirmation_token=confirmation_tokens.issue([(request.target, request.action)]),
             execution_time=execution_time
         )
     
     try:
         # Route to appropriate automation module based on target
-        emit_log(f"Starting {request.target} automation: {request.action}")
-        emit_progress(1, 3, f"Initializing {request.action} on {request.target}")
+        if not quiet:
+            with span.phase("events"):
+                emit_log(f"Starting {request.target} automation: {request.action}")
+                emit_progress(1, 3, f"Initializing {request.action} on {request.target}")
         
-        if request.target.lower() == "email":
-            result = await email_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "excel":
-            result = await excel_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "browser":
-            result = await browser_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "system":
-            result = await system_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "ocr":
-            result = await ocr_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "files":
-            result = await file_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "word":
-            result = await word_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "outlook":
-            result = await outlook_automation.handle_action(request.action, request.parameters)
-        elif request.target.lower() == "clipboard":
-            result = await clipboard_automation.handle_action(request.action, request.parameters)
-        else:
-            emit_error(f"Unsupported target: {request.target}")
-            raise HTTPException(status_code=400, detail=f"Unsupported target: {request.target}")
+        # Records the "dispatch" and "handler" phases
+        result = await action_registry.dispatch(request.target, request.action, request.parameters)
         
         execution_time = time.time() - start_time
         logger.info(f"Completed {request.action} in {execution_time:.2f}s")
-        emit_progress(3, 3, f"Completed {request.action} successfully")
-        emit_result(True, result, f"Successfully completed {request.action} on {request.target}")
+        # Encoded once here; the event and the HTTP body both reuse the bytes
+        with span.phase("serialization"):
+            result_json = serialize(result)
+        if not quiet:
+            with span.phase("events"):
+                emit_progress(3, 3, f"Completed {request.action} successfully")
+                emit_result(True, result_json, f"Successfully completed {request.action} on {request.target}")
         
-        return AutomationResponse(
+        # The result came from our own handler; re-validating an arbitrary dict buys nothing
+        response = AutomationResponse.model_construct(
             success=True,
             result=result,
             execution_time=execution_time
         )
+        response._result_json = result_json
+        return response
     
     except Exception as e:
         logger.error(f"Error executing {request.action}: {str(e)}", exc_info=True)
         execution_time = time.time() - start_time
-        emit_error(f"Error executing {request.action}: {str(e)}")
+        if not quiet:
+            with span.phase("events"):
+                emit_error(f"Error executing {request.action}: {str(e)}")
         
         return AutomationResponse(
             success=False,
@@ -172,104 +480,446 @@ async def run_automation(request: AutomationRequest, background_tasks: Backgroun
             execution_time=execution_time
         )
 
+async def iterate_batch(batch: BatchRequest) -> AsyncIterator[BatchItemResult]:
+    """Run a batch and yield each item's result as it finishes"""
+    if batch.mode == "sequential":
+        concurrency = 1
+    else:
+        concurrency = max(1, min(batch.concurrency, SERVER_CONFIG["batch_max_concurrency"]))
+    semaphore = asyncio.Semaphore(concurrency)
+    state = {"stopped": False}
+
+    async def run_item(index: int, request: AutomationRequest) -> BatchItemResult:
+        # The semaphore wakes waiters in FIFO order, so items start in request order
+        async with semaphore:
+            if state["stopped"]:
+                return BatchItemResult(
+                    index=index,
+                    success=False,
+                    skipped=True,
+                    error="Skipped after an earlier request failed",
+                    execution_time=0.0
+                )
+            if request.confirmation_token is None and batch.confirmation_token is not None:
+                request = request.model_copy(update={"confirmation_token": batch.confirmation_token})
+            response = await execute_request(request, quiet=True)
+            if batch.stop_on_error and not response.success:
+                # Set before the slot is released so the next queued item sees it
+                state["stopped"] = True
+            item = BatchItemResult.model_construct(index=index, **dict(response))
+            item._result_json = response._result_json
+            return item
+
+    tasks = [asyncio.create_task(run_item(index, request)) for index, request in enumerate(batch.requests)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/automate/batch", response_model=BatchResponse)
+async def run_automation_batch(batch: BatchRequest):
+    total = len(batch.requests)
+    if total > SERVER_CONFIG["batch_max_items"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {total} requests; the limit is {SERVER_CONFIG['batch_max_items']}"
+        )
+
+    start_time = time.time()
+    emit_log(f"Received batch of {total} requests ({batch.mode})")
+    # One progress event per ~5% of the batch instead of four events per request
+    progress_every = max(1, total // 20)
+
+    async def ordered_results() -> AsyncIterator[BatchItemResult]:
+        finished = 0
+        pending: Dict[int, BatchItemResult] = {}
+        next_index = 0
+        async for item in iterate_batch(batch):
+            finished += 1
+            if finished % progress_every == 0 or finished == total:
+                emit_progress(finished, total, f"Completed {finished} of {total} batch requests")
+
+            if batch.order == "completion":
+                yield item
+                continue
+            # Hold results back until every earlier request has finished
+            pending[item.index] = item
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+    def summarize(results: List[BatchItemResult]) -> Dict[str, Any]:
+        succeeded = sum(1 for item in results if item.success)
+        return {
+            "success": succeeded == total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "execution_time": time.time() - start_time
+        }
+
+    if batch.stream:
+        async def ndjson_lines():
+            results: List[BatchItemResult] = []
+            async for item in ordered_results():
+                results.append(item)
+                yield item.to_json().data + b"\n"
+            summary = summarize(results)
+            emit_result(summary["success"], summary, f"Batch finished: {summary['succeeded']} of {total} succeeded")
+            yield dumps({"summary": summary}) + b"\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    results = [item async for item in ordered_results()]
+    results.sort(key=lambda item: item.index)
+    summary = summarize(results)
+    emit_result(summary["success"], summary, f"Batch finished: {summary['succeeded']} of {total} succeeded")
+    return FastJSONResponse(json_object({"results": json_array(item.to_json() for item in results), **summary}))
+
+def register_automation_task(task_id: str, request: Dict[str, Any], **fields: Any):
+    """Record a task as queued before it is handed to the worker pool"""
+    running_tasks.put(task_id, {
+        "status": "queued",
+        "start_time": time.time(),
+        "request": request,
+        **fields
+    })
+
+async def run_work_item(item: WorkItem):
+    await execute_automation_task(task_id=item.task_id, **item.payload)
+
+def mark_task_cancelled(item: WorkItem):
+    running_tasks.update(item.task_id, status="cancelled", end_time=time.time())
+    emit_log(f"Cancelled task: {item.task_id}")
+
+# Bounded executor behind /automate/async and the scheduler
+worker_pool = WorkerPool(
+    run_work_item,
+    on_cancelled=mark_task_cancelled,
+    target_workers=SERVER_CONFIG["worker_target_counts"],
+    default_workers=SERVER_CONFIG["worker_default_count"],
+    max_queue_length=SERVER_CONFIG["worker_max_queue_length"]
+)
+
+def submit_automation_task(task_id: str, target: str, action: str, parameters: Dict[str, Any],
+                           request: Dict[str, Any], priority: int = 0, **fields: Any) -> "asyncio.Future[None]":
+    """
+    Register a task and queue it on the worker pool.
+
+    Raises:
+        ValueError: If the target or action is unknown (checked before anything is queued,
+            so bogus targets never get a queue or workers of their own)
+        QueueFullError: If the pool is saturated
+    """
+    action_registry.resolve(target, action)
+    register_automation_task(task_id, request, **fields)
+    try:
+        return worker_pool.submit(
+            task_id,
+            target.lower(),
+            {"target": target, "action": action, "parameters": parameters},
+            priority=priority
+        )
+    except QueueFullError:
+        running_tasks.delete(task_id)
+        raise
+
 @app.post("/automate/async")
-async def run_automation_async(request: AutomationRequest, background_tasks: BackgroundTasks):
-    task_id = f"{request.target}_{request.action}_{int(time.time())}"
+async def run_automation_async(request: AutomationRequest):
+    task_id = new_task_id()
     
     # Check if action is risky and requires confirmation
-    is_risky, confirmation_message = is_risky_action(request.action, request.target, request.parameters)
+    blocked = check_risk(request.target, request.action, request.parameters,
+                         request.confirm_risky, request.confirmation_token)
     
-    if is_risky and not request.confirm_risky:
+    if blocked is not None:
+        if blocked.decision == "deny":
+            return {"task_id": task_id, "status": "denied", "error": blocked.message}
         return {
             "task_id": task_id,
             "status": "requires_confirmation",
-            "confirmation_message": confirmation_message
+            "confirmation_message": blocked.message,
+            "confirmation_token": confirmation_tokens.issue([(request.target, request.action)])
         }
     
-    # Add task to background tasks
-    background_tasks.add_task(
-        execute_automation_task, 
-        task_id=task_id,
-        target=request.target,
-        action=request.action,
-        parameters=request.parameters
-    )
-    
-    running_tasks[task_id] = {
-        "status": "running",
-        "start_time": time.time(),
-        "request": request.dict()
-    }
+    try:
+        submit_automation_task(
+            task_id,
+            request.target,
+            request.action,
+            request.parameters,
+            request.dict(),
+            priority=request.priority
+        )
+    except ValueError as e:
+        return {"task_id": task_id, "status": "failed", "error": str(e)}
+    except QueueFullError as e:
+        # Shed load instead of degrading every queued request
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": str(e.retry_after)},
+            content={"status": "rejected", "error": str(e), "retry_after": e.retry_after}
+        )
     
-    emit_log(f"Started background task: {task_id}")
+    emit_log(f"Queued background task: {task_id}")
     
     return {
         "task_id": task_id,
-        "status": "running"
+        "status": "queued"
     }
 
 @app.post("/workflow/execute")
 async def execute_workflow(workflow: Dict[str, Any], background_tasks: BackgroundTasks):
-    workflow_id = f"workflow_{int(time.time())}"
-    steps = workflow.get("steps", [])
+    workflow_id = new_task_id()
+    # Confirmation fields are per call; keeping them out of the definition keeps plans cacheable
+    confirm_risky = bool(workflow.get("confirm_risky", False))
+    confirmation_token = workflow.get("confirmation_token")
+    workflow = {key: value for key, value in workflow.items() if key not in ("confirm_risky", "confirmation_token")}
     
-    if not steps:
+    # Validate targets, actions, parameters and dependencies before any step runs
+    try:
+        plan = workflow_compiler.compile(workflow)
+    except WorkflowValidationError as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    
+    # Every risky step must be covered before any step runs
+    blocked = []
+    for step in plan.steps:
+        decision = check_risk(step.target, step.action, step.parameters, confirm_risky, confirmation_token)
+        if decision is not None:
+            blocked.append((step, decision))
+    denied = [f"Step {step.id}: {decision.message}" for step, decision in blocked if decision.decision == "deny"]
+    if denied:
+        return {
+            "success": False,
+            "error": " ".join(denied)
+        }
+    if blocked:
         return {
             "success": False,
-            "error": "Workflow must contain at least one step"
+            "requires_confirmation": True,
+            "confirmation_message": " ".join(f"Step {step.id}: {decision.message}" for step, decision in blocked),
+            "confirmation_token": confirmation_tokens.issue((step.target, step.action) for step, _ in blocked)
         }
     
     # Add workflow to background tasks
     background_tasks.add_task(
         execute_workflow_task,
         workflow_id=workflow_id,
-        steps=steps,
-        name=workflow.get("name", "Unnamed Workflow")
+        plan=plan
     )
     
-    running_tasks[workflow_id] = {
+    active_workflows.add(workflow_id)
+    running_tasks.put(workflow_id, {
         "status": "running",
         "start_time": time.time(),
-        "workflow": workflow
-    }
+        "workflow": workflow,
+        "plan_hash": plan.plan_hash
+    })
     
-    emit_log(f"Started workflow: {workflow.get('name', 'Unnamed Workflow')}")
+    emit_log(f"Started workflow: {plan.name}")
     
     return {
         "workflow_id": workflow_id,
         "status": "running"
     }
 
+@app.post("/workflow/{workflow_id}/resume")
+async def resume_workflow(workflow_id: str, background_tasks: BackgroundTasks):
+    """
+    Continue an interrupted or failed workflow from its checkpoints.
+
+    Steps that finished successfully are not run again: their stored results
+    are replayed, except for steps declared "replay": false, which run
+    again. The workflow's risky steps were confirmed when it was started.
+    """
+    record = running_tasks.get(workflow_id)
+    if record is None or "workflow" not in record:
+        raise HTTPException(status_code=404, detail=f"Workflow {workflow_id} not found")
+    if workflow_id in active_workflows:
+        raise HTTPException(status_code=409, detail=f"Workflow {workflow_id} is still running")
+    if record.get("status") == "completed" and record.get("steps_completed") == record.get("total_steps"):
+        raise HTTPException(status_code=409, detail=f"Workflow {workflow_id} already completed every step")
+    
+    try:
+        plan = workflow_compiler.compile(record["workflow"])
+    except WorkflowValidationError as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+    
+    checkpoints = workflow_checkpoints.completed(workflow_id, plan.plan_hash)
+    replay = {step.id: checkpoints[step.id] for step in plan.steps if step.replay and step.id in checkpoints}
+    
+    active_workflows.add(workflow_id)
+    background_tasks.add_task(
+        execute_workflow_task,
+        workflow_id=workflow_id,
+        plan=plan,
+        replay=replay
+    )
+    
+    running_tasks.update(
+        workflow_id,
+        status="running",
+        error=None,
+        resumed_at=time.time(),
+        resume_count=record.get("resume_count", 0) + 1
+    )
+    
+    emit_log(f"Resumed workflow: {plan.name} ({len(replay)} of {plan.total_steps} steps replayed)")
+    
+    return {
+        "workflow_id": workflow_id,
+        "status": "running",
+        "steps_replayed": len(replay)
+    }
+
+def build_scheduled_job(task_id: str, task_data: Dict[str, Any]) -> Job:
+    """Create a scheduler job from a /schedule/task payload or stored record"""
+    task = task_data.get("task") or {}
+    if not task.get("target") or not task.get("action"):
+        raise ValueError("Scheduled task must include task.target and task.action")
+
+    # Fail at scheduling time rather than on the first run
+    action_registry.resolve(task["target"], task["action"])
+
+    return Job(
+        task_id,
+        # Stored records anchor interval triggers on the un-jittered run time
+        parse_schedule(task_data.get("schedule"), task_data.get("scheduled_run", task_data.get("next_run"))),
+        task["target"],
+        task["action"],
+        task.get("parameters") or {},
+        misfire_grace_time=float(task_data.get("misfire_grace_time", SERVER_CONFIG["scheduler_misfire_grace_time"])),
+        misfire_policy=task_data.get("misfire_policy", "skip"),
+        coalesce=bool(task_data.get("coalesce", SERVER_CONFIG["scheduler_coalesce"])),
+        jitter=float(task_data.get("jitter", 0))
+    )
+
+async def run_scheduled_job(job: Job):
+    """Feed a due scheduled job into the same task runner as /automate/async"""
+    task_id = new_task_id()
+    request = {"target": job.target, "action": job.action, "parameters": job.parameters}
+    done = submit_automation_task(
+        task_id,
+        job.target,
+        job.action,
+        dict(job.parameters),
+        request,
+        scheduled_task_id=job.id
+    )
+    scheduled_tasks.update(job.id, last_task_id=task_id)
+    
+    emit_log(f"Queued scheduled task {job.id}: {job.action} on {job.target}")
+    # Hold the scheduler's per-target slot until the run has finished
+    await done
+
+def record_scheduled_run(job: Job, run: Dict[str, Any]):
+    """Persist run bookkeeping after the scheduler processes a due job"""
+    record = scheduled_tasks.get(job.id)
+    if record is None:
+        return
+    
+    fields = {
+        "next_run": run["next_run"],
+        "scheduled_run": run["scheduled_run"],
+        "run_count": record.get("run_count", 0) + run["runs_fired"],
+        "missed_count": record.get("missed_count", 0) + run["runs_missed"]
+    }
+    if run["last_run"] is not None:
+        fields["last_run"] = run["last_run"]
+    if run["next_run"] is None:
+        fields["status"] = "completed"
+    scheduled_tasks.update(job.id, **fields)
+
+scheduler = Scheduler(
+    run_scheduled_job,
+    on_update=record_scheduled_run,
+    target_limits=SERVER_CONFIG["scheduler_target_limits"],
+    default_target_limit=SERVER_CONFIG["scheduler_default_target_limit"]
+)
+
+def restore_scheduled_jobs():
+    """Re-register scheduled tasks persisted by a previous server run"""
+    restored = 0
+    cursor = None
+    while True:
+        page = scheduled_tasks.list(status="scheduled", limit=500, cursor=cursor)
+        for record in page["tasks"]:
+            try:
+                job = build_scheduled_job(record["id"], record)
+                # Resume from the stored run time so downtime is handled by the misfire policy;
+                # the un-jittered one, or jitter would be added again on every restart
+                scheduler.add_job(job, first_run=record.get("scheduled_run", record.get("next_run")))
+                restored += 1
+            except Exception as e:
+                logger.error(f"Could not restore scheduled task {record['id']}: {str(e)}")
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    
+    if restored:
+        logger.info(f"Restored {restored} scheduled tasks")
+
 @app.post("/schedule/task")
 async def schedule_task(task_data: Dict[str, Any]):
-    task_id = f"scheduled_{int(time.time())}"
+    task_id = new_task_id()
+    task = task_data.get("task") or {}
+    
+    try:
+        job = build_scheduled_job(task_id, task_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    scheduled_tasks[task_id] = {
-        "id": task_id,
-        "created_at": time.time(),
-        "next_run": task_data.get("next_run"),
+    # Scheduled runs execute unattended, so risky actions must be confirmed up front
+    blocked = check_risk(job.target, job.action, job.parameters,
+                         task_data.get("confirm_risky", False), task_data.get("confirmation_token"))
+    if blocked is not None:
+        if blocked.decision == "deny":
+            return {"task_id": task_id, "status": "denied", "error": blocked.message}
+        return {
+            "task_id": task_id,
+            "status": "requires_confirmation",
+            "confirmation_message": blocked.message,
+            "confirmation_token": confirmation_tokens.issue([(job.target, job.action)])
+        }
+    
+    next_run = scheduler.add_job(job)
+    scheduled_tasks.put(task_id, {
+        "next_run": next_run,
+        "scheduled_run": job.scheduled_run,
         "schedule": task_data.get("schedule"),
-        "task": task_data.get("task"),
-        "status": "scheduled"
-    }
+        "task": task,
+        "misfire_grace_time": job.misfire_grace_time,
+        "misfire_policy": job.misfire_policy,
+        "coalesce": job.coalesce,
+        "jitter": job.jitter,
+        "status": "scheduled" if next_run is not None else "completed"
+    })
     
-    emit_log(f"Scheduled new task: {task_data.get('task', {}).get('action', 'Unknown')}")
+    emit_log(f"Scheduled new task: {task.get('action', 'Unknown')}")
     
     return {
         "task_id": task_id,
-        "status": "scheduled"
+        "status": "scheduled",
+        "next_run": next_run
     }
 
 @app.get("/schedule/tasks")
-async def get_scheduled_tasks():
-    return {
-        "tasks": list(scheduled_tasks.values())
-    }
+async def get_scheduled_tasks(limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    return scheduled_tasks.list(limit=limit, cursor=cursor)
 
 @app.delete("/schedule/task/{task_id}")
 async def delete_scheduled_task(task_id: str):
-    if task_id in scheduled_tasks:
-        task = scheduled_tasks.pop(task_id)
+    scheduler.remove_job(task_id)
+    task = scheduled_tasks.delete(task_id)
+    if task is not None:
         return {
             "success": True,
             "task": task
@@ -280,182 +930,302 @@ async def delete_scheduled_task(task_id: str):
         "error": f"Task {task_id} not found"
     }
 
+@app.post("/tasks/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    task = running_tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    cancelled_state = worker_pool.cancel(task_id)
+    if cancelled_state is None:
+        return {
+            "success": False,
+            "error": f"Task {task_id} is {task.get('status')} and cannot be cancelled"
+        }
+    
+    return {
+        "success": True,
+        "task_id": task_id,
+        "cancelled_while": cancelled_state
+    }
+
+@app.get("/events")
+async def stream_events(
+    task_id: Optional[str] = None,
+    cursor: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of automation events.
+
+    Pass task_id to follow one task. Reconnecting clients resume after the
+    cursor query parameter or the standard Last-Event-ID header; without
+    either, the stream starts with the next event.
+    """
+    if cursor is None and last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+
+    async def event_stream():
+        if cursor is not None:
+            _, missed = event_bus.since(cursor, task_id)
+            if missed:
+                # The ring buffer has moved past the cursor; the client should refetch state
+                yield f"event: gap\ndata: {json.dumps({'cursor': cursor})}\n\n"
+
+        async for event in event_bus.subscribe(cursor, task_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"id: {event.id}\nevent: {event.name}\ndata: {event.data}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/tasks/{task_id}")
-async def get_task_status(task_id: str):
-    if task_id not in running_tasks:
+async def get_task_status(task_id: str, if_none_match: Optional[str] = Header(None)):
+    task = running_tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
     
-    return running_tasks[task_id]
+    # Pollers send back the ETag they last saw; an unchanged task costs a 304 with no body
+    etag = running_tasks.etag(task)
+    if if_none_match is not None and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    return FastJSONResponse(task, headers={"ETag": etag})
+
+@app.get("/tasks/{task_id}/wait")
+async def wait_for_task(task_id: str, timeout: float = Query(30.0, ge=0)):
+    """Hold the request until the task finishes or the timeout expires, then return the task"""
+    task = await running_tasks.wait(task_id, min(timeout, SERVER_CONFIG["task_wait_max_timeout"]))
+    if task is None:
+        raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
+    
+    return FastJSONResponse(task, headers={"ETag": running_tasks.etag(task)})
+
+@app.get("/tasks/{task_id}/trace")
+async def get_task_trace(task_id: str):
+    """Spans recorded for a task, workflow or /automate call, with time per phase"""
+    spans = tracer.get_trace(task_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail=f"No trace recorded for {task_id}")
+    
+    phase_totals: Dict[str, float] = {}
+    for span in spans:
+        for phase, duration in span["phase_totals"].items():
+            phase_totals[phase] = round(phase_totals.get(phase, 0.0) + duration, 6)
+    root = next((span for span in spans if span["parent_id"] is None), spans[0])
+    
+    return {
+        "task_id": task_id,
+        "trace_id": root["trace_id"],
+        "duration": root["duration"],
+        "spans": spans,
+        "phase_totals": phase_totals
+    }
+
+def parse_since(since: Optional[str]) -> Optional[float]:
+    """Accept either epoch seconds or an ISO 8601 timestamp"""
+    if not since:
+        return None
+    try:
+        return float(since)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(since).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid since value: {since}")
 
 @app.get("/tasks")
-async def list_tasks():
-    return running_tasks
+async def list_tasks(
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_results: bool = False
+):
+    return running_tasks.list(
+        status=status,
+        since=parse_since(since),
+        limit=limit,
+        cursor=cursor,
+        include_results=include_results
+    )
 
 async def execute_automation_task(task_id: str, target: str, action: str, parameters: Dict[str, Any]):
+    # Runs in its own asyncio task, so the tag only applies to this task's events
+    current_task_id.set(task_id)
+    start_time = time.time()
+    span = tracer.start_span(f"task {target}.{action}", task_id=task_id, attributes={"target": target, "action": action})
     try:
-        start_time = time.time()
+        with span.phase("serialization"):
+            running_tasks.update(task_id, status="running", start_time=start_time)
         logger.info(f"Starting background task {task_id}: {action} on {target}")
-        emit_log(f"Starting background task: {action} on {target}")
-        emit_progress(1, 3, f"Initializing {action} on {target}")
+        with span.phase("events"):
+            emit_log(f"Starting background task: {action} on {target}")
+            emit_progress(1, 3, f"Initializing {action} on {target}")
         
-        # Route to appropriate automation module based on target
-        if target.lower() == "email":
-            result = await email_automation.handle_action(action, parameters)
-        elif target.lower() == "excel":
-            result = await excel_automation.handle_action(action, parameters)
-        elif target.lower() == "browser":
-            result = await browser_automation.handle_action(action, parameters)
-        elif target.lower() == "system":
-            result = await system_automation.handle_action(action, parameters)
-        elif target.lower() == "ocr":
-            result = await ocr_automation.handle_action(action, parameters)
-        elif target.lower() == "files":
-            result = await file_automation.handle_action(action, parameters)
-        elif target.lower() == "word":
-            result = await word_automation.handle_action(action, parameters)
-        elif target.lower() == "outlook":
-            result = await outlook_automation.handle_action(action, parameters)
-        elif target.lower() == "clipboard":
-            result = await clipboard_automation.handle_action(action, parameters)
-        else:
-            raise ValueError(f"Unsupported target: {target}")
+        result = await action_registry.dispatch(target, action, parameters)
         
         execution_time = time.time() - start_time
-        emit_progress(3, 3, f"Completed {action} successfully")
-        emit_result(True, result, f"Successfully completed {action} on {target}")
+        with span.phase("events"):
+            emit_progress(3, 3, f"Completed {action} successfully")
+            emit_result(True, result, f"Successfully completed {action} on {target}")
         
         # Update task status
-        running_tasks[task_id] = {
-            "status": "completed",
-            "start_time": start_time,
-            "end_time": time.time(),
-            "execution_time": execution_time,
-            "result": result
-        }
+        with span.phase("serialization"):
+            running_tasks.put(task_id, {
+                "status": "completed",
+                "start_time": start_time,
+                "end_time": time.time(),
+                "execution_time": execution_time,
+                "result": result
+            })
         
         logger.info(f"Completed background task {task_id} in {execution_time:.2f}s")
     
     except Exception as e:
         logger.error(f"Error in background task {task_id}: {str(e)}", exc_info=True)
+        span.set_error(e)
         emit_error(f"Error in task {action}: {str(e)}")
         
         # Update task status with error
-        running_tasks[task_id] = {
+        running_tasks.put(task_id, {
             "status": "failed",
             "start_time": start_time,
             "end_time": time.time(),
             "execution_time": time.time() - start_time,
             "error": str(e)
-        }
+        })
+    
+    except asyncio.CancelledError as e:
+        # Status is recorded by the worker pool's cancellation callback
+        logger.info(f"Background task {task_id} cancelled")
+        span.set_error(e)
+        emit_error(f"Task {action} was cancelled", "cancelled")
+        raise
+    
+    finally:
+        span.end()
 
-async def execute_workflow_task(workflow_id: str, steps: List[Dict[str, Any]], name: str):
-    results = []
-    current_step = 1
-    total_steps = len(steps)
+async def execute_workflow_task(workflow_id: str, plan: WorkflowPlan,
+                                replay: Optional[Dict[str, Dict[str, Any]]] = None):
+    current_task_id.set(workflow_id)
+    active_workflows.add(workflow_id)
+    # Step spans are children of this one; each records where the step's time went
+    workflow_span = tracer.start_span(f"workflow {plan.name}", task_id=workflow_id,
+                                      attributes={"total_steps": plan.total_steps})
+    step_spans: Dict[str, Span] = {}
+    name = plan.name
+    total_steps = plan.total_steps
+    finished_steps = 0
+    outcome: Dict[str, Any] = {"results": [], "steps_completed": 0, "total_steps": total_steps}
     
     emit_log(f"Starting workflow: {name} with {total_steps} steps")
     emit_progress(0, total_steps, f"Starting workflow: {name}")
     
+    def on_step_start(step: PlanStep):
+        # Called inside the step's own task, so the span becomes current for its handler
+        span = tracer.start_span(f"step {step.index} {step.name}", attributes={
+            "step": step.index, "step_id": step.id, "target": step.target, "action": step.action
+        })
+        step_spans[step.id] = span
+        with span.phase("events"):
+            emit_log(f"Executing workflow step {step.index}/{total_steps}: {step.name}")
+    
+    def on_step_end(step: PlanStep, entry: Dict[str, Any]):
+        nonlocal finished_steps
+        finished_steps += 1
+        if entry.get("replayed"):
+            WORKFLOW_STEPS.inc(step.target, step.action, "replayed")
+            emit_progress(finished_steps, total_steps, f"Replayed: {step.name}")
+            return
+        WORKFLOW_STEPS.inc(step.target, step.action, "success" if entry["success"] else "failed")
+        span = step_spans.pop(step.id)
+        # Durable before the next step can build on it
+        with span.phase("serialization"):
+            workflow_checkpoints.record(workflow_id, plan.plan_hash, step.id, entry)
+        with span.phase("events"):
+            if entry["success"]:
+                emit_progress(finished_steps, total_steps, f"Completed: {step.name}")
+            else:
+                emit_error(f"Error in workflow step {step.name}: {entry['error']}")
+                if not step.continue_on_error:
+                    emit_log(f"Workflow {name} stopped at step {step.index} due to error")
+        if not entry["success"]:
+            span.status = "error"
+            span.error = entry["error"]
+        span.end()
+    
+    async def execute_step(step: PlanStep, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        # The handler was resolved when the plan was compiled
+        return await action_registry.invoke(step.target, step.action, step.handler, parameters)
+    
     try:
-        for step in steps:
-            step_name = step.get("name", f"Step {current_step}")
-            emit_log(f"Executing workflow step {current_step}/{total_steps}: {step_name}")
-            emit_progress(current_step, total_steps, f"Executing: {step_name}")
-            
-            target = step.get("target")
-            action = step.get("action")
-            parameters = step.get("parameters", {})
-            
-            try:
-                # Route to appropriate automation module based on target
-                if target.lower() == "email":
-                    result = await email_automation.handle_action(action, parameters)
-                elif target.lower() == "excel":
-                    result = await excel_automation.handle_action(action, parameters)
-                elif target.lower() == "browser":
-                    result = await browser_automation.handle_action(action, parameters)
-                elif target.lower() == "system":
-                    result = await system_automation.handle_action(action, parameters)
-                elif target.lower() == "ocr":
-                    result = await ocr_automation.handle_action(action, parameters)
-                elif target.lower() == "files":
-                    result = await file_automation.handle_action(action, parameters)
-                elif target.lower() == "word":
-                    result = await word_automation.handle_action(action, parameters)
-                elif target.lower() == "outlook":
-                    result = await outlook_automation.handle_action(action, parameters)
-                elif target.lower() == "clipboard":
-                    result = await clipboard_automation.handle_action(action, parameters)
-                else:
-                    raise ValueError(f"Unsupported target: {target}")
-                
-                # Store result
-                step_result = {
-                    "step": current_step,
-                    "name": step_name,
-                    "success": True,
-                    "result": result
-                }
-                results.append(step_result)
-                
-                # Check if we need to pass data to the next step
-                if current_step < total_steps and step.get("pass_result_to_next", False):
-                    next_step = steps[current_step]
-                    next_parameters = next_step.get("parameters", {})
-                    
-                    # Add result as a parameter to the next step
-                    next_parameters["previous_result"] = result
-                    steps[current_step]["parameters"] = next_parameters
-                
-            except Exception as e:
-                logger.error(f"Error in workflow step {current_step}: {str(e)}", exc_info=True)
-                emit_error(f"Error in workflow step {step_name}: {str(e)}")
-                
-                # Store error result
-                step_result = {
-                    "step": current_step,
-                    "name": step_name,
-                    "success": False,
-                    "error": str(e)
-                }
-                results.append(step_result)
-                
-                # Check if we should continue on error
-                if not step.get("continue_on_error", False):
-                    emit_log(f"Workflow {name} stopped at step {current_step} due to error")
-                    break
-            
-            current_step += 1
+        outcome = await run_workflow(
+            plan,
+            execute_step,
+            on_step_start=on_step_start,
+            on_step_end=on_step_end,
+            replay=replay
+        )
         
-        # Update workflow status
-        running_tasks[workflow_id] = {
-            "status": "completed",
-            "start_time": running_tasks[workflow_id]["start_time"],
-            "end_time": time.time(),
-            "execution_time": time.time() - running_tasks[workflow_id]["start_time"],
-            "results": results,
-            "steps_completed": current_step - 1,
-            "total_steps": total_steps
-        }
+        # Update workflow status; the definition stays in the record for /resume
+        with workflow_span.phase("serialization"):
+            start_time = running_tasks.get(workflow_id)["start_time"]
+            running_tasks.update(
+                workflow_id,
+                status="completed",
+                end_time=time.time(),
+                execution_time=time.time() - start_time,
+                results=outcome["results"],
+                steps_completed=outcome["steps_completed"],
+                steps_replayed=outcome["steps_replayed"],
+                total_steps=total_steps
+            )
+            if outcome["steps_completed"] == total_steps:
+                # Nothing left to resume
+                workflow_checkpoints.clear(workflow_id)
+        
+        with workflow_span.phase("events"):
+            emit_progress(total_steps, total_steps, f"Workflow {name} completed")
+            emit_result(True, {"steps": outcome["results"]}, f"Workflow {name} completed successfully")
         
-        emit_progress(total_steps, total_steps, f"Workflow {name} completed")
-        emit_result(True, {"steps": results}, f"Workflow {name} completed successfully")
+        WORKFLOW_DURATION.observe(time.time() - start_time, "completed")
+        for step, entry in zip(plan.steps, outcome["results"]):
+            if entry.get("skipped"):
+                WORKFLOW_STEPS.inc(step.target, step.action, "skipped")
         
     except Exception as e:
         logger.error(f"Error in workflow {workflow_id}: {str(e)}", exc_info=True)
+        workflow_span.set_error(e)
         emit_error(f"Error in workflow {name}: {str(e)}")
         
         # Update workflow status with error
-        running_tasks[workflow_id] = {
-            "status": "failed",
-            "start_time": running_tasks[workflow_id]["start_time"],
-            "end_time": time.time(),
-            "execution_time": time.time() - running_tasks[workflow_id]["start_time"],
-            "error": str(e),
-            "results": results,
-            "steps_completed": current_step - 1,
-            "total_steps": total_steps
-        }
+        start_time = running_tasks.get(workflow_id)["start_time"]
+        running_tasks.update(
+            workflow_id,
+            status="failed",
+            end_time=time.time(),
+            execution_time=time.time() - start_time,
+            error=str(e),
+            results=outcome["results"],
+            steps_completed=outcome["steps_completed"],
+            total_steps=total_steps
+        )
+        WORKFLOW_DURATION.observe(time.time() - start_time, "failed")
+    
+    finally:
+        active_workflows.discard(workflow_id)
+        # Steps still running when the workflow stopped never reached on_step_end
+        for span in step_spans.values():
+            span.status = "cancelled"
+            span.end()
+        workflow_span.end()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
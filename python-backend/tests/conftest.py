@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend runs from its own directory (python main.py), so its modules import as top-level packages
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from utils.fs_walk import WalkFilter, list_page
+
+def _touch(path, size=1):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+def _all_pages(directory, limit, **kwargs):
+    paths, cursor, pages = [], None, 0
+    while True:
+        page = list_page(directory, cursor=cursor, limit=limit, **kwargs)
+        paths.extend(f["path"] for f in page["files"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return paths, pages
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in ["b.txt", "a.txt", "c.pdf", ".hidden.txt", "sub/d.txt", "sub/deeper/e.pdf", "sub2/f.txt", "z.txt"]:
+        _touch(str(tmp_path / name))
+    os.makedirs(str(tmp_path / "empty"))
+    return str(tmp_path)
+
+def _expected(root, keep=lambda name: True):
+    found = []
+    for directory, _, names in os.walk(root):
+        found.extend(os.path.join(directory, name) for name in names if keep(name))
+    return sorted(found)
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 100])
+def test_pages_cover_every_file_once(tree, limit):
+    paths, pages = _all_pages(tree, limit, recursive=True)
+    assert sorted(paths) == _expected(tree)
+    assert len(paths) == len(set(paths))
+    assert pages == max(1, -(-len(paths) // limit))
+
+def test_flat_listing_skips_subdirectories(tree):
+    paths, _ = _all_pages(tree, 2)
+    assert sorted(paths) == sorted(os.path.join(tree, n) for n in ["a.txt", "b.txt", "c.pdf", ".hidden.txt", "z.txt"])
+
+def test_filters_apply_across_pages(tree):
+    walk_filter = WalkFilter(file_types=["txt"], include_hidden=False)
+    paths, _ = _all_pages(tree, 2, recursive=True, walk_filter=walk_filter)
+    assert sorted(paths) == _expected(tree, lambda name: name.endswith(".txt") and not name.startswith("."))
+
+def test_cursor_survives_changes_between_pages(tree):
+    first = list_page(tree, recursive=True, limit=3)
+    seen = [f["path"] for f in first["files"]]
+    # Remove the file the cursor points at and add files on both sides of it
+    os.remove(seen[-1])
+    _touch(os.path.join(tree, "0-before.txt"))
+    _touch(os.path.join(tree, "zz-after.txt"))
+
+    rest = []
+    cursor = first["next_cursor"]
+    while cursor is not None:
+        page = list_page(tree, recursive=True, cursor=cursor, limit=2)
+        rest.extend(f["path"] for f in page["files"])
+        cursor = page["next_cursor"]
+
+    assert not set(seen) & set(rest)
+    assert os.path.join(tree, "zz-after.txt") in rest
+    assert os.path.join(tree, "0-before.txt") not in rest
+    assert sorted(seen[:-1] + rest) == sorted(set(_expected(tree)) - {os.path.join(tree, "0-before.txt")})
+
+def test_last_full_page_has_no_cursor(tree):
+    total = len(_expected(tree))
+    assert list_page(tree, recursive=True, limit=total)["next_cursor"] is None
+    assert list_page(tree, recursive=True, limit=total - 1)["next_cursor"] is not None
+
+def test_cursor_is_bound_to_its_listing(tree):
+    cursor = list_page(tree, recursive=True, limit=2)["next_cursor"]
+    with pytest.raises(ValueError):
+        list_page(tree, recursive=False, cursor=cursor, limit=2)
+    with pytest.raises(ValueError):
+        list_page(tree, recursive=True, walk_filter=WalkFilter(file_types=["pdf"]), cursor=cursor, limit=2)
+    with pytest.raises(ValueError):
+        list_page(tree, recursive=True, cursor="junk", limit=2)
+
+def test_max_scanned_stops_early_but_keeps_cursor(tree):
+    walk_filter = WalkFilter(file_types=["pdf"])
+    page = list_page(tree, recursive=True, walk_filter=walk_filter, limit=100, max_scanned=1)
+    assert page["scanned"] == 1
+    paths, _ = _all_pages(tree, 100, recursive=True, walk_filter=walk_filter, max_scanned=1)
+    assert sorted(paths) == _expected(tree, lambda name: name.endswith(".pdf"))
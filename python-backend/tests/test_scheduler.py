@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.scheduler import (
+    MAX_CATCH_UP_RUNS, CronTrigger, IntervalTrigger, Job, OnceTrigger, Scheduler, parse_schedule
+)
+
+class CountingTrigger(IntervalTrigger):
+    def __init__(self, seconds, start):
+        super().__init__(seconds, start)
+        self.calls = 0
+
+    def next_after(self, after):
+        self.calls += 1
+        return super().next_after(after)
+
+def _process(job, now, scheduled_run, next_run=None):
+    """Run one due job through the scheduler and return its update and the number of submitted runs"""
+    submitted = []
+    updates = []
+
+    async def submit(job):
+        submitted.append(job.id)
+
+    async def main():
+        scheduler = Scheduler(submit, on_update=lambda job, update: updates.append(update))
+        job.scheduled_run = scheduled_run
+        job.next_run = next_run if next_run is not None else scheduled_run
+        scheduler._jobs[job.id] = job
+        scheduler._process_due(job, now)
+        while scheduler._running:
+            await asyncio.gather(*scheduler._running)
+
+    asyncio.run(main())
+    return updates[-1], len(submitted)
+
+@pytest.mark.parametrize("schedule", [
+    "interval:60",
+    ["interval"],
+    {"type": "interval", "seconds": None},
+    {"type": "interval", "seconds": "often"},
+    {"type": "interval", "seconds": 0},
+    {"type": "daily", "time": "9am"},
+    {"type": "daily", "time": "25:00"},
+    {"type": "monthly"},
+    {"type": "monthly", "date": "the 15th"},
+    {"type": "monthly", "date": "32"},
+    {"type": "once", "date": "tomorrow"},
+    {"type": "once"},
+    {"type": "custom", "cron": ["*/5", "*", "*", "*", "*"]},
+    {"type": "custom", "cron": "*/5 * *"},
+    {"type": "fortnightly"},
+])
+def test_parse_schedule_rejects_malformed_input(schedule):
+    with pytest.raises(ValueError):
+        parse_schedule(schedule)
+
+def test_parse_schedule_rejects_malformed_next_run():
+    with pytest.raises(ValueError):
+        parse_schedule({"type": "once"}, "soon")
+
+@pytest.mark.parametrize("date", ["2026-01-15", "15", 15])
+def test_monthly_schedule_accepts_date_or_day(date):
+    trigger = parse_schedule({"type": "monthly", "date": date, "time": "08:30"})
+    assert isinstance(trigger, CronTrigger)
+    assert trigger.expression == "30 8 15 * *"
+
+def test_parse_schedule_builds_triggers():
+    assert isinstance(parse_schedule(None, 1_700_000_000_000), OnceTrigger)
+    interval = parse_schedule({"type": "interval", "seconds": 300}, "2026-01-01T00:00:00")
+    assert interval.seconds == 300
+    assert parse_schedule({"type": "weekly", "days": [1, 3], "time": "09:05"}).expression == "5 9 * * 1,3"
+
+def test_interval_trigger_stays_on_grid():
+    trigger = IntervalTrigger(60, start=1000)
+    assert trigger.next_after(0) == 1000
+    assert trigger.next_after(1000) == 1060
+    assert trigger.next_after(1059.5) == 1060
+
+def test_run_delayed_by_jitter_is_not_missed():
+    now = time.time()
+    job = Job("j", IntervalTrigger(3600, start=now - 25), "system", "get_system_info", {},
+              misfire_grace_time=5, jitter=30)
+    # The job wakes at its jittered time, 25 seconds after the scheduled run
+    update, submitted = _process(job, now, scheduled_run=now - 25, next_run=now)
+    assert (update["runs_fired"], update["runs_missed"], submitted) == (1, 0, 1)
+
+def test_late_run_beyond_grace_and_jitter_is_missed():
+    now = time.time()
+    job = Job("j", IntervalTrigger(3600, start=now - 60), "system", "get_system_info", {},
+              misfire_grace_time=5, jitter=30)
+    update, submitted = _process(job, now, scheduled_run=now - 60)
+    assert (update["runs_fired"], update["runs_missed"], submitted) == (0, 1, 0)
+
+def test_run_once_policy_fires_late_run():
+    now = time.time()
+    job = Job("j", IntervalTrigger(3600, start=now - 600), "system", "get_system_info", {},
+              misfire_grace_time=5, misfire_policy="run_once")
+    update, submitted = _process(job, now, scheduled_run=now - 600)
+    assert (update["runs_fired"], update["runs_missed"], submitted) == (1, 0, 1)
+
+def test_catch_up_without_coalescing_fires_every_run():
+    now = time.time()
+    start = now - 95
+    job = Job("j", IntervalTrigger(10, start=start), "system", "get_system_info", {},
+              misfire_grace_time=3600, coalesce=False)
+    update, submitted = _process(job, now, scheduled_run=start)
+    assert (update["runs_fired"], update["runs_missed"], submitted) == (10, 0, 10)
+    assert update["scheduled_run"] == start + 100
+
+def test_long_downtime_skips_ahead_in_one_step():
+    now = time.time()
+    start = now - 1_000_000
+    trigger = CountingTrigger(1, start)
+    job = Job("j", trigger, "system", "get_system_info", {}, misfire_grace_time=3600, coalesce=False)
+    update, submitted = _process(job, now, scheduled_run=start)
+    assert now < update["scheduled_run"] <= now + 1
+    assert trigger.calls <= MAX_CATCH_UP_RUNS + 1
+    assert submitted == update["runs_fired"]
@@ -0,0 +1,80 @@
+import pytest
+
+from utils.task_ids import new_task_id, task_id_floor
+from utils.task_store import MemoryTaskBackend, SQLiteTaskBackend, TaskStore
+
+START = 1_700_000_000
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        backend = MemoryTaskBackend()
+    else:
+        backend = SQLiteTaskBackend(str(tmp_path / "tasks.db"))
+    return TaskStore(backend, cache_size=5)
+
+def _fill(store, count=25):
+    """Tasks created a second apart, every third one failed; returns their IDs oldest first"""
+    ids = []
+    for i in range(count):
+        task_id = task_id_floor(START + i)[:-1] + "1"
+        store.put(task_id, {
+            "status": "failed" if i % 3 == 0 else "completed",
+            "start_time": START + i,
+            "result": {"value": i}
+        })
+        ids.append(task_id)
+    return ids
+
+def _pages(store, limit, **kwargs):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = store.list(limit=limit, cursor=cursor, **kwargs)
+        ids.extend(task["id"] for task in page["tasks"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+@pytest.mark.parametrize("limit", [1, 4, 10, 25, 100])
+def test_pages_list_every_task_newest_first(store, limit):
+    ids = _fill(store)
+    listed, pages = _pages(store, limit)
+    assert listed == ids[::-1]
+    assert pages == len(ids) // limit + 1
+
+def test_status_filter_pages(store):
+    ids = _fill(store)
+    listed, _ = _pages(store, 3, status="failed")
+    assert listed == [task_id for i, task_id in enumerate(ids) if i % 3 == 0][::-1]
+
+def test_since_filter_pages(store):
+    ids = _fill(store)
+    listed, _ = _pages(store, 4, since=START + 10)
+    assert listed == ids[10:][::-1]
+
+def test_cursor_skips_tasks_created_after_the_first_page(store):
+    ids = _fill(store)
+    first = store.list(limit=5)
+    store.put(new_task_id(), {"status": "queued"})
+    rest = []
+    cursor = first["next_cursor"]
+    while cursor is not None:
+        page = store.list(limit=5, cursor=cursor)
+        rest.extend(task["id"] for task in page["tasks"])
+        cursor = page["next_cursor"]
+    assert [task["id"] for task in first["tasks"]] + rest == ids[::-1]
+
+def test_results_only_listed_on_request(store):
+    _fill(store, 3)
+    assert all("result" not in task for task in store.list()["tasks"])
+    assert [task["result"]["value"] for task in store.list(include_results=True)["tasks"]] == [2, 1, 0]
+
+def test_reads_past_the_cache_come_from_the_backend(store):
+    ids = _fill(store)
+    record = store.get(ids[0])
+    assert record["status"] == "failed"
+    assert record["result"] == {"value": 0}
+    assert record["created_at"] == START
+    assert store.count() == 25
+    assert store.count("failed") == 9
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from utils.file_index import FileIndex
+from utils.trigram_index import TrigramIndex, trigrams
+
+ROOT = os.path.abspath(os.sep + "docs")
+
+def _open(path):
+    return TrigramIndex(path, FileIndex(":memory:", []))
+
+def _add(index, name, text):
+    data = text.encode()
+    index._flush({os.path.join(ROOT, name): (len(data), 0.0, trigrams(data))}, [])
+
+def _remove(index, name):
+    index._flush({}, [os.path.join(ROOT, name)])
+
+def _found(index, pattern):
+    return [os.path.basename(path) for path in index.candidates(ROOT, pattern)]
+
+def _table_counts(index):
+    documents = index._conn.execute("SELECT COUNT(*) FROM trigram_docs").fetchone()[0]
+    return (documents,) + tuple(index._conn.execute(
+        "SELECT COUNT(DISTINCT trigram), COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM trigram_postings"
+    ).fetchone())
+
+def _counters(index):
+    return index.document_count, index.trigram_count, index.posting_blocks, index.posting_bytes
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "trigrams.db")
+
+def test_ids_are_not_reused_after_restart(db_path):
+    index = _open(db_path)
+    for i in range(5):
+        _add(index, f"f{i}.txt", f"shared text number{i}")
+    _remove(index, "f3.txt")
+    _remove(index, "f4.txt")
+    index._conn.close()
+
+    index = _open(db_path)
+    assert index.next_id == 6
+    _add(index, "new.txt", "shared text fresh")
+    assert index.flushes == 1
+    assert _found(index, "shared text") == ["f0.txt", "f1.txt", "f2.txt", "new.txt"]
+    assert _found(index, "number4") == []
+    assert _counters(index) == _table_counts(index)
+
+def test_next_id_recovered_from_postings_when_not_saved(db_path):
+    index = _open(db_path)
+    for i in range(3):
+        _add(index, f"f{i}.txt", f"text number{i}")
+    _remove(index, "f2.txt")
+    # Indexes written before next_id was saved only have the dead count
+    index._conn.execute("DELETE FROM trigram_meta WHERE key = 'next_id'")
+    index._conn.close()
+
+    assert _open(db_path).next_id == 4
+
+def test_compaction_drops_dead_ids(db_path):
+    index = _open(db_path)
+    for i in range(20):
+        _add(index, f"f{i}.txt", f"common words entry{i:02d}")
+    for i in range(0, 20, 2):
+        _add(index, f"f{i}.txt", f"rewritten entry{i:02d}")
+    _remove(index, "f1.txt")
+    before = _found(index, "common words")
+    assert index.dead == 11
+
+    assert index.compact(chunk_size=3)
+    assert index.dead == 0
+    assert _found(index, "common words") == before
+    assert _found(index, "rewritten") == sorted(f"f{i}.txt" for i in range(0, 20, 2))
+    assert _counters(index) == _table_counts(index)
+
+    index._conn.close()
+    index = _open(db_path)
+    assert index.dead == 0
+    assert index.next_id == 31
+    assert _counters(index) == _table_counts(index)
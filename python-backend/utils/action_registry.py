@@ -0,0 +1,285 @@
+import ast
+import functools
+import importlib
+import inspect
+import logging
+import re
+import textwrap
+import time
+from types import ModuleType
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+from utils.metrics import ACTION_LATENCY, ACTIONS_IN_FLIGHT, ACTION_ERRORS
+from utils.result_cache import ResultCache
+from utils.single_flight import SingleFlight
+from utils.tracing import trace_phase
+
+logger = logging.getLogger("action-registry")
+
+ActionHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+class UnsupportedTargetError(ValueError):
+    """Raised when a request names a target that has no automation module"""
+
+class UnsupportedActionError(ValueError):
+    """Raised when a target exists but does not implement the requested action"""
+
+class ActionRegistry:
+    """
+    Pre-built (target, action) -> coroutine lookup table shared by every endpoint.
+
+    Targets are registered by module path and imported on their first request,
+    so server startup does not pay for every automation backend. Once a target
+    is loaded, dispatching a request is a single dict lookup instead of an
+    if/elif chain over targets followed by a per-module action_map rebuild.
+    """
+
+    def __init__(self, modules: Dict[str, str], result_cache: Optional[ResultCache] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        self.result_cache = result_cache
+        self.single_flight = single_flight
+        self._handlers: Dict[Tuple[str, str], ActionHandler] = {}
+        self._module_paths: Dict[str, str] = {target.lower(): path for target, path in modules.items()}
+        self._modules: Dict[str, ModuleType] = {}
+        self._load_times: Dict[str, float] = {}
+        self._descriptions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._capabilities: Optional[Dict[str, Any]] = None
+
+    def load_target(self, target: str) -> ModuleType:
+        """
+        Import a target's automation module and register its actions.
+
+        Args:
+            target: The automation target (e.g. "files")
+
+        Returns:
+            The loaded automation module
+        """
+        target = target.lower()
+        module = self._modules.get(target)
+        if module is not None:
+            return module
+
+        if target not in self._module_paths:
+            raise UnsupportedTargetError(f"Unsupported target: {target}")
+
+        start_time = time.perf_counter()
+        module = importlib.import_module(self._module_paths[target])
+        load_time = time.perf_counter() - start_time
+
+        for action, handler in module.ACTION_MAP.items():
+            self._handlers[(target, action.lower())] = as_coroutine(handler)
+        self._modules[target] = module
+        self._load_times[target] = load_time
+        self._capabilities = None
+
+        logger.info(f"Loaded {target} automation module in {load_time * 1000:.1f}ms")
+        return module
+
+    def load_all(self) -> None:
+        for target in self._module_paths:
+            self.load_target(target)
+
+    @property
+    def targets(self) -> List[str]:
+        return list(self._module_paths)
+
+    def load_times(self) -> Dict[str, Any]:
+        """Import time per loaded module, plus the targets not imported yet"""
+        return {
+            "loaded": {target: round(seconds, 4) for target, seconds in self._load_times.items()},
+            "pending": [target for target in self._module_paths if target not in self._modules]
+        }
+
+    def resolve(self, target: str, action: str) -> ActionHandler:
+        """
+        Look up the coroutine for a target/action pair, importing the target on first use.
+
+        Args:
+            target: The automation target (e.g. "files")
+            action: The action name (e.g. "list_files")
+
+        Returns:
+            The coroutine function implementing the action
+        """
+        # Fast path: callers almost always send lower-case names already
+        handler = self._handlers.get((target, action))
+        if handler is not None:
+            return handler
+
+        key = (target.lower(), action.lower())
+        handler = self._handlers.get(key)
+        if handler is not None:
+            return handler
+
+        if key[0] not in self._modules:
+            self.load_target(key[0])
+            handler = self._handlers.get(key)
+            if handler is not None:
+                return handler
+
+        raise UnsupportedActionError(f"Unsupported {target} action: {action}")
+
+    async def dispatch(self, target: str, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Run an action through the registry"""
+        try:
+            with trace_phase("dispatch"):
+                handler = self.resolve(target, action)
+        except ValueError as e:
+            # Not labelled with the requested names, which would make label values unbounded
+            ACTION_ERRORS.inc("unknown", "unknown", type(e).__name__)
+            raise
+        return await self.invoke(target.lower(), action.lower(), handler, parameters)
+
+    async def invoke(self, target: str, action: str, handler: ActionHandler, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run an already-resolved handler.
+
+        A cached result is returned when there is one; otherwise identical
+        concurrent calls of a @coalescible action share a single execution.
+        Latency, in-flight count and errors are recorded per target and action,
+        and the time spent in the handler itself as the current span's
+        "handler" phase (absent on a cache hit).
+        """
+        start_time = time.perf_counter()
+        ACTIONS_IN_FLIGHT.inc(target)
+        try:
+            return await self._invoke(target, action, handler, parameters)
+        except Exception as e:
+            ACTION_ERRORS.inc(target, action, type(e).__name__)
+            raise
+        finally:
+            ACTIONS_IN_FLIGHT.dec(target)
+            ACTION_LATENCY.observe(time.perf_counter() - start_time, target, action)
+
+    async def _invoke(self, target: str, action: str, handler: ActionHandler, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        async def run_handler(parameters: Dict[str, Any]) -> Dict[str, Any]:
+            with trace_phase("handler"):
+                return await handler(parameters)
+
+        execute = run_handler
+        coalesce_key = getattr(handler, "coalesce_key", None)
+        if self.single_flight is not None and coalesce_key is not None:
+            single_flight = self.single_flight
+
+            async def execute(parameters: Dict[str, Any]) -> Dict[str, Any]:
+                key = (target, action, coalesce_key(parameters))
+                return await single_flight.run(key, lambda: run_handler(parameters))
+
+        if self.result_cache is None:
+            return await execute(parameters)
+        return await self.result_cache.run(target, action, handler, parameters, execute)
+
+    def describe(self, target: str, action: str) -> Dict[str, Any]:
+        """Describe one action and its parameters (computed once per action)"""
+        handler = self.resolve(target, action)
+        key = (target.lower(), action.lower())
+        description = self._descriptions.get(key)
+        if description is None:
+            description = describe_action(handler)
+            self._descriptions[key] = description
+        return description
+
+    def capabilities(self) -> Dict[str, Any]:
+        """Describe every registered action and the parameters it reads"""
+        if self._capabilities is None:
+            self.load_all()
+            targets: Dict[str, Any] = {}
+            for target, action in list(self._handlers):
+                actions = targets.setdefault(target, {"actions": {}})["actions"]
+                actions[action] = self.describe(target, action)
+            self._capabilities = {"targets": targets}
+
+        return self._capabilities
+
+def as_coroutine(handler: Callable[[Dict[str, Any]], Any]) -> ActionHandler:
+    """
+    Adapt a plain-function handler into a coroutine.
+
+    Coroutine handlers, including plain functions wrapped by @io_bound or
+    @cpu_bound (which already run in their pool), are returned unchanged.
+    Any other plain function is called directly on the event loop, so it
+    must not block.
+    """
+    if inspect.iscoroutinefunction(handler):
+        return handler
+
+    @functools.wraps(handler)
+    async def run_inline(parameters: Dict[str, Any]) -> Dict[str, Any]:
+        return handler(parameters)
+
+    return run_inline
+
+def _json_type(value: Any) -> Optional[str]:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, (list, tuple)):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return None
+
+def describe_action(handler: ActionHandler) -> Dict[str, Any]:
+    """
+    Build a parameter description for an action handler from its source.
+
+    Handlers read their inputs with parameters.get("name", default) and report
+    missing inputs with a "Missing required parameter" ValueError, so both the
+    parameter list and which parameters are required can be read from the AST.
+
+    Args:
+        handler: The action coroutine function
+
+    Returns:
+        A dict with the handler description and its parameters
+    """
+    description = inspect.getdoc(handler) or ""
+    handler = inspect.unwrap(handler)
+    parameters: Dict[str, Dict[str, Any]] = {}
+
+    try:
+        tree = ast.parse(textwrap.dedent(inspect.getsource(handler)))
+    except (OSError, TypeError, SyntaxError):
+        logger.warning(f"Could not read source for {getattr(handler, '__name__', handler)}")
+        return {"description": description, "parameters": parameters}
+
+    required_words = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and "Missing required parameter" in node.value:
+            required_words.update(re.findall(r"\w+", node.value.split(":", 1)[-1]))
+
+    for node in ast.walk(tree):
+        if not (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "get"
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == "parameters"
+            and node.args
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            continue
+
+        name = node.args[0].value
+        default = None
+        if len(node.args) > 1:
+            try:
+                default = ast.literal_eval(node.args[1])
+            except (ValueError, TypeError, SyntaxError):
+                # Computed defaults (e.g. os.path.join(...)) are described, not evaluated
+                default = None
+
+        parameters[name] = {
+            "type": _json_type(default),
+            "default": default,
+            "required": name in required_words
+        }
+
+    return {"description": description, "parameters": parameters}
@@ -0,0 +1,213 @@
+import asyncio
+import mmap
+import os
+import re
+import threading
+from typing import Dict, Any, Iterator, List, Sequence, Tuple
+
+from utils.executors import run_io
+
+# Leading bytes of common binary formats that may not contain a NUL early on
+BINARY_SIGNATURES = (
+    b"%PDF", b"PK\x03\x04", b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"\x1f\x8b", b"BZh",
+    b"\xfd7zXZ", b"7z\xbc\xaf", b"Rar!", b"\x7fELF", b"MZ", b"\xd0\xcf\x11\xe0", b"OggS",
+    b"ID3", b"fLaC", b"RIFF", b"\x00\x00\x01\x00", b"SQLite format 3"
+)
+SNIFF_BYTES = 8192
+# Newlines are counted in slices of this size, so a long gap between matches never copies much at once
+_COUNT_CHUNK = 1024 * 1024
+
+def is_binary(head: bytes) -> bool:
+    """Whether a file's first bytes look like a binary format rather than text"""
+    return head.startswith(BINARY_SIGNATURES) or b"\x00" in head
+
+class SearchState:
+    """Result budget and counters shared by the shards of one search"""
+
+    def __init__(self, max_results: int):
+        self.remaining = max_results
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+        self.files_searched = 0
+        self.bytes_searched = 0
+        self.binary_skipped = 0
+        self.errors = 0
+
+    def take(self) -> bool:
+        """Claim one result slot; False once the budget is spent"""
+        with self._lock:
+            if self.remaining <= 0:
+                self.stopped.set()
+                return False
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.stopped.set()
+            return True
+
+    def count(self, field: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+class ContentQuery:
+    """
+    A compiled content pattern searched directly in memory-mapped files.
+
+    Patterns are compiled to bytes regexes and run against the mmap itself,
+    so a file is never read into a Python string; only the lines around a
+    match are decoded. Case-sensitive literals use mmap.find instead of the
+    regex engine. Being bytes-based, case-insensitive matching folds ASCII
+    letters only, like grep -i in the C locale.
+    """
+
+    def __init__(self, pattern: str, regex: bool = False, case_sensitive: bool = False,
+                 context_lines: int = 1, max_line_length: int = 400):
+        if not pattern:
+            raise ValueError("Empty content pattern")
+        encoded = pattern.encode("utf-8")
+        self.literal = encoded if not regex and case_sensitive else None
+        try:
+            self.regex = re.compile(
+                encoded if regex else re.escape(encoded),
+                (0 if case_sensitive else re.IGNORECASE) | re.MULTILINE
+            )
+        except re.error as e:
+            raise ValueError(f"Invalid content pattern: {str(e)}")
+        self.context_lines = max(0, context_lines)
+        self.max_line_length = max_line_length
+
+    def _match_starts(self, mm: mmap.mmap) -> Iterator[Tuple[int, int]]:
+        """(match start, end of its line) for the first match on each matching line"""
+        size = len(mm)
+        position = 0
+        while position <= size:
+            if self.literal is not None:
+                start = mm.find(self.literal, position)
+                if start < 0:
+                    return
+            else:
+                match = self.regex.search(mm, position)
+                if match is None:
+                    return
+                start = match.start()
+            line_end = mm.find(b"\n", start)
+            line_end = size if line_end < 0 else line_end
+            yield start, line_end
+            position = line_end + 1
+
+    def _line(self, mm: mmap.mmap, start: int, end: int) -> str:
+        text = mm[start:min(end, start + self.max_line_length * 4)].decode("utf-8", errors="replace").rstrip("\r")
+        return text[:self.max_line_length]
+
+    def _context(self, mm: mmap.mmap, line_start: int, line_end: int) -> Tuple[List[str], List[str]]:
+        before: List[str] = []
+        end = line_start - 1
+        while len(before) < self.context_lines and end >= 0:
+            start = mm.rfind(b"\n", 0, end) + 1
+            before.insert(0, self._line(mm, start, end))
+            end = start - 1
+        after: List[str] = []
+        start = line_end + 1
+        while len(after) < self.context_lines and start < len(mm):
+            end = mm.find(b"\n", start)
+            end = len(mm) if end < 0 else end
+            after.append(self._line(mm, start, end))
+            start = end + 1
+        return before, after
+
+    def search_file(self, path: str, state: SearchState) -> List[Dict[str, Any]]:
+        """
+        Matching lines of one file, with line numbers and context.
+
+        Args:
+            path: File to search
+            state: Shared budget; searching stops as soon as it is spent
+
+        Returns:
+            One entry per matching line (line, column, text, before, after)
+        """
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return []
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if is_binary(mm[:SNIFF_BYTES]):
+                        state.count("binary_skipped")
+                        return []
+                    if hasattr(mmap, "MADV_SEQUENTIAL"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    state.count("files_searched")
+                    state.count("bytes_searched", len(mm))
+                    return self._scan(mm, state)
+        except (OSError, ValueError):
+            state.count("errors")
+            return []
+
+    def _scan(self, mm: mmap.mmap, state: SearchState) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        counted_to, line_number = 0, 1
+        for start, line_end in self._match_starts(mm):
+            if state.stopped.is_set() or not state.take():
+                break
+            # Newlines since the previous match, counted without copying the whole file at once
+            while counted_to < start:
+                chunk_end = min(start, counted_to + _COUNT_CHUNK)
+                line_number += mm[counted_to:chunk_end].count(b"\n")
+                counted_to = chunk_end
+            line_start = mm.rfind(b"\n", 0, start) + 1
+            before, after = self._context(mm, line_start, line_end) if self.context_lines else ([], [])
+            results.append({
+                "line": line_number,
+                "column": len(mm[line_start:start].decode("utf-8", errors="replace")) + 1,
+                "text": self._line(mm, line_start, line_end),
+                "before": before,
+                "after": after
+            })
+        return results
+
+def _search_shard(query: ContentQuery, paths: Sequence[str], state: SearchState) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    found = []
+    for path in paths:
+        if state.stopped.is_set():
+            break
+        lines = query.search_file(path, state)
+        if lines:
+            found.append((path, lines))
+    return found
+
+async def search_content(query: ContentQuery, paths: Sequence[str], max_results: int = 1000,
+                         shards: int = 4) -> Dict[str, Any]:
+    """
+    Search many files in parallel shards on the I/O thread pool.
+
+    Files are dealt round-robin into shards so large and small files spread
+    evenly; every shard checks the shared budget before each file and each
+    match, so all of them stop once max_results lines have been found.
+
+    Args:
+        query: The compiled pattern
+        paths: Files to search
+        max_results: Stop after this many matching lines
+        shards: Number of files searched concurrently
+
+    Returns:
+        A dict with the matches by file (in input order), whether the
+        max_results budget was used up, and counters
+    """
+    paths = list(paths)
+    state = SearchState(max_results)
+    shards = max(1, min(shards, len(paths)))
+    order = {path: position for position, path in enumerate(paths)}
+    shard_results = await asyncio.gather(*(
+        run_io(_search_shard, query, paths[shard::shards], state) for shard in range(shards)
+    )) if paths else []
+
+    files = sorted((found for shard in shard_results for found in shard), key=lambda found: order[found[0]])
+    return {
+        "files": [{"path": path, "lines": lines} for path, lines in files],
+        "line_count": sum(len(lines) for _, lines in files),
+        "truncated": state.stopped.is_set(),
+        "files_searched": state.files_searched,
+        "bytes_searched": state.bytes_searched,
+        "binary_skipped": state.binary_skipped,
+        "errors": state.errors
+    }
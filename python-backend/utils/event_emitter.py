@@ -1,27 +1,236 @@
-import json
-import subprocess
+import asyncio
+import contextvars
 import sys
-import os
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, Optional, List, AsyncIterator, Deque, Tuple
+
+from utils.serialization import json_object
+
+# Task the current coroutine is working on; events emitted while it is set are
+# tagged with it so /events subscribers can follow a single task
+current_task_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_task_id", default=None)
+
+class Event:
+    """
+    A published event; the JSON form is built once and reused by every consumer.
+
+    Payload values may be RawJSON (e.g. a result already serialized for the
+    HTTP response), which is embedded without being encoded again.
+    """
+
+    __slots__ = ("id", "name", "task_id", "timestamp", "payload", "data")
+
+    def __init__(self, event_id: int, name: str, task_id: Optional[str], payload: Dict[str, Any]):
+        self.id = event_id
+        self.name = name
+        self.task_id = task_id
+        self.timestamp = time.time()
+        self.payload = payload
+        self.data = json_object({
+            "__tauri_event": True,
+            "event": name,
+            "id": event_id,
+            "task_id": task_id,
+            "payload": json_object(payload)
+        }).data.decode("utf-8")
+
+class EventBus:
+    """
+    In-process event bus with a bounded ring buffer.
+
+    Events get increasing integer IDs that double as resume cursors. The most
+    recent buffer_size events are kept for subscribers that reconnect; older
+    ones are dropped. For the Tauri shell, events are also written to stdout,
+    batched so a burst of events costs one write and one flush instead of one
+    per event.
+    """
+
+    def __init__(self, buffer_size: int = 10000, flush_interval: float = 0.05,
+                 max_batch: int = 256, stdout: bool = True):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.stdout = stdout
+
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._pending: List[str] = []
+        self._flush_scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: List[asyncio.Future] = []
+        self.subscribers = 0
+        self.published = 0
+        self.flushes = 0
+
+    def configure(self, buffer_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                  stdout: Optional[bool] = None) -> None:
+        with self._lock:
+            if buffer_size is not None and buffer_size != self.buffer_size:
+                self.buffer_size = buffer_size
+                self._buffer = deque(self._buffer, maxlen=buffer_size)
+            if flush_interval is not None:
+                self.flush_interval = flush_interval
+            if stdout is not None:
+                self.stdout = stdout
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Bind the bus to the server's event loop so emits from worker threads can wake subscribers"""
+        self._loop = loop
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def publish(self, name: str, payload: Dict[str, Any], task_id: Optional[str] = None) -> Event:
+        """
+        Record an event, queue it for stdout and wake any waiting subscribers.
+
+        Safe to call from the event loop or from worker threads.
+        """
+        if task_id is None:
+            task_id = current_task_id.get()
+
+        with self._lock:
+            event = Event(self._next_id, name, task_id, payload)
+            self._next_id += 1
+            self._buffer.append(event)
+            self.published += 1
+            if self.stdout:
+                self._pending.append(f"__TAURI_EVENT__|{event.data}")
+                flush_now = len(self._pending) >= self.max_batch
+                schedule = not flush_now and not self._flush_scheduled
+                if schedule:
+                    self._flush_scheduled = True
+            else:
+                flush_now = schedule = False
+
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is not None and (loop is None or running is loop):
+            if schedule:
+                running.call_later(self.flush_interval, self.flush)
+            self._wake()
+        elif loop is not None and not loop.is_closed():
+            if schedule:
+                loop.call_soon_threadsafe(loop.call_later, self.flush_interval, self.flush)
+            loop.call_soon_threadsafe(self._wake)
+        elif schedule:
+            # No event loop to batch on (e.g. a script): write straight away
+            flush_now = True
+
+        if flush_now:
+            self.flush()
+        return event
+
+    def flush(self) -> None:
+        """Write every pending event line to stdout in a single write"""
+        with self._lock:
+            lines, self._pending = self._pending, []
+            self._flush_scheduled = False
+        if not lines:
+            return
+        try:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+            self.flushes += 1
+        except Exception as e:
+            print(f"Error emitting event: {str(e)}", file=sys.stderr, flush=True)
+
+    def _wake(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def since(self, cursor: int = 0, task_id: Optional[str] = None) -> Tuple[List[Event], bool]:
+        """
+        Buffered events after a cursor.
+
+        IDs in the buffer are consecutive, so the events after the cursor are
+        the last (last_id - cursor) entries; only that tail is copied, read
+        from the right end of the deque.
+
+        Returns:
+            The matching events, and whether the cursor cannot be resumed from:
+            events after it were already dropped, or it is ahead of the newest
+            event (e.g. issued before a server restart reset the IDs)
+        """
+        with self._lock:
+            last_id = self._next_id - 1
+            first_id = self._buffer[0].id if self._buffer else self._next_id
+            missed = cursor > last_id or (bool(self._buffer) and cursor < first_id - 1)
+            count = min(max(last_id - cursor, 0), len(self._buffer))
+            tail = list(islice(reversed(self._buffer), count))
+        tail.reverse()
+        if task_id is not None:
+            tail = [event for event in tail if event.task_id == task_id]
+        return tail, missed
+
+    async def subscribe(self, cursor: Optional[int] = None, task_id: Optional[str] = None,
+                        heartbeat: float = 15.0) -> AsyncIterator[Optional[Event]]:
+        """
+        Yield events after a cursor as they are published.
+
+        Starts from the newest event when no cursor is given. Yields None every
+        heartbeat seconds without events, so the caller can keep the connection alive.
+        """
+        if cursor is None or cursor > self.last_id:
+            # A cursor ahead of the newest event (IDs restart with the server) would
+            # hide every new event until the IDs caught up; since() reports it as missed
+            cursor = self.last_id
+
+        self.subscribers += 1
+        try:
+            while True:
+                scanned = self.last_id
+                events, _ = self.since(cursor, task_id)
+                if events:
+                    for event in events:
+                        yield event
+                    cursor = events[-1].id
+                    continue
+                # Nothing for this filter yet; skip past what was checked
+                cursor = max(cursor, scanned)
+
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                try:
+                    await asyncio.wait_for(waiter, timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.subscribers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "buffered": len(self._buffer),
+            "buffer_size": self.buffer_size,
+            "last_id": self.last_id,
+            "stdout_flushes": self.flushes,
+            "subscribers": self.subscribers
+        }
+
+event_bus = EventBus()
 
 def emit_event(event_name: str, payload: Dict[str, Any]) -> None:
     """
-    Emit an event to the Tauri frontend using stdout with a special format.
-    
+    Publish an event to the event bus (and through it, to the Tauri frontend).
+
     Args:
         event_name: The name of the event to emit
         payload: The data to send with the event
     """
     try:
-        # Format the event in a way that Tauri can recognize
-        event_data = {
-            "__tauri_event": True,
-            "event": event_name,
-            "payload": payload
-        }
-        
-        # Print to stdout with a special marker that Tauri will recognize
-        print(f"__TAURI_EVENT__|{json.dumps(event_data)}", flush=True)
+        event_bus.publish(event_name, payload)
     except Exception as e:
         print(f"Error emitting event: {str(e)}", file=sys.stderr, flush=True)
 
@@ -67,7 +276,7 @@ def emit_result(success: bool, result: Any, message: str = "") -> None:
     
     Args:
         success: Whether the operation was successful
-        result: The result data
+        result: The result data, or the result already serialized with serialize()
         message: Optional result message
     """
     payload = {
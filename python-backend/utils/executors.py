@@ -0,0 +1,184 @@
+import asyncio
+import functools
+import importlib
+import inspect
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger("executors")
+
+T = TypeVar("T")
+
+# Where blocking work is sent off the event loop:
+#   io  - blocking I/O (filesystem walks, IMAP/SMTP, workbook files), thread pool
+#   cpu - CPU-heavy work (OCR, table extraction), process pool
+
+def _call_declared(module: str, qualname: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+    # Process-pool entry point: the decorated name is bound to the async wrapper,
+    # so the original function is looked up by name and unwrapped in the worker
+    target: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        target = getattr(target, part)
+    return target.__wrapped__(*args, **kwargs)
+
+def _offload(mode: str) -> Callable[[Callable[..., T]], Callable[..., Awaitable[T]]]:
+    def decorator(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+        if inspect.iscoroutinefunction(func):
+            raise TypeError(
+                f"@{mode}_bound goes on the synchronous function doing the blocking work, "
+                f"not on the coroutine {func.__qualname__}"
+            )
+        if mode == "cpu" and "<locals>" in func.__qualname__:
+            raise TypeError(f"@cpu_bound functions must be module-level to reach the process pool: {func.__qualname__}")
+
+        @functools.wraps(func)
+        async def offloaded(*args: Any, **kwargs: Any) -> T:
+            if mode == "cpu":
+                return await _pools["cpu"].run(_call_declared, func.__module__, func.__qualname__, args, kwargs)
+            return await _pools["io"].run(func, *args, **kwargs)
+
+        return offloaded
+    return decorator
+
+# Wrap a synchronous function so that awaiting it runs it in the matching pool.
+# Used on blocking helpers (await helper(...) from a coroutine handler) or on a
+# plain-function handler itself; @cpu_bound functions must be module-level.
+io_bound = _offload("io")
+cpu_bound = _offload("cpu")
+
+def _timed_call(func: Callable[..., T], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[float, T]:
+    # Runs in the worker; returns when it actually started so queue wait can be measured
+    return time.time(), func(*args, **kwargs)
+
+class ExecutorPool:
+    """
+    A lazily created thread or process pool with usage metrics.
+
+    Tracks submitted/active/completed/failed calls, the time calls spent
+    waiting for a free worker and the time they spent running, so an
+    undersized pool shows up as queue wait rather than as a slow event loop.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.active = 0
+        self.peak_active = 0
+        self.completed = 0
+        self.failed = 0
+        self.queue_wait_total = 0.0
+        self.run_time_total = 0.0
+
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"automation-{self.name}")
+                    logger.info(f"Started {self.name} {self.kind} pool with {self.max_workers} workers")
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking callable in the pool and await its result.
+
+        Args:
+            func: The callable; for the process pool it must be a picklable module-level function
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Whatever func returns
+        """
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self.submitted += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+
+        try:
+            started_at, result = await loop.run_in_executor(
+                self.executor(), functools.partial(_timed_call, func, args, kwargs)
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.active -= 1
+
+        finished_at = time.time()
+        self.completed += 1
+        self.queue_wait_total += max(0.0, started_at - submitted_at)
+        self.run_time_total += max(0.0, finished_at - started_at)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed or 1
+        return {
+            "kind": self.kind,
+            "started": self._executor is not None,
+            "max_workers": self.max_workers,
+            "submitted": self.submitted,
+            "active": self.active,
+            "peak_active": self.peak_active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "average_queue_wait": round(self.queue_wait_total / finished, 4),
+            "average_run_time": round(self.run_time_total / finished, 4)
+        }
+
+_pools: Dict[str, ExecutorPool] = {
+    "io": ExecutorPool("io", "thread", min(32, (os.cpu_count() or 1) + 4)),
+    "cpu": ExecutorPool("cpu", "process", os.cpu_count() or 1),
+    # File copy/move workers hold a thread for a whole transfer
+    "transfer": ExecutorPool("transfer", "thread", 8)
+}
+
+def configure_executors(io_workers: Optional[int] = None, cpu_workers: Optional[int] = None,
+                        transfer_workers: Optional[int] = None) -> None:
+    """Resize the pools; only takes effect for pools that have not started yet"""
+    if io_workers:
+        _pools["io"].max_workers = max(1, io_workers)
+    if cpu_workers:
+        _pools["cpu"].max_workers = max(1, cpu_workers)
+    if transfer_workers:
+        _pools["transfer"].max_workers = max(1, transfer_workers)
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking I/O in the thread pool"""
+    return await _pools["io"].run(func, *args, **kwargs)
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run CPU-heavy work in the process pool (func and its arguments must be picklable)"""
+    return await _pools["cpu"].run(func, *args, **kwargs)
+
+async def run_transfer(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a file transfer worker in the transfer thread pool"""
+    return await _pools["transfer"].run(func, *args, **kwargs)
+
+def transfer_workers() -> int:
+    """Threads in the transfer pool; transfers running more workers would only queue"""
+    return _pools["transfer"].max_workers
+
+def executor_stats() -> Dict[str, Any]:
+    return {name: pool.stats() for name, pool in _pools.items()}
+
+def shutdown_executors() -> None:
+    for pool in _pools.values():
+        pool.shutdown()
@@ -0,0 +1,568 @@
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import functools
+import logging
+import os
+import re
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from utils.fs_walk import WalkFilter, decode_cursor, encode_cursor, query_hash
+
+logger = logging.getLogger("file-index")
+
+# inotify event bits (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+# IN_MODIFY is left out on purpose: it fires for every write() and a file
+# being written is picked up once by IN_CLOSE_WRITE instead
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+_EVENT_HEADER = struct.Struct("iIII")
+
+class Inotify:
+    """
+    Minimal inotify binding through ctypes (Linux only).
+
+    Watches are per directory; read() returns (directory, name, mask)
+    tuples and (None, None, IN_Q_OVERFLOW) when the kernel dropped events.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths: Dict[int, str] = {}
+        self.watches: Dict[str, int] = {}
+
+    def add_watch(self, path: str) -> bool:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code == errno.ENOSPC:
+                raise OSError(code, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return False
+        self.paths[wd] = path
+        self.watches[path] = wd
+        return True
+
+    def forget(self, path: str) -> None:
+        """Drop the watches of a directory and everything below it"""
+        prefix = path.rstrip(os.sep) + os.sep
+        for watched in [watched for watched in self.watches if watched == path or watched.startswith(prefix)]:
+            wd = self.watches.pop(watched)
+            self.paths.pop(wd, None)
+            self._rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[Optional[str], Optional[str], int]]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0")) if length else None
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, None, mask))
+                continue
+            directory = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                if directory is not None:
+                    self.paths.pop(wd, None)
+                    if self.watches.get(directory) == wd:
+                        del self.watches[directory]
+                continue
+            if directory is not None:
+                events.append((directory, name, mask))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+@functools.lru_cache(maxsize=64)
+def _compiled_glob(pattern: str, case_sensitive: int) -> "re.Pattern[str]":
+    return re.compile(fnmatch.translate(pattern), 0 if case_sensitive else re.IGNORECASE)
+
+def _glob_match(pattern: str, subject: str, case_sensitive: int) -> int:
+    return 1 if _compiled_glob(pattern, case_sensitive).match(subject) else 0
+
+def _sqlite_glob(pattern: str) -> str:
+    """fnmatch pattern -> SQLite GLOB pattern (only the negated class is spelled differently)"""
+    return pattern.replace("[!", "[^")
+
+def _inside(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+class FileIndex:
+    """
+    SQLite index of file metadata (path, size, mtime, extension, inode) under configured roots.
+
+    A background thread builds the index, keeps it current from inotify
+    events on Linux and reconciles it against the disk every
+    reconcile_interval seconds (the only update path where inotify is
+    unavailable, and the safety net when it drops events or runs out of
+    watches). Queries
+    only use a root once its first build has finished; until then callers
+    fall back to walking the tree.
+    """
+
+    def __init__(self, path: str, roots: Iterable[str], reconcile_interval: float = 300.0,
+                 use_inotify: bool = True, table: str = "file_index"):
+        self.path = path
+        self.table = table
+        self.reconcile_interval = reconcile_interval
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+
+        normalized = sorted({os.path.abspath(os.path.expanduser(root)) for root in roots if root})
+        # A root inside another root is already covered by it
+        self.roots = [root for root in normalized if not any(root != other and _inside(root, other) for other in normalized)]
+        self.ready: Set[str] = set()
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_function("glob_match", 3, _glob_match, deterministic=True)
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                path TEXT PRIMARY KEY,
+                dir TEXT NOT NULL,
+                name TEXT NOT NULL,
+                name_lower TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                inode INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS {table}_dir ON {table} (dir);
+            CREATE INDEX IF NOT EXISTS {table}_ext ON {table} (ext);
+            CREATE INDEX IF NOT EXISTS {table}_name ON {table} (name_lower);
+        """)
+        # Counted once here and kept current by every write, so stats() never scans the table
+        self.file_count = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._reconcile_requested = threading.Event()
+        self._inotify: Optional[Inotify] = None
+        # Called with (changed paths, removed paths) after each committed write;
+        # a removed path may be a directory, standing for everything below it
+        self.listeners: List[Callable[[List[str], List[str]], None]] = []
+
+        self.reconciles = 0
+        self.last_reconcile: Optional[float] = None
+        self.events_applied = 0
+        self.overflows = 0
+        self.queries = 0
+
+    # Writing
+
+    def _row(self, path: str, stat_result: os.stat_result) -> Tuple[Any, ...]:
+        directory, name = os.path.split(path)
+        return (path, directory, name, name.lower(), os.path.splitext(name)[1].lower(),
+                stat_result.st_size, stat_result.st_mtime, stat_result.st_ino)
+
+    def _write(self, upserts: List[Tuple[Any, ...]], deletes: List[str], delete_trees: List[str] = ()) -> None:
+        if not upserts and not deletes and not delete_trees:
+            return
+        with self._lock:
+            added = 0
+            self._conn.execute("BEGIN")
+            try:
+                if upserts:
+                    added += len(upserts) - self._count_existing([row[0] for row in upserts])
+                    self._conn.executemany(
+                        f"INSERT OR REPLACE INTO {self.table} (path, dir, name, name_lower, ext, size, mtime, inode) "
+                        f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)", upserts
+                    )
+                if deletes:
+                    added -= self._conn.executemany(
+                        f"DELETE FROM {self.table} WHERE path = ?", [(path,) for path in deletes]
+                    ).rowcount
+                for tree in delete_trees:
+                    prefix = tree.rstrip(os.sep) + os.sep
+                    added -= self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE path >= ? AND path < ?",
+                        (prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+                    ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.file_count += added
+        self._notify([row[0] for row in upserts], list(deletes) + list(delete_trees))
+
+    def _count_existing(self, paths: List[str]) -> int:
+        """How many of the paths already have rows (caller holds the lock)"""
+        existing = 0
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            existing += self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE path IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchone()[0]
+        return existing
+
+    def _notify(self, changed: List[str], removed: List[str]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(changed, removed)
+            except Exception as e:
+                logger.error(f"Error in file index listener: {str(e)}", exc_info=True)
+
+    def reconcile(self, root: str) -> Dict[str, int]:
+        """
+        Bring one root's rows in line with the disk.
+
+        Walks the tree with os.scandir, compares each directory's entries with
+        its rows and writes only the differences; on the first run this is the
+        initial build. Every directory visited is (re)watched by inotify.
+
+        Returns:
+            Counts of files seen, written and removed
+        """
+        counts = {"files": 0, "written": 0, "removed": 0}
+        seen_dirs: Set[str] = set()
+        pending_upserts: List[Tuple[Any, ...]] = []
+        pending_deletes: List[str] = []
+        stack = [root]
+        while stack and not self._stop.is_set():
+            directory = stack.pop()
+            seen_dirs.add(directory)
+            self._watch(directory)
+            current: Dict[str, os.stat_result] = {}
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                current[entry.name] = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+            with self._lock:
+                stored = {
+                    name: (size, mtime, inode) for name, size, mtime, inode in self._conn.execute(
+                        f"SELECT name, size, mtime, inode FROM {self.table} WHERE dir = ?", (directory,)
+                    )
+                }
+            for name, stat_result in current.items():
+                if stored.get(name) != (stat_result.st_size, stat_result.st_mtime, stat_result.st_ino):
+                    pending_upserts.append(self._row(os.path.join(directory, name), stat_result))
+            pending_deletes.extend(os.path.join(directory, name) for name in stored.keys() - current.keys())
+            counts["files"] += len(current)
+
+            if len(pending_upserts) + len(pending_deletes) >= 1000:
+                counts["written"] += len(pending_upserts)
+                counts["removed"] += len(pending_deletes)
+                self._write(pending_upserts, pending_deletes)
+                pending_upserts, pending_deletes = [], []
+
+        counts["written"] += len(pending_upserts)
+        counts["removed"] += len(pending_deletes)
+        self._write(pending_upserts, pending_deletes)
+
+        if not self._stop.is_set():
+            # Rows of directories that no longer exist
+            prefix = root.rstrip(os.sep) + os.sep
+            with self._lock:
+                stored_dirs = [row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT dir FROM {self.table} WHERE path >= ? AND path < ?",
+                    (prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+                )]
+            vanished = [directory for directory in stored_dirs if directory not in seen_dirs]
+            if vanished:
+                with self._lock:
+                    placeholders = ",".join("?" * len(vanished))
+                    removed = self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE dir IN ({placeholders})", vanished
+                    ).rowcount
+                    self.file_count -= removed
+                counts["removed"] += removed
+                self._notify([], vanished)
+        return counts
+
+    def _watch(self, directory: str) -> None:
+        if self._inotify is None or directory in self._inotify.watches:
+            return
+        try:
+            self._inotify.add_watch(directory)
+        except OSError as e:
+            logger.warning(f"Stopping inotify, falling back to periodic reconciliation: {e.strerror}")
+            self._inotify.close()
+            self._inotify = None
+
+    def _apply_events(self, events: List[Tuple[Optional[str], Optional[str], int]]) -> None:
+        """Re-stat the paths named by a batch of events and update their rows"""
+        changed: Set[str] = set()
+        for directory, name, mask in events:
+            if directory is None:
+                # Queue overflow: events were lost, only a full pass can tell what changed
+                self.overflows += 1
+                self._reconcile_requested.set()
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                changed.add(directory)
+            elif name is not None:
+                changed.add(os.path.join(directory, name))
+
+        upserts: List[Tuple[Any, ...]] = []
+        deletes: List[str] = []
+        trees: List[str] = []
+        new_directories: List[str] = []
+        for path in changed:
+            try:
+                stat_result = os.lstat(path)
+            except OSError:
+                # Gone: it may have been a file or a whole directory
+                deletes.append(path)
+                trees.append(path)
+                if self._inotify is not None:
+                    self._inotify.forget(path)
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                new_directories.append(path)
+            elif os.path.isfile(path) and not os.path.islink(path):
+                upserts.append(self._row(path, stat_result))
+        self._write(upserts, deletes, trees)
+        # Directories created or moved in are indexed (and watched) as a whole
+        for directory in new_directories:
+            self.reconcile(directory)
+        self.events_applied += len(changed)
+
+    # Background thread
+
+    def _run(self) -> None:
+        if self.use_inotify:
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify unavailable, using periodic reconciliation only: {str(e)}")
+
+        self._reconcile_all()
+        next_reconcile = time.time() + self.reconcile_interval
+        while not self._stop.is_set():
+            if self._reconcile_requested.is_set() or time.time() >= next_reconcile:
+                self._reconcile_requested.clear()
+                self._reconcile_all()
+                next_reconcile = time.time() + self.reconcile_interval
+                continue
+            if self._inotify is None:
+                self._stop.wait(min(1.0, max(0.0, next_reconcile - time.time())))
+                continue
+            try:
+                events = self._inotify.read(1.0)
+                if events:
+                    # Let a burst of changes (an unzip, a large copy) settle into one batch
+                    deadline = time.time() + 0.2
+                    while time.time() < deadline:
+                        more = self._inotify.read(max(0.0, deadline - time.time()))
+                        if not more:
+                            break
+                        events.extend(more)
+                    self._apply_events(events)
+            except Exception as e:
+                logger.error(f"Error applying file events: {str(e)}", exc_info=True)
+                self._reconcile_requested.set()
+
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _reconcile_all(self) -> None:
+        for root in self.roots:
+            if self._stop.is_set():
+                return
+            started = time.time()
+            try:
+                counts = self.reconcile(root)
+            except Exception as e:
+                logger.error(f"Error indexing {root}: {str(e)}", exc_info=True)
+                continue
+            if root not in self.ready and not self._stop.is_set():
+                self.ready.add(root)
+                logger.info(f"Indexed {counts['files']} files under {root} in {time.time() - started:.2f}s")
+            elif counts["written"] or counts["removed"]:
+                logger.info(f"Reconciled {root}: {counts['written']} updated, {counts['removed']} removed")
+        self.reconciles += 1
+        self.last_reconcile = time.time()
+
+    def start(self) -> None:
+        if self._thread is None and self.roots:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="file-index", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # Queries
+
+    def covers(self, directory: str) -> bool:
+        """Whether the directory lies under a root whose index is built"""
+        directory = os.path.abspath(directory)
+        return any(_inside(directory, root) for root in self.ready)
+
+    def _scope(self, directory: str, recursive: bool) -> Tuple[str, List[Any], str]:
+        directory = os.path.abspath(directory)
+        prefix = directory.rstrip(os.sep) + os.sep
+        if recursive:
+            return "path >= ? AND path < ?", [prefix, prefix[:-1] + chr(ord(os.sep) + 1)], prefix
+        return "dir = ?", [directory], prefix
+
+    def _select(self, conditions: List[str], params: List[Any], after: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        if after is not None:
+            conditions.append("path > ?")
+            params.append(after)
+        sql = (f"SELECT path, name, size, mtime FROM {self.table} WHERE {' AND '.join(conditions)} "
+               f"ORDER BY path LIMIT ?")
+        self.queries += 1
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [
+            {"name": name, "path": path, "size": size, "modified": datetime.fromtimestamp(mtime).isoformat()}
+            for path, name, size, mtime in rows
+        ]
+
+    def list(self, directory: str, recursive: bool, walk_filter: WalkFilter,
+             after: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Indexed files under a directory matching the filters, in path order.
+
+        Args:
+            directory: Directory to list
+            recursive: Include subdirectories
+            walk_filter: The same filters list_files applies while walking
+            after: Return only paths after this one (keyset pagination)
+            limit: Maximum rows
+        """
+        scope, params, prefix = self._scope(directory, recursive)
+        conditions = [scope]
+        if walk_filter.file_types:
+            conditions.append(f"ext IN ({','.join('?' * len(walk_filter.file_types))})")
+            params.extend(walk_filter.file_types)
+        if walk_filter.glob:
+            if walk_filter.glob_path:
+                conditions.append("glob_match(?, substr(path, ?), ?)")
+                params.extend([walk_filter.glob.replace(os.sep, "/"), len(prefix) + 1, int(walk_filter.case_sensitive)])
+            elif walk_filter.case_sensitive:
+                conditions.append("name GLOB ?")
+                params.append(_sqlite_glob(walk_filter.glob))
+            else:
+                conditions.append("name_lower GLOB ?")
+                params.append(_sqlite_glob(walk_filter.glob.lower()))
+        for column, operator, value in (("size", ">=", walk_filter.min_size), ("size", "<=", walk_filter.max_size),
+                                        ("mtime", ">=", walk_filter.modified_after), ("mtime", "<=", walk_filter.modified_before)):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                params.append(value)
+        if not walk_filter.include_hidden:
+            conditions.append(f"instr(substr(path, {len(prefix)}), '{os.sep}.') = 0")
+        return self._select(conditions, params, after, limit)
+
+    def page(self, directory: str, recursive: bool, walk_filter: WalkFilter,
+             cursor: Optional[str] = None, limit: int = 500) -> Dict[str, Any]:
+        """One page of list(), in the same shape as fs_walk.list_page and with its own cursors"""
+        query = query_hash(directory, recursive, walk_filter)
+        after = decode_cursor(cursor, query, "index")[0][0] if cursor else None
+        files = self.list(directory, recursive, walk_filter, after, limit + 1)
+        more = len(files) > limit
+        files = files[:limit]
+        return {
+            "directory": directory,
+            "recursive": recursive,
+            "files": files,
+            "file_count": len(files),
+            "source": "index",
+            "next_cursor": encode_cursor(((files[-1]["path"],), False), query, "index") if more else None
+        }
+
+    def iter_files(self, root: str, batch: int = 5000) -> Iterator[Tuple[str, int, float]]:
+        """(path, size, mtime) of every indexed file under a root, in path order"""
+        prefix = root.rstrip(os.sep) + os.sep
+        after = prefix
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT path, size, mtime FROM {self.table} WHERE path > ? AND path < ? ORDER BY path LIMIT ?",
+                    (after, prefix[:-1] + chr(ord(os.sep) + 1), batch)
+                ).fetchall()
+            yield from rows
+            if len(rows) < batch:
+                return
+            after = rows[-1][0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "roots": self.roots,
+            "ready": sorted(self.ready),
+            "files": self.file_count,
+            "inotify": self._inotify is not None,
+            "watches": len(self._inotify.watches) if self._inotify is not None else 0,
+            "events_applied": self.events_applied,
+            "overflows": self.overflows,
+            "reconciles": self.reconciles,
+            "last_reconcile": self.last_reconcile,
+            "queries": self.queries
+        }
+
+_index: Optional[FileIndex] = None
+
+def configure_file_index(path: str, roots: Iterable[str], reconcile_interval: float = 300.0,
+                         use_inotify: bool = True) -> Optional[FileIndex]:
+    """
+    Create the process-wide file index; None (and no indexing) without roots.
+
+    Args:
+        path: SQLite database file
+        roots: Directories to index
+        reconcile_interval: Seconds between full reconciliation passes
+        use_inotify: Follow changes through inotify where available
+    """
+    global _index
+    roots = [root for root in roots if root]
+    _index = FileIndex(path, roots, reconcile_interval, use_inotify) if roots else None
+    return _index
+
+def get_file_index() -> Optional[FileIndex]:
+    return _index
@@ -0,0 +1,309 @@
+import asyncio
+import errno
+import hashlib
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from utils.event_emitter import emit_progress
+from utils.executors import run_transfer, transfer_workers
+
+logger = logging.getLogger("file-transfer")
+
+CONFLICT_POLICIES = ("overwrite", "skip", "rename")
+# Bytes moved per kernel copy call; also how often a copy reports progress
+CHUNK_SIZE = 8 * 1024 * 1024
+# Kernel copy errors that mean "not supported here", so the next method is tried
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.ETXTBSY}
+
+class TransferProgress:
+    """Byte and file counters shared by the workers of one transfer"""
+
+    def __init__(self, total_files: int, total_bytes: int):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files_done = 0
+        self.bytes_done = 0
+        self.renamed = 0
+        self.copied = 0
+        self.skipped = 0
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def add_bytes(self, count: int) -> None:
+        with self._lock:
+            self.bytes_done += count
+
+    def file_done(self, method: str) -> None:
+        with self._lock:
+            self.files_done += 1
+            if method == "rename":
+                self.renamed += 1
+            else:
+                self.copied += 1
+
+    def file_skipped(self, size: int) -> None:
+        """Count a file left in place; its bytes are taken out of the total rather than counted as done"""
+        with self._lock:
+            self.files_done += 1
+            self.skipped += 1
+            self.total_bytes -= size
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-6)
+            return {
+                "files_done": self.files_done,
+                "files_total": self.total_files,
+                "files_skipped": self.skipped,
+                "bytes_done": self.bytes_done,
+                "bytes_total": self.total_bytes,
+                "bytes_per_second": int(self.bytes_done / elapsed)
+            }
+
+def _copy_range(source_fd: int, destination_fd: int, size: int, progress: TransferProgress) -> None:
+    """Copy inside the kernel with copy_file_range (reflinks on CoW filesystems)"""
+    offset = 0
+    while offset < size:
+        copied = os.copy_file_range(source_fd, destination_fd, min(CHUNK_SIZE, size - offset))
+        if copied == 0:
+            break
+        offset += copied
+        progress.add_bytes(copied)
+
+def _sendfile(source_fd: int, destination_fd: int, size: int, progress: TransferProgress) -> None:
+    """Copy inside the kernel with sendfile (file-to-file works on Linux 2.6.33+)"""
+    offset = 0
+    while offset < size:
+        sent = os.sendfile(destination_fd, source_fd, offset, min(CHUNK_SIZE, size - offset))
+        if sent == 0:
+            break
+        offset += sent
+        progress.add_bytes(sent)
+
+def _read_write(source_fd: int, destination_fd: int, progress: TransferProgress) -> None:
+    buffer = bytearray(1024 * 1024)
+    view = memoryview(buffer)
+    with open(source_fd, "rb", buffering=0, closefd=False) as source:
+        while True:
+            count = source.readinto(buffer)
+            if not count:
+                break
+            written = 0
+            while written < count:
+                written += os.write(destination_fd, view[written:count])
+            progress.add_bytes(count)
+
+def copy_contents(source: str, destination: str, progress: TransferProgress) -> str:
+    """
+    Copy a file's bytes and metadata, with the fastest method the platform allows.
+
+    The data goes to a temporary name next to the destination and is renamed
+    into place, so an interrupted copy never leaves a truncated file under
+    the real name.
+
+    Returns:
+        The method that copied the data (copy_file_range, sendfile or read_write)
+    """
+    partial = f"{destination}.partial-{os.getpid()}-{threading.get_ident()}"
+    method = "read_write"
+    with open(source, "rb") as source_file:
+        size = os.fstat(source_file.fileno()).st_size
+        try:
+            with open(partial, "wb") as destination_file:
+                source_fd, destination_fd = source_file.fileno(), destination_file.fileno()
+                done = False
+                for candidate, copy in (("copy_file_range", _copy_range), ("sendfile", _sendfile)):
+                    if not hasattr(os, candidate):
+                        continue
+                    try:
+                        copy(source_fd, destination_fd, size, progress)
+                        method, done = candidate, True
+                        break
+                    except OSError as e:
+                        if e.errno not in _UNSUPPORTED:
+                            raise
+                        # Start over with the next method
+                        progress.add_bytes(-os.lseek(destination_fd, 0, os.SEEK_CUR))
+                        os.lseek(source_fd, 0, os.SEEK_SET)
+                        os.lseek(destination_fd, 0, os.SEEK_SET)
+                        os.ftruncate(destination_fd, 0)
+                if not done:
+                    _read_write(source_fd, destination_fd, progress)
+            shutil.copystat(source, partial)
+            os.replace(partial, destination)
+        except BaseException:
+            try:
+                os.unlink(partial)
+            except OSError:
+                pass
+            raise
+    return method
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    buffer = bytearray(1024 * 1024)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+def _free_name(destination: str) -> str:
+    base, ext = os.path.splitext(destination)
+    counter = 1
+    while os.path.lexists(f"{base} ({counter}){ext}"):
+        counter += 1
+    return f"{base} ({counter}){ext}"
+
+def transfer_file(source: str, destination: str, mode: str, verify: bool, on_conflict: str,
+                  progress: TransferProgress) -> Dict[str, Any]:
+    """
+    Copy or move one file.
+
+    A move within a filesystem is a single rename and never touches the
+    data; across filesystems it is a copy followed by removing the source.
+
+    Args:
+        source: File to transfer
+        destination: Full destination path
+        mode: "copy" or "move"
+        verify: Compare SHA-256 checksums before reporting success (and before
+            removing the source of a cross-filesystem move)
+        on_conflict: "overwrite", "skip" or "rename" (to "name (1).ext") when the destination exists
+        progress: Shared counters
+
+    Returns:
+        The source, final destination, method and size
+    """
+    size = os.stat(source).st_size
+    if os.path.lexists(destination):
+        if os.path.samefile(source, destination):
+            raise ValueError("Source and destination are the same file")
+        if on_conflict == "skip":
+            progress.file_skipped(size)
+            return {"source": source, "destination": destination, "method": "skipped", "size": size}
+        if on_conflict == "rename":
+            destination = _free_name(destination)
+
+    method = None
+    if mode == "move":
+        try:
+            os.replace(source, destination)
+            method = "rename"
+            progress.add_bytes(size)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    if method is None:
+        method = copy_contents(source, destination, progress)
+        if verify and file_digest(source) != file_digest(destination):
+            os.unlink(destination)
+            raise OSError(errno.EIO, f"Checksum mismatch copying {source}")
+        if mode == "move":
+            os.unlink(source)
+
+    progress.file_done(method)
+    return {"source": source, "destination": destination, "method": method, "size": size}
+
+def _worker(jobs: "queue.SimpleQueue[Optional[Tuple[str, str]]]", mode: str, verify: bool, on_conflict: str,
+            progress: TransferProgress, created: Set[str], created_lock: threading.Lock) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    done: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+    while True:
+        job = jobs.get()
+        if job is None:
+            return done, failed
+        source, destination = job
+        try:
+            parent = os.path.dirname(destination)
+            if parent not in created:
+                os.makedirs(parent, exist_ok=True)
+                with created_lock:
+                    created.add(parent)
+            done.append(transfer_file(source, destination, mode, verify, on_conflict, progress))
+        except (OSError, ValueError) as e:
+            failed.append({"source": source, "destination": destination, "error": str(e)})
+
+async def run_transfers(pairs: List[Tuple[str, str, int]], mode: str = "copy", workers: int = 8, verify: bool = False,
+                        on_conflict: str = "overwrite", progress_interval: float = 0.5) -> Dict[str, Any]:
+    """
+    Copy or move many files with a bounded number of concurrent workers.
+
+    Workers run on their own thread pool, so a long transfer never takes
+    threads from other I/O, and pull from one queue, so a few large files
+    cannot hold up the rest. Progress (files and bytes) is sent
+    with emit_progress at most every progress_interval seconds.
+
+    Args:
+        pairs: (source, destination, size) for each file
+        mode: "copy" or "move"
+        workers: Files transferred at the same time, at most the transfer pool size
+        verify: Check SHA-256 checksums of copied data
+        on_conflict: What to do when a destination exists (see CONFLICT_POLICIES)
+        progress_interval: Minimum seconds between progress events
+
+    Returns:
+        A dict with the transferred files, the failures and totals
+    """
+    if mode not in ("copy", "move"):
+        raise ValueError(f"Unsupported transfer mode: {mode}")
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"on_conflict must be one of {', '.join(CONFLICT_POLICIES)}")
+
+    progress = TransferProgress(len(pairs), sum(size for _, _, size in pairs))
+    jobs: "queue.SimpleQueue[Optional[Tuple[str, str]]]" = queue.SimpleQueue()
+    for source, destination, _ in pairs:
+        jobs.put((source, destination))
+    workers = max(1, min(workers, len(pairs), transfer_workers()))
+    for _ in range(workers):
+        jobs.put(None)
+
+    def report() -> None:
+        snapshot = progress.snapshot()
+        emit_progress(snapshot["files_done"], snapshot["files_total"],
+                      f"{'Moved' if mode == 'move' else 'Copied'} {snapshot['files_done']} of {snapshot['files_total']} files",
+                      snapshot)
+
+    async def reporter() -> None:
+        last = None
+        while True:
+            await asyncio.sleep(progress_interval)
+            current = (progress.files_done, progress.bytes_done)
+            if current != last:
+                report()
+                last = current
+
+    created: Set[str] = set()
+    created_lock = threading.Lock()
+    ticker = asyncio.create_task(reporter())
+    try:
+        outcomes = await asyncio.gather(*(
+            run_transfer(_worker, jobs, mode, verify, on_conflict, progress, created, created_lock) for _ in range(workers)
+        )) if pairs else []
+    finally:
+        ticker.cancel()
+    report()
+
+    done = [entry for finished, _ in outcomes for entry in finished]
+    failed = [entry for _, entries in outcomes for entry in entries]
+    if failed:
+        logger.warning(f"{len(failed)} of {len(pairs)} file transfers failed")
+    snapshot = progress.snapshot()
+    return {
+        "files": done,
+        "failed": failed,
+        "bytes_transferred": snapshot["bytes_done"],
+        "renamed": progress.renamed,
+        "copied": progress.copied,
+        "skipped": progress.skipped,
+        "elapsed": round(time.time() - progress.started, 3),
+        "verified": verify
+    }
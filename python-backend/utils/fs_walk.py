@@ -0,0 +1,266 @@
+import base64
+import fnmatch
+import hashlib
+import heapq
+import json
+import os
+import re
+import stat
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+# Position in the walk: path components relative to the root, and whether the
+# last one is a directory that has been fully listed (otherwise it is a file)
+Position = Tuple[Tuple[str, ...], bool]
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Epoch seconds from a number or an ISO 8601 string"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(str(value)).timestamp()
+
+class WalkFilter:
+    """
+    File filters applied while walking, so rejected files are never collected.
+
+    Name-based checks (extension, glob, hidden) run first and need no
+    system call; size and modification-time checks use the DirEntry's cached
+    stat result.
+    """
+
+    def __init__(self, file_types: Sequence[str] = (), glob: Optional[str] = None,
+                 min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 modified_after: Any = None, modified_before: Any = None, include_hidden: bool = True,
+                 case_sensitive: bool = False):
+        self.file_types = tuple(
+            (ext if ext.startswith(".") else f".{ext}").lower() for ext in file_types or ()
+        )
+        self.glob = glob or None
+        # A pattern with a separator is matched against the path relative to the root
+        self.glob_path = bool(glob) and ("/" in glob or os.sep in glob)
+        self.case_sensitive = case_sensitive
+        self._glob = re.compile(fnmatch.translate(glob), 0 if case_sensitive else re.IGNORECASE) if glob else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_after = _timestamp(modified_after)
+        self.modified_before = _timestamp(modified_before)
+        self.include_hidden = include_hidden
+
+    def matches_name(self, name: str, relative_path: str) -> bool:
+        if not self.include_hidden and name.startswith("."):
+            return False
+        if self.file_types and os.path.splitext(name)[1].lower() not in self.file_types:
+            return False
+        if self._glob is not None:
+            subject = relative_path.replace(os.sep, "/") if self.glob_path else name
+            if not self._glob.match(subject):
+                return False
+        return True
+
+    def matches_stat(self, stat_result: os.stat_result) -> bool:
+        if self.min_size is not None and stat_result.st_size < self.min_size:
+            return False
+        if self.max_size is not None and stat_result.st_size > self.max_size:
+            return False
+        if self.modified_after is not None and stat_result.st_mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and stat_result.st_mtime > self.modified_before:
+            return False
+        return True
+
+    def fingerprint(self) -> Dict[str, Any]:
+        return {
+            "t": self.file_types, "g": self.glob, "s": [self.min_size, self.max_size],
+            "m": [self.modified_after, self.modified_before], "h": self.include_hidden, "c": self.case_sensitive
+        }
+
+def _scan_directory(path: str, include_hidden: bool, errors: List[str], after_file: Optional[str] = None,
+                 files: bool = True, directories: bool = True) -> Tuple[List[Tuple[str, os.DirEntry]], List[os.DirEntry]]:
+    """
+    One pass over a directory: its files named after after_file, as a heap
+    of (name, entry), and its subdirectories sorted by name.
+
+    Files before the cursor are dropped while scanning and the rest are only
+    heapified (linear), not sorted; the walk pops them in name order as a
+    page consumes them, so paging through a large flat directory costs one
+    scan per page instead of a full sort.
+    """
+    file_heap: List[Tuple[str, os.DirEntry]] = []
+    subdirectories: List[os.DirEntry] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    # Symlinked directories are not followed, so links cannot create cycles
+                    if entry.is_dir(follow_symlinks=False):
+                        if directories and (include_hidden or not entry.name.startswith(".")):
+                            subdirectories.append(entry)
+                    elif files and (after_file is None or entry.name > after_file) and entry.is_file():
+                        file_heap.append((entry.name, entry))
+                except OSError:
+                    continue
+    except OSError as e:
+        errors.append(f"{path}: {e.strerror or str(e)}")
+    # Names are unique within a directory, so entries themselves are never compared
+    heapq.heapify(file_heap)
+    subdirectories.sort(key=lambda entry: entry.name)
+    return file_heap, subdirectories
+
+def _walk(path: str, relative: Tuple[str, ...], recursive: bool, include_hidden: bool,
+          resume: Optional[Position], errors: List[str]) -> Iterator[Tuple[Position, Optional[os.DirEntry]]]:
+    """
+    Depth-first walk in a stable order: a directory's files by name, then its subdirectories by name.
+
+    Yields (position, entry) for every file and (position, None) after each
+    fully listed subdirectory, starting after the given position.
+    """
+    skip_files = False
+    after_file: Optional[str] = None
+    enter_directory: Optional[str] = None
+    after_directory: Optional[str] = None
+    if resume is not None:
+        components, is_directory = resume
+        head = components[0]
+        if len(components) > 1:
+            skip_files, enter_directory = True, head
+        elif is_directory:
+            skip_files, after_directory = True, head
+        else:
+            after_file = head
+
+    files, directories = _scan_directory(path, include_hidden, errors, after_file, not skip_files, recursive)
+    while files:
+        name, entry = heapq.heappop(files)
+        yield (relative + (name,), False), entry
+
+    if not recursive:
+        return
+
+    for entry in directories:
+        name = entry.name
+        if enter_directory is not None:
+            if name < enter_directory:
+                continue
+            if name == enter_directory:
+                yield from _walk(entry.path, relative + (name,), recursive, include_hidden, (resume[0][1:], resume[1]), errors)
+                yield (relative + (name,), True), None
+                continue
+        elif after_directory is not None and name <= after_directory:
+            continue
+        yield from _walk(entry.path, relative + (name,), recursive, include_hidden, None, errors)
+        yield (relative + (name,), True), None
+
+def query_hash(directory: str, recursive: bool, walk_filter: WalkFilter) -> str:
+    """Fingerprint of a listing's parameters; a cursor is only accepted by the listing that issued it"""
+    query = json.dumps([os.path.abspath(directory), recursive, walk_filter.fingerprint()], default=str)
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+
+def _load_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid cursor")
+    return data
+
+def encode_cursor(position: Position, query: str, source: str = "walk") -> str:
+    data = json.dumps({"p": list(position[0]), "d": position[1], "q": query, "s": source}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, query: str, source: str = "walk") -> Position:
+    data = _load_cursor(cursor)
+    try:
+        components = tuple(str(part) for part in data["p"])
+        is_directory = bool(data["d"])
+    except (KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if data.get("q") != query or data.get("s", "walk") != source:
+        raise ValueError("Cursor belongs to a listing with different parameters")
+    if not components:
+        raise ValueError("Invalid cursor")
+    return components, is_directory
+
+def cursor_source(cursor: str) -> str:
+    """Which listing issued a cursor: "walk" (this module) or "index" (the file index)"""
+    return str(_load_cursor(cursor).get("s", "walk"))
+
+def list_page(directory: str, recursive: bool = False, walk_filter: Optional[WalkFilter] = None,
+              cursor: Optional[str] = None, limit: int = 1000, max_scanned: int = 200000) -> Dict[str, Any]:
+    """
+    One page of a (possibly recursive) directory listing.
+
+    Only the directories on the path to the current position are held in
+    memory, so listing a tree of millions of files costs one page at a time.
+    The cursor encodes the last position reached rather than an offset, so
+    it stays valid when files are added or removed between pages.
+
+    Args:
+        directory: Directory to list
+        recursive: Descend into subdirectories (symlinked ones are not followed)
+        walk_filter: Filters applied during the walk
+        cursor: next_cursor from the previous page
+        limit: Maximum files in the page
+        max_scanned: Stop early after examining this many files, so a very
+            selective filter cannot hold a request for minutes; the page may
+            then hold fewer than limit files while next_cursor is still set
+
+    Returns:
+        A dict with the files, next_cursor (None at the end) and walk counters
+    """
+    if not os.path.isdir(directory):
+        raise ValueError(f"Not a directory: {directory}")
+    walk_filter = walk_filter or WalkFilter()
+    query = query_hash(directory, recursive, walk_filter)
+    resume = decode_cursor(cursor, query) if cursor else None
+
+    errors: List[str] = []
+    files: List[Dict[str, Any]] = []
+    scanned = 0
+    position: Optional[Position] = None
+    walker = _walk(directory, (), recursive, walk_filter.include_hidden, resume, errors)
+    needs_stat = any(value is not None for value in (
+        walk_filter.min_size, walk_filter.max_size, walk_filter.modified_after, walk_filter.modified_before
+    ))
+
+    exhausted = True
+    for position, entry in walker:
+        if entry is None:
+            continue
+        scanned += 1
+        relative_path = os.path.join(*position[0])
+        if walk_filter.matches_name(entry.name, relative_path):
+            try:
+                # Cached on the DirEntry; on Windows it came with the directory listing
+                stat_result = entry.stat()
+            except OSError:
+                stat_result = None
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode) and (
+                not needs_stat or walk_filter.matches_stat(stat_result)
+            ):
+                files.append({
+                    "name": entry.name,
+                    "path": entry.path,
+                    "size": stat_result.st_size,
+                    "modified": datetime.fromtimestamp(stat_result.st_mtime).isoformat()
+                })
+        if len(files) >= limit or scanned >= max_scanned:
+            # Only a file still to come makes another page worth fetching
+            exhausted = next((True for _, pending in walker if pending is not None), None) is None
+            break
+    walker.close()
+
+    return {
+        "directory": directory,
+        "recursive": recursive,
+        "files": files,
+        "file_count": len(files),
+        "scanned": scanned,
+        "next_cursor": encode_cursor(position, query) if position is not None and not exhausted else None,
+        "errors": errors
+    }
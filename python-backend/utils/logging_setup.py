@@ -0,0 +1,137 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from typing import Dict, Optional
+
+from utils.event_emitter import current_task_id
+from utils.serialization import dumps
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class TaskContextFilter(logging.Filter):
+    """Tags each record with the task it was logged for (None outside a task)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.task_id = current_task_id.get()
+        return True
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without touching the disk.
+
+    The message and traceback are rendered here, while the objects they refer
+    to still exist, but kept in separate fields so the JSON formatter can
+    emit the traceback as its own key.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, task_id and traceback"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "timestamp": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "task_id": getattr(record, "task_id", None)
+        }
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return dumps(entry).decode("utf-8")
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotates when the file exceeds max_bytes or when interval seconds have passed.
+
+    Backups are numbered (automation_server.log.1 is the newest) and at most
+    backup_count are kept, so the log directory has a fixed upper size.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: float):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        self.interval = interval
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self) -> float:
+        return time.time() + self.interval if self.interval > 0 else float("inf")
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at and os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = self._next_rollover()
+
+def configure_logging(path: str, level: str = "INFO", json_format: bool = True,
+                      max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                      rotate_interval: float = 24 * 3600,
+                      module_levels: Optional[Dict[str, str]] = None) -> None:
+    """
+    Route all logging through a queue to a background writer thread.
+
+    Handlers on the calling thread only enqueue records; the rotating file
+    and the console are written by a QueueListener, so a slow disk never
+    stalls the event loop.
+
+    Args:
+        path: Log file
+        level: Root log level
+        json_format: Write structured JSON lines to the file (the console stays plain text)
+        max_bytes: Rotate once the file reaches this size (0 disables size rotation)
+        backup_count: Rotated files to keep
+        rotate_interval: Rotate after this many seconds (0 disables time rotation)
+        module_levels: Per-logger levels, e.g. {"action-registry": "DEBUG"}
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    file_handler = SizeAndTimeRotatingFileHandler(path, max_bytes, backup_count, rotate_interval)
+    file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    queue_handler.addFilter(TaskContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(shutdown_logging)
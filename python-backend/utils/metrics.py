@@ -0,0 +1,191 @@
+import asyncio
+import bisect
+import logging
+import math
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger("metrics")
+
+# Seconds; automation actions range from sub-millisecond cache hits to minute-long OCR runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+# Evaluated at scrape time: a number, or {label values: number}
+Collector = Callable[[], Union[float, Dict[LabelValues, float]]]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+class _Value(Metric):
+    """
+    A single number per label set.
+
+    Can instead be backed by a collector evaluated at scrape time, so values
+    other components already track (queue depth, cache counters) cost nothing
+    on the hot path.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 collector: Optional[Collector] = None):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._collector = collector
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        values = self._values
+        if self._collector is not None:
+            try:
+                collected = self._collector()
+            except Exception as e:
+                logger.warning(f"Could not collect {self.name}: {str(e)}")
+                return []
+            values = collected if isinstance(collected, dict) else {(): collected}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(float(value))}"
+            for labels, value in list(values.items())
+        ]
+
+class Counter(_Value):
+    """Monotonic count per label set"""
+    kind = "counter"
+
+class Gauge(_Value):
+    """Current value per label set"""
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+class Histogram(Metric):
+    """Bucketed distribution per label set; an observation is a bisect and three additions"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum, count]
+        self._series: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self._series[labels] = series
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total, count) in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered in the Prometheus text exposition format.
+
+    Metrics are updated only from the event loop thread, so updates are plain
+    dict and list operations with no locking; rendering copies each series
+    before formatting it.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _add(self, metric: Metric) -> Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                collector: Optional[Collector] = None) -> Counter:
+        return self._add(Counter(name, help_text, labelnames, collector))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+              collector: Optional[Collector] = None) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames, collector))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            samples = metric.samples()
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# Recorded by the action registry for every dispatched action
+ACTION_LATENCY = metrics.histogram(
+    "automation_action_duration_seconds", "Time to run an automation action", ("target", "action")
+)
+ACTIONS_IN_FLIGHT = metrics.gauge(
+    "automation_actions_in_flight", "Automation actions currently running", ("target",)
+)
+ACTION_ERRORS = metrics.counter(
+    "automation_action_errors_total", "Failed automation actions by exception type", ("target", "action", "error_type")
+)
+EVENT_LOOP_LAG = metrics.histogram(
+    "automation_event_loop_lag_seconds", "How late the event loop ran a scheduled wake-up",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+EVENT_LOOP_LAG_LAST = metrics.gauge(
+    "automation_event_loop_lag_last_seconds", "Most recent event loop lag measurement"
+)
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Measure how late the loop wakes a sleeping task; a blocked loop shows up as lag"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple, Union, Awaitable
+
+from utils.serialization import dumps
+
+logger = logging.getLogger("result-cache")
+
+# Derives the cache key (or the paths a call touches) from an action's parameters
+KeyFunction = Callable[[Dict[str, Any]], Any]
+ScopeFunction = Callable[[Dict[str, Any]], Union[None, str, Iterable[str]]]
+
+def parameters_key(parameters: Dict[str, Any]) -> str:
+    """Canonical hash of a parameter dict, independent of key order"""
+    canonical = json.dumps(parameters, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def path_scope(*names: str) -> ScopeFunction:
+    """
+    Scope function returning the normalized paths held in the named parameters.
+
+    A missing or empty parameter stands for the working directory, which is
+    what the file handlers fall back to.
+    """
+    def scope(parameters: Dict[str, Any]) -> List[str]:
+        paths = []
+        for name in names:
+            value = parameters.get(name)
+            if not isinstance(value, str) or not value:
+                value = os.getcwd()
+            paths.append(os.path.normcase(os.path.abspath(value)))
+        return paths
+    return scope
+
+class CachePolicy:
+    def __init__(self, ttl: float, key: Optional[KeyFunction], scope: Optional[ScopeFunction]):
+        self.ttl = ttl
+        self.key = key or parameters_key
+        self.scope = scope
+
+class InvalidationPolicy:
+    def __init__(self, actions: Tuple[str, ...], scope: Optional[ScopeFunction]):
+        self.actions = actions
+        self.scope = scope
+
+def cacheable(ttl: float, key: Optional[KeyFunction] = None, scope: Optional[ScopeFunction] = None):
+    """
+    Declare a read-only action whose result can be reused for ttl seconds.
+
+    Args:
+        ttl: Seconds a result stays valid
+        key: Maps parameters to the cache key (default: canonical hash of all parameters)
+        scope: Maps parameters to the paths the result depends on, for invalidation
+    """
+    def decorator(func):
+        func.cache_policy = CachePolicy(ttl, key, scope)
+        return func
+    return decorator
+
+def invalidates(*actions: str, scope: Optional[ScopeFunction] = None):
+    """
+    Declare a mutating action that drops cached results of the same target when it succeeds.
+
+    Args:
+        *actions: Cached actions to drop (all of the target's actions if none are given)
+        scope: Maps parameters to the paths the action changes; only cached results whose
+            scope overlaps one of them are dropped. Without it, every matching entry is dropped.
+    """
+    def decorator(func):
+        func.cache_invalidates = InvalidationPolicy(tuple(action.lower() for action in actions), scope)
+        return func
+    return decorator
+
+def _as_paths(value: Union[None, str, Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    # No paths at all means "anything": an empty scope would never overlap
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return (value,)
+    return tuple(value) or None
+
+def _overlaps(first: str, second: str) -> bool:
+    # The same path, or one contains the other (a directory listing and a file inside it)
+    if first == second:
+        return True
+    shorter, longer = (first, second) if len(first) < len(second) else (second, first)
+    return longer.startswith(shorter.rstrip(os.sep) + os.sep)
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "scope")
+
+    def __init__(self, value: Any, expires_at: float, size: int, scope: Optional[Tuple[str, ...]]):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.scope = scope
+
+class ResultCache:
+    """
+    Read-through cache for action results, bounded by total serialized size.
+
+    Results of actions declared @cacheable are kept for their TTL and evicted
+    least-recently-used first once max_bytes is exceeded. When an action
+    declared @invalidates succeeds, cached results of the same target whose
+    paths overlap the paths it changed are dropped. Cached results are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max(1, max_bytes // 8)
+        self._entries: "OrderedDict[Tuple[str, str, Any], _Entry]" = OrderedDict()
+        # Bumped on every invalidation, so a read that overlapped a write is not stored
+        self._generations: Dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def run(self, target: str, action: str, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                  parameters: Dict[str, Any],
+                  execute: Optional[Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Run an action through the cache.
+
+        Args:
+            target: Lower-case automation target
+            action: Lower-case action name
+            handler: The action coroutine, whose declarations drive caching
+            parameters: The action parameters
+            execute: Runs the action on a cache miss (default: the handler itself)
+
+        Returns:
+            The cached or freshly computed result
+        """
+        if execute is None:
+            execute = handler
+        policy: Optional[CachePolicy] = getattr(handler, "cache_policy", None)
+        if policy is None:
+            result = await execute(parameters)
+        else:
+            key = (target, action, policy.key(parameters))
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > time.monotonic():
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return entry.value
+                self._remove(key)
+
+            self.misses += 1
+            generation = self._generations.get(target, 0)
+            result = await execute(parameters)
+            if self._generations.get(target, 0) == generation:
+                self._store(key, result, policy, parameters)
+
+        invalidation: Optional[InvalidationPolicy] = getattr(handler, "cache_invalidates", None)
+        if invalidation is not None:
+            scope = _as_paths(invalidation.scope(parameters)) if invalidation.scope else None
+            self.invalidate(target, invalidation.actions, scope)
+
+        return result
+
+    def _store(self, key: Tuple[str, str, Any], result: Any, policy: CachePolicy, parameters: Dict[str, Any]) -> None:
+        try:
+            size = len(dumps(result))
+        except (TypeError, ValueError):
+            return
+        if size > self.max_entry_bytes:
+            return
+
+        scope = _as_paths(policy.scope(parameters)) if policy.scope else None
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(result, time.monotonic() + policy.ttl, size, scope)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Tuple[str, str, Any]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def invalidate(self, target: str, actions: Tuple[str, ...] = (), scope: Optional[Tuple[str, ...]] = None) -> int:
+        """
+        Drop cached results of a target.
+
+        Args:
+            target: Lower-case automation target
+            actions: Only drop these actions (all when empty)
+            scope: Only drop entries whose paths overlap these (all when None)
+
+        Returns:
+            The number of entries dropped
+        """
+        self._generations[target] = self._generations.get(target, 0) + 1
+        stale = [
+            key for key, entry in self._entries.items()
+            if key[0] == target
+            and (not actions or key[1] in actions)
+            and (
+                scope is None
+                or entry.scope is None
+                or any(_overlaps(changed, cached) for changed in scope for cached in entry.scope)
+            )
+        ]
+        for key in stale:
+            self._remove(key)
+        self.invalidations += len(stale)
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached {target} results")
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
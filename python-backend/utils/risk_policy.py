@@ -0,0 +1,312 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import time
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("risk-policy")
+
+DECISIONS = ("allow", "confirm", "deny")
+
+# {name} or {name|default} in a rule message
+_TEMPLATE_FIELD = re.compile(r"\{(\w+)(?:\|([^}]*))?\}")
+# Message fields that do not depend on the request parameters
+_STATIC_FIELDS = ("target", "action")
+
+class RiskPolicyError(ValueError):
+    """Raised when a policy file is malformed"""
+
+class RiskDecision:
+    """Outcome of evaluating a request against the policy"""
+
+    __slots__ = ("decision", "message", "rule_id")
+
+    def __init__(self, decision: str, message: str = "", rule_id: Optional[str] = None):
+        self.decision = decision
+        self.message = message
+        self.rule_id = rule_id
+
+    @property
+    def allowed(self) -> bool:
+        return self.decision == "allow"
+
+ALLOW = RiskDecision("allow")
+
+def _normalize_path(path: str) -> str:
+    return os.path.normcase(os.path.abspath(os.path.expanduser(path)))
+
+def _inside(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+def _compile_predicate(name: str, spec: Any):
+    """Build a test for one parameter from its spec ({"equals": ...}, {"regex": ...}, ...)"""
+    if not isinstance(spec, dict):
+        spec = {"equals": spec}
+    tests = []
+    for kind, expected in spec.items():
+        if kind == "equals":
+            tests.append(lambda value, expected=expected: value == expected)
+        elif kind == "in":
+            options = list(expected)
+            tests.append(lambda value, options=options: value in options)
+        elif kind == "contains":
+            needle = str(expected).lower()
+            tests.append(lambda value, needle=needle: value is not None and needle in str(value).lower())
+        elif kind == "regex":
+            pattern = re.compile(expected, re.IGNORECASE)
+            tests.append(lambda value, pattern=pattern: value is not None and pattern.search(str(value)) is not None)
+        elif kind == "exists":
+            tests.append(lambda value, expected=bool(expected): (value is not None) == expected)
+        else:
+            raise RiskPolicyError(f"Unknown predicate {kind!r} for parameter {name}")
+
+    def predicate(parameters: Dict[str, Any]) -> bool:
+        value = parameters.get(name)
+        return all(test(value) for test in tests)
+    return predicate
+
+class Rule:
+    """
+    One compiled policy rule.
+
+    A rule applies to a request when its target and action matchers match
+    and, if given, every parameter predicate holds and some path parameter
+    lies outside the allow-list.
+    """
+
+    def __init__(self, index: int, spec: Dict[str, Any]):
+        self.index = index
+        self.id = spec.get("id") or f"rule-{index + 1}"
+        self.decision = spec.get("decision", "confirm")
+        if self.decision not in DECISIONS:
+            raise RiskPolicyError(f"Rule {self.id}: decision must be one of {', '.join(DECISIONS)}")
+
+        targets = spec.get("target", "*")
+        targets = [targets] if isinstance(targets, str) else list(targets)
+        self.targets = None if "*" in targets else tuple(target.lower() for target in targets)
+
+        actions = spec.get("actions", spec.get("action"))
+        if isinstance(actions, str):
+            actions = [actions]
+        self.actions = tuple(action.lower() for action in actions) if actions else None
+        self.action_contains = tuple(word.lower() for word in spec.get("action_contains", ()))
+        self.action_pattern = spec.get("action_pattern")
+
+        # Regex over "target\x1faction" for rules not indexable by exact names
+        self.pattern: Optional[str] = None
+        if self.action_contains or self.action_pattern:
+            target_part = "|".join(re.escape(target) for target in self.targets) if self.targets else "[^\x1f]*"
+            action_parts = [f".*{re.escape(word)}.*" for word in self.action_contains]
+            if self.action_pattern:
+                action_parts.append(f"(?:{self.action_pattern})")
+            if self.actions:
+                action_parts.extend(re.escape(action) for action in self.actions)
+            self.pattern = f"(?:{target_part})\x1f(?:{'|'.join(action_parts)})"
+        self.regex = re.compile(self.pattern, re.DOTALL) if self.pattern else None
+
+        self.predicates = [_compile_predicate(name, predicate) for name, predicate in spec.get("parameters", {}).items()]
+        paths = spec.get("paths") or {}
+        self.path_parameters = tuple(paths.get("parameters", ()))
+        self.allowed_roots = tuple(_normalize_path(root) for root in paths.get("allow", ()))
+
+        self.message = spec.get("message") or f"This action ({{action}}) is covered by policy {self.id}."
+        message_fields = {match.group(1) for match in _TEMPLATE_FIELD.finditer(self.message)}
+        # Decided by target and action alone, so the decision can be cached per (target, action)
+        self.static = not self.predicates and not self.path_parameters and message_fields <= set(_STATIC_FIELDS)
+
+    def matches_name(self, target: str, action: str) -> bool:
+        if self.regex is not None:
+            return self.regex.fullmatch(f"{target}\x1f{action}") is not None
+        return (self.targets is None or target in self.targets) and (self.actions is None or action in self.actions)
+
+    def matches_parameters(self, parameters: Dict[str, Any]) -> bool:
+        if not all(predicate(parameters) for predicate in self.predicates):
+            return False
+        if not self.path_parameters:
+            return True
+        for name in self.path_parameters:
+            value = parameters.get(name)
+            if isinstance(value, str) and value:
+                path = _normalize_path(value)
+                if not any(_inside(path, root) for root in self.allowed_roots):
+                    return True
+        return False
+
+    def decide(self, target: str, action: str, parameters: Dict[str, Any]) -> RiskDecision:
+        def field(match: "re.Match[str]") -> str:
+            name, default = match.group(1), match.group(2)
+            if name == "target":
+                return target
+            if name == "action":
+                return action
+            value = parameters.get(name)
+            return str(value) if value is not None else (default or "")
+
+        return RiskDecision(self.decision, _TEMPLATE_FIELD.sub(field, self.message), self.id)
+
+class RiskPolicy:
+    """
+    Declarative risk rules compiled for constant-time lookups.
+
+    Rules are checked in file order and the first applicable rule decides;
+    requests no rule applies to are allowed. Rules naming exact actions are
+    indexed by (target, action); keyword and pattern rules are folded into
+    one combined regex, so an action no pattern can match is ruled out with a
+    single search. The rules that can apply to a (target, action) are worked
+    out once and cached; when they do not look at parameters, so is the
+    decision.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], max_cached: int = 4096):
+        self.rules = [Rule(index, spec) for index, spec in enumerate(rules)]
+        self.max_cached = max_cached
+
+        self._exact: Dict[Tuple[str, str], List[Rule]] = {}
+        self._by_target: Dict[str, List[Rule]] = {}
+        self._wildcard: List[Rule] = []
+        self._pattern_rules: List[Rule] = []
+        for rule in self.rules:
+            if rule.regex is not None:
+                self._pattern_rules.append(rule)
+            elif rule.actions is None and rule.targets is None:
+                self._wildcard.append(rule)
+            elif rule.actions is None:
+                for target in rule.targets:
+                    self._by_target.setdefault(target, []).append(rule)
+            else:
+                for target in rule.targets or ("*",):
+                    for action in rule.actions:
+                        self._exact.setdefault((target, action), []).append(rule)
+
+        self._combined = (
+            re.compile("|".join(f"(?:{rule.pattern})" for rule in self._pattern_rules), re.DOTALL)
+            if self._pattern_rules else None
+        )
+        # (target, action) -> applicable rules, or the fixed decision when parameters cannot change it
+        self._cache: Dict[Tuple[str, str], Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "RiskPolicy":
+        """Load a JSON policy file ({"rules": [...]})"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RiskPolicyError(f"Could not read risk policy {path}: {str(e)}")
+        policy = cls(document.get("rules", []))
+        logger.info(f"Loaded {len(policy.rules)} risk rules from {path}")
+        return policy
+
+    def _candidates(self, target: str, action: str) -> List[Rule]:
+        candidates = list(self._exact.get((target, action), ()))
+        candidates += self._exact.get(("*", action), ())
+        candidates += self._by_target.get(target, ())
+        candidates += self._wildcard
+        if self._combined is not None and self._combined.search(f"{target}\x1f{action}"):
+            candidates += [rule for rule in self._pattern_rules if rule.matches_name(target, action)]
+        candidates.sort(key=lambda rule: rule.index)
+
+        # Rules after the first one that always applies can never decide
+        for position, rule in enumerate(candidates):
+            if rule.static:
+                return candidates[:position + 1]
+        return candidates
+
+    def evaluate(self, target: str, action: str, parameters: Dict[str, Any]) -> RiskDecision:
+        """
+        Decide whether a request may run.
+
+        Args:
+            target: The automation target
+            action: The action name
+            parameters: The action parameters
+
+        Returns:
+            The decision of the first applicable rule, or "allow"
+        """
+        key = (target.lower(), action.lower())
+        cached = self._cache.get(key)
+        if cached is None:
+            self.misses += 1
+            candidates = self._candidates(*key)
+            if not candidates:
+                cached = ALLOW
+            elif len(candidates) == 1 and candidates[0].static:
+                cached = candidates[0].decide(key[0], key[1], {})
+            else:
+                cached = candidates
+            if len(self._cache) >= self.max_cached:
+                self._cache.clear()
+            self._cache[key] = cached
+        else:
+            self.hits += 1
+
+        if isinstance(cached, RiskDecision):
+            return cached
+        for rule in cached:
+            if rule.matches_parameters(parameters):
+                return rule.decide(key[0], key[1], parameters)
+        return ALLOW
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rules": len(self.rules),
+            "pattern_rules": len(self._pattern_rules),
+            "cached_lookups": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+class ConfirmationTokens:
+    """
+    Short-lived, HMAC-signed proof that the user confirmed a set of actions.
+
+    A token names the (target, action) pairs it covers and when it expires,
+    so one confirmation can be reused by every matching item of a batch or
+    step of a workflow. Nothing is stored server-side.
+    """
+
+    def __init__(self, secret: Optional[bytes] = None, ttl: float = 300.0):
+        self.secret = secret or os.urandom(32)
+        self.ttl = ttl
+
+    def _sign(self, body: str) -> str:
+        return _b64encode(hmac.new(self.secret, body.encode("utf-8"), hashlib.sha256).digest()[:18])
+
+    def issue(self, actions: Iterable[Tuple[str, str]]) -> str:
+        """
+        Create a token for the given (target, action) pairs.
+
+        Returns:
+            The token string
+        """
+        scope = sorted({f"{target.lower()}.{action.lower()}" for target, action in actions})
+        body = _b64encode(json.dumps({"s": scope, "e": int(time.time() + self.ttl)}, separators=(",", ":")).encode("utf-8"))
+        return f"{body}.{self._sign(body)}"
+
+    def verify(self, token: Optional[str], target: str, action: str) -> bool:
+        """Whether the token is authentic, unexpired and covers this target and action"""
+        if not token:
+            return False
+        body, _, signature = token.partition(".")
+        if not hmac.compare_digest(signature, self._sign(body)):
+            return False
+        try:
+            claims = json.loads(_b64decode(body))
+        except ValueError:
+            return False
+        if claims.get("e", 0) < time.time():
+            return False
+        return f"{target.lower()}.{action.lower()}" in claims.get("s", ())
@@ -0,0 +1,435 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Set, Tuple
+
+logger = logging.getLogger("scheduler")
+
+# Upper bound on missed runs replayed one by one when coalescing is off
+MAX_CATCH_UP_RUNS = 100
+
+_MONTH_NAMES = {name: index + 1 for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])}
+_DAY_NAMES = {name: index for index, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+class Trigger:
+    """Computes the fire times of a job"""
+
+    def next_after(self, after: float) -> Optional[float]:
+        """Next fire time strictly after the given epoch time, or None when exhausted"""
+        raise NotImplementedError
+
+class OnceTrigger(Trigger):
+    def __init__(self, run_at: float):
+        self.run_at = run_at
+
+    def next_after(self, after: float) -> Optional[float]:
+        return self.run_at if self.run_at > after else None
+
+class IntervalTrigger(Trigger):
+    def __init__(self, seconds: float, start: Optional[float] = None):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+        self.start = start if start is not None else time.time()
+
+    def next_after(self, after: float) -> Optional[float]:
+        if after < self.start:
+            return self.start
+        periods = int((after - self.start) // self.seconds) + 1
+        next_run = self.start + periods * self.seconds
+        # Guard against float rounding landing exactly on `after`
+        if next_run <= after:
+            next_run += self.seconds
+        return next_run
+
+def _cron_value(text: str, names: Dict[str, int]) -> int:
+    return names[text] if text in names else int(text)
+
+def _parse_cron_field(field: str, low: int, high: int, names: Dict[str, int]) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.lower().split(","):
+        step = 1
+        has_step = "/" in part
+        if has_step:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"Invalid cron step: {step_text}")
+
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = _cron_value(start_text, names), _cron_value(end_text, names)
+        else:
+            start = _cron_value(part, names)
+            # "5/15" means every 15 starting at 5
+            end = high if has_step else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field out of range: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronTrigger(Trigger):
+    """
+    Standard five-field cron expression (minute hour day-of-month month day-of-week),
+    evaluated in local time. Day of week is 0-6 with 0 = Sunday (7 is also Sunday).
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: {expression}")
+
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59, {})
+        self.hours = _parse_cron_field(fields[1], 0, 23, {})
+        self.days = _parse_cron_field(fields[2], 1, 31, {})
+        self.months = _parse_cron_field(fields[3], 1, 12, _MONTH_NAMES)
+        self.weekdays = {day % 7 for day in _parse_cron_field(fields[4], 0, 7, _DAY_NAMES)}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        # datetime.weekday() is Monday = 0; cron is Sunday = 0
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        # Both restricted: cron fires when either matches
+        return day_match or weekday_match
+
+    def next_after(self, after: float) -> Optional[float]:
+        moment = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                year = moment.year + (moment.month == 12)
+                month = moment.month % 12 + 1
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment.timestamp()
+
+        return None
+
+def _epoch(value: Any) -> float:
+    """Accept epoch seconds, epoch milliseconds (as sent by the frontend) or ISO 8601"""
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        raise ValueError(f"Run time must be epoch seconds, epoch milliseconds or ISO 8601: {value}")
+
+def _time_of_day(value: Any) -> Tuple[int, int]:
+    """Hours and minutes of an "HH:MM" (or "HH:MM:SS") schedule time"""
+    parts = str(value).split(":")
+    try:
+        hours, minutes = int(parts[0]), int(parts[1])
+    except (IndexError, ValueError):
+        raise ValueError(f"Schedule time must be HH:MM: {value}")
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        raise ValueError(f"Schedule time out of range: {value}")
+    return hours, minutes
+
+def _day_of_month(value: Any) -> int:
+    """Day of a monthly schedule, from a YYYY-MM-DD date or the day number itself"""
+    try:
+        day = int(value) if str(value).isdigit() else datetime.fromisoformat(str(value)).day
+    except ValueError:
+        raise ValueError(f"Monthly schedule date must be YYYY-MM-DD or a day of the month: {value}")
+    if not 1 <= day <= 31:
+        raise ValueError(f"Day of the month out of range: {value}")
+    return day
+
+def parse_schedule(schedule: Optional[Dict[str, Any]], next_run: Any = None) -> Trigger:
+    """
+    Build a trigger from a schedule definition.
+
+    Args:
+        schedule: The schedule, e.g. {"type": "daily", "time": "09:30"},
+            {"type": "interval", "seconds": 300} or {"type": "custom", "cron": "*/5 * * * *"}
+        next_run: Explicit first run time, used for one-off schedules
+
+    Returns:
+        The trigger computing the job's run times
+
+    Raises:
+        ValueError: If the schedule is malformed
+    """
+    schedule = schedule or {}
+    if not isinstance(schedule, dict):
+        raise ValueError(f"Schedule must be an object, got {type(schedule).__name__}")
+    schedule_type = schedule.get("type", "once")
+    hours, minutes = 0, 0
+    if schedule.get("time"):
+        hours, minutes = _time_of_day(schedule["time"])
+
+    if schedule.get("cron"):
+        if not isinstance(schedule["cron"], str):
+            raise ValueError("Cron schedules must be a string expression")
+        return CronTrigger(schedule["cron"])
+
+    if schedule_type == "interval":
+        start = _epoch(next_run) if next_run is not None else None
+        try:
+            seconds = float(schedule.get("seconds", 0))
+        except (TypeError, ValueError):
+            raise ValueError(f"Interval seconds must be a number: {schedule.get('seconds')}")
+        return IntervalTrigger(seconds, start)
+
+    if schedule_type == "daily":
+        return CronTrigger(f"{minutes} {hours} * * *")
+
+    if schedule_type == "weekly":
+        days = ",".join(str(day) for day in schedule.get("days") or []) or "*"
+        return CronTrigger(f"{minutes} {hours} * * {days}")
+
+    if schedule_type == "monthly":
+        if not schedule.get("date"):
+            raise ValueError("Monthly schedules require a date")
+        return CronTrigger(f"{minutes} {hours} {_day_of_month(schedule['date'])} * *")
+
+    if schedule_type == "once":
+        if next_run is not None:
+            return OnceTrigger(_epoch(next_run))
+        if schedule.get("date"):
+            try:
+                run_at = datetime.fromisoformat(f"{schedule['date']}T{hours:02d}:{minutes:02d}")
+            except ValueError:
+                raise ValueError(f"One-off schedule date must be YYYY-MM-DD: {schedule['date']}")
+            return OnceTrigger(run_at.timestamp())
+        raise ValueError("One-off schedules require next_run or a date")
+
+    raise ValueError(f"Unsupported schedule type: {schedule_type}")
+
+class Job:
+    """A recurring or one-off automation registered with the scheduler"""
+
+    def __init__(self, job_id: str, trigger: Trigger, target: str, action: str,
+                 parameters: Dict[str, Any], misfire_grace_time: float = 60,
+                 misfire_policy: str = "skip", coalesce: bool = True, jitter: float = 0,
+                 max_instances: int = 1):
+        if misfire_policy not in ("skip", "run_once"):
+            raise ValueError(f"Unsupported misfire policy: {misfire_policy}")
+
+        self.id = job_id
+        self.trigger = trigger
+        self.target = target.lower()
+        self.action = action
+        self.parameters = parameters
+        self.misfire_grace_time = misfire_grace_time
+        self.misfire_policy = misfire_policy
+        self.coalesce = coalesce
+        self.jitter = jitter
+        self.max_instances = max_instances
+
+        # Un-jittered fire time from the trigger; next_run adds the jitter
+        self.scheduled_run: Optional[float] = None
+        self.next_run: Optional[float] = None
+        self.running = 0
+        self.version = 0
+
+    def plan(self, scheduled_run: Optional[float]) -> None:
+        self.scheduled_run = scheduled_run
+        if scheduled_run is None:
+            self.next_run = None
+        else:
+            self.next_run = scheduled_run + (random.uniform(0, self.jitter) if self.jitter else 0)
+
+class Scheduler:
+    """
+    In-process asyncio scheduler.
+
+    Jobs sit in a min-heap keyed on their next run time, so the loop sleeps
+    until the earliest job is due and each wake-up costs O(log n) rather than
+    a scan over every job. Removed or rescheduled jobs leave stale heap
+    entries that are skipped when popped. Due runs are handed to the submit
+    callback under a per-target concurrency cap.
+    """
+
+    def __init__(self, submit: Callable[[Job], Awaitable[Any]],
+                 on_update: Optional[Callable[[Job, Dict[str, Any]], None]] = None,
+                 target_limits: Optional[Dict[str, int]] = None, default_target_limit: int = 4):
+        self._submit = submit
+        self._on_update = on_update
+        self._target_limits = target_limits or {}
+        self._default_target_limit = default_target_limit
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Any] = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _push(self, job: Job) -> None:
+        job.version += 1
+        if job.next_run is None:
+            return
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job.id, job.version))
+        if self._wakeup is not None and self._heap[0][2] == job.id:
+            self._wakeup.set()
+
+    def add_job(self, job: Job, first_run: Optional[float] = None) -> Optional[float]:
+        """
+        Register a job, replacing any job with the same ID.
+
+        Args:
+            job: The job to schedule
+            first_run: Resume from this un-jittered run time (the stored scheduled_run, e.g. after
+                a restart) instead of the next trigger time; jitter is applied on top of it
+
+        Returns:
+            The job's next run time, or None if the trigger has no future runs
+        """
+        self.remove_job(job.id)
+        job.plan(first_run if first_run is not None else job.trigger.next_after(time.time()))
+        if job.next_run is not None:
+            self._jobs[job.id] = job
+            self._push(job)
+        return job.next_run
+
+    def remove_job(self, job_id: str) -> bool:
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return False
+        # Invalidate any heap entry still referring to this job
+        job.version += 1
+        return True
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _semaphore(self, target: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(target)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._target_limits.get(target, self._default_target_limit))
+            self._semaphores[target] = semaphore
+        return semaphore
+
+    def start(self) -> None:
+        if self._loop_task is None:
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        for task in list(self._running):
+            task.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            delay = None
+            if self._heap:
+                delay = max(self._heap[0][0] - time.time(), 0)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, job_id, version = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is None or job.version != version:
+                    continue
+                try:
+                    self._process_due(job, now)
+                except Exception as e:
+                    logger.error(f"Error processing scheduled job {job_id}: {str(e)}", exc_info=True)
+
+    def _process_due(self, job: Job, now: float) -> None:
+        # Collect every occurrence that has come due since the last wake-up
+        due_runs = [job.scheduled_run]
+        upcoming = job.trigger.next_after(job.scheduled_run)
+        while upcoming is not None and upcoming <= now and len(due_runs) < MAX_CATCH_UP_RUNS:
+            due_runs.append(upcoming)
+            upcoming = job.trigger.next_after(upcoming)
+        if upcoming is not None and upcoming <= now:
+            # Beyond the catch-up limit the remaining occurrences are dropped, so jump past them
+            upcoming = job.trigger.next_after(now)
+
+        if job.coalesce:
+            due_runs = due_runs[-1:]
+
+        missed = 0
+        runnable = 0
+        for run_time in due_runs:
+            # Run times are un-jittered but the job only wakes at the jittered time,
+            # so up to `jitter` seconds of the delay is by design
+            late = now - run_time - job.jitter
+            if late > job.misfire_grace_time and job.misfire_policy == "skip":
+                missed += 1
+                continue
+            runnable += 1
+
+        fired = 0
+        if runnable and job.running >= job.max_instances:
+            logger.warning(f"Skipping {runnable} run(s) of {job.id}: {job.running} instance(s) still running")
+            missed += runnable
+        elif runnable:
+            # Catch-up runs replay back to back in one instance rather than competing for instance slots
+            self._fire(job, runnable)
+            fired = runnable
+
+        if missed:
+            logger.warning(f"Scheduled job {job.id} missed {missed} run(s)")
+
+        job.plan(upcoming)
+        if upcoming is None:
+            self._jobs.pop(job.id, None)
+        else:
+            self._push(job)
+
+        if self._on_update is not None:
+            self._on_update(job, {
+                "last_run": now if fired else None,
+                "runs_fired": fired,
+                "runs_missed": missed,
+                "next_run": job.next_run,
+                "scheduled_run": job.scheduled_run
+            })
+
+    def _fire(self, job: Job, runs: int = 1) -> None:
+        job.running += 1
+        task = asyncio.create_task(self._execute(job, runs))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: Job, runs: int) -> None:
+        try:
+            for _ in range(runs):
+                try:
+                    async with self._semaphore(job.target):
+                        await self._submit(job)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error running scheduled job {job.id}: {str(e)}", exc_info=True)
+        finally:
+            job.running -= 1
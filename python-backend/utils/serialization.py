@@ -0,0 +1,99 @@
+import json
+import logging
+from typing import Dict, Any, Iterable, Union
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("serialization")
+
+# Fastest JSON encoder available: orjson, then msgspec, then the standard library
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=str)
+else:
+    BACKEND = "json"
+
+class RawJSON:
+    """
+    Already-serialized JSON, embedded as-is wherever it appears in json_object().
+
+    Lets a large action result be encoded once and the same bytes reused for
+    the HTTP response, the task-result event and the batch stream.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON with the fastest available backend.
+
+    Values the backend cannot encode natively are converted with str(), as
+    json.dumps(..., default=str) did. Inputs a fast backend rejects (integers
+    over 64 bits, unusual dict keys) fall back to the standard library.
+    """
+    if isinstance(obj, RawJSON):
+        return obj.data
+    try:
+        if orjson is not None:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+        if msgspec is not None:
+            return _msgspec_encoder.encode(obj)
+    except (TypeError, ValueError, OverflowError) as e:
+        logger.debug(f"Falling back to json for {type(obj).__name__}: {str(e)}")
+    return _stdlib_dumps(obj)
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    return json.loads(data)
+
+def serialize(obj: Any) -> RawJSON:
+    """Serialize a value once so it can be embedded in several documents"""
+    if isinstance(obj, RawJSON):
+        return obj
+    return RawJSON(dumps(obj))
+
+def json_object(fields: Dict[str, Any]) -> RawJSON:
+    """
+    Serialize a dict whose top-level values may be RawJSON.
+
+    Without RawJSON values this is a single dumps() call; otherwise the
+    pre-serialized values are spliced in without being decoded again.
+    """
+    if not any(isinstance(value, RawJSON) for value in fields.values()):
+        return RawJSON(dumps(fields))
+    parts = [dumps(str(key)) + b":" + dumps(value) for key, value in fields.items()]
+    return RawJSON(b"{" + b",".join(parts) + b"}")
+
+def json_array(items: Iterable[Any]) -> RawJSON:
+    """Serialize a sequence whose items may be RawJSON"""
+    return RawJSON(b"[" + b",".join(dumps(item) for item in items) + b"]")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fast serializer; RawJSON content is sent as-is"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Dict, Any, Callable, Awaitable, Hashable, Optional
+
+from utils.result_cache import parameters_key, KeyFunction
+
+logger = logging.getLogger("single-flight")
+
+def coalescible(func=None, *, key: Optional[KeyFunction] = None):
+    """
+    Declare an action whose identical concurrent calls can share one execution.
+
+    Only for actions without side effects: two identical send requests must
+    both send. Usable as @coalescible or @coalescible(key=...).
+    """
+    def decorator(func):
+        func.coalesce_key = key or parameters_key
+        return func
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Collapses identical in-flight calls onto one execution.
+
+    The first caller for a key starts the call in its own task; callers
+    arriving while it runs await the same task and get the same result (or
+    exception). A caller that is cancelled only stops waiting; the shared
+    call is cancelled once no caller is waiting for it.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run call(), or join an identical call already in flight.
+
+        Args:
+            key: Identifies identical calls
+            call: Starts the underlying coroutine
+
+        Returns:
+            The shared result
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finished(key, flight))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller gave up; nobody needs the result
+                flight.task.cancel()
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None and flight.waiters == 0:
+            logger.debug(f"Shared call {key} failed with no waiters: {flight.task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0
+        }
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+
+# Crockford base32, as used by ULIDs; its character order matches byte order,
+# so IDs compare lexicographically in creation order
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {char: index for index, char in enumerate(_ALPHABET)}
+
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+def new_task_id() -> str:
+    """
+    Generate a collision-free, time-sortable task ID (a monotonic ULID).
+
+    The first 10 characters encode the creation time in milliseconds, the
+    last 16 an 80-bit random value. Within the same millisecond the random
+    part is incremented instead of redrawn, so IDs from this process are
+    strictly increasing even under bursts and never repeat.
+
+    Returns:
+        A 26-character task ID
+    """
+    global _last_ms, _last_random
+
+    with _lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _last_random = int.from_bytes(os.urandom(10), "big")
+        else:
+            # Same millisecond (or the clock stepped back): keep ordering by counting up
+            _last_random += 1
+            if _last_random > _RANDOM_MAX:
+                _last_ms += 1
+                _last_random = int.from_bytes(os.urandom(10), "big")
+
+        return _encode(_last_ms, 10) + _encode(_last_random, 16)
+
+def task_id_floor(timestamp: float) -> str:
+    """Smallest task ID that can be created at or after the given epoch time"""
+    return _encode(max(int(timestamp * 1000), 0), 10) + "0" * 16
+
+def task_id_time(task_id: str) -> float:
+    """Epoch time encoded in a task ID"""
+    value = 0
+    for char in task_id[:10]:
+        value = (value << 5) | _DECODE[char]
+    return value / 1000
+
+def task_id_hex(task_id: str) -> str:
+    """The 128-bit value of a task ID as 32 hex characters (e.g. for use as a trace ID)"""
+    value = 0
+    for char in task_id.upper():
+        value = (value << 5) | _DECODE[char]
+    return f"{value & ((1 << 128) - 1):032x}"
@@ -0,0 +1,424 @@
+import asyncio
+import bisect
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.task_ids import task_id_floor
+from utils.serialization import dumps, loads
+
+logger = logging.getLogger("task-store")
+
+# Statuses after which a task never changes again and may be evicted by TTL
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Large payload keys stored apart from the task summary so listings never load them
+PAYLOAD_KEYS = ("result", "results")
+
+def split_record(record: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a task record into its summary fields and its result payload"""
+    summary = {key: value for key, value in record.items() if key not in PAYLOAD_KEYS}
+    payload = {key: record[key] for key in PAYLOAD_KEYS if key in record}
+    return summary, payload
+
+class TaskBackend:
+    """Interface for durable task storage used behind TaskStore"""
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def put(self, task_id: str, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, task_id: str) -> bool:
+        raise NotImplementedError
+
+    def query(self, status: Optional[str], min_id: Optional[str], limit: int,
+              before_id: Optional[str], include_results: bool) -> List[Dict[str, Any]]:
+        """Return up to limit records with min_id <= id < before_id, highest id first"""
+        raise NotImplementedError
+
+    def count(self, status: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def purge_finished(self, before: float) -> List[str]:
+        raise NotImplementedError
+
+class MemoryTaskBackend(TaskBackend):
+    """
+    Non-durable backend, useful for tests and throwaway servers.
+
+    Task IDs are time-sortable, so a sorted ID list doubles as the time
+    index and range queries bisect into it instead of scanning every record.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._ids: List[str] = []
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        record = self._records.get(task_id)
+        return dict(record) if record is not None else None
+
+    def put(self, task_id: str, record: Dict[str, Any]) -> None:
+        if task_id not in self._records:
+            # New IDs are almost always the largest, making this an append
+            if not self._ids or task_id > self._ids[-1]:
+                self._ids.append(task_id)
+            else:
+                bisect.insort(self._ids, task_id)
+        self._records[task_id] = dict(record)
+
+    def delete(self, task_id: str) -> bool:
+        if self._records.pop(task_id, None) is None:
+            return False
+        del self._ids[bisect.bisect_left(self._ids, task_id)]
+        return True
+
+    def query(self, status, min_id, limit, before_id, include_results):
+        low = bisect.bisect_left(self._ids, min_id) if min_id is not None else 0
+        high = bisect.bisect_left(self._ids, before_id) if before_id is not None else len(self._ids)
+
+        matches = []
+        for index in range(high - 1, low - 1, -1):
+            record = self._records[self._ids[index]]
+            if status and record.get("status") != status:
+                continue
+            matches.append(dict(record) if include_results else split_record(record)[0])
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._records)
+        return sum(1 for record in self._records.values() if record.get("status") == status)
+
+    def purge_finished(self, before: float) -> List[str]:
+        expired = [
+            task_id for task_id, record in self._records.items()
+            if record.get("status") in FINISHED_STATUSES and record["updated_at"] < before
+        ]
+        for task_id in expired:
+            self.delete(task_id)
+        return expired
+
+class SQLiteTaskBackend(TaskBackend):
+    """
+    SQLite task storage in WAL mode.
+
+    Summaries and result payloads live in separate columns so listing tasks
+    never deserializes result data it is not going to return. Task IDs sort
+    by creation time, so the primary key is also the time index and time
+    ranges are primary-key range scans.
+    """
+
+    def __init__(self, path: str, table: str = "tasks"):
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                summary TEXT NOT NULL,
+                payload TEXT
+            )
+        """)
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_status_idx ON {table} (status, updated_at)")
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT summary, payload FROM {self.table} WHERE id = ?", (task_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        record = loads(row[0])
+        if row[1]:
+            record.update(loads(row[1]))
+        return record
+
+    def put(self, task_id: str, record: Dict[str, Any]) -> None:
+        summary, payload = split_record(record)
+        with self._lock:
+            self._conn.execute(
+                f"""
+                INSERT INTO {self.table} (id, status, created_at, updated_at, summary, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    updated_at = excluded.updated_at,
+                    summary = excluded.summary,
+                    payload = excluded.payload
+                """,
+                (
+                    task_id,
+                    record.get("status", ""),
+                    record["created_at"],
+                    record["updated_at"],
+                    dumps(summary).decode("utf-8"),
+                    dumps(payload).decode("utf-8") if payload else None
+                )
+            )
+
+    def delete(self, task_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (task_id,))
+        return cursor.rowcount > 0
+
+    def query(self, status, min_id, limit, before_id, include_results):
+        columns = "summary, payload" if include_results else "summary, NULL"
+        clauses = []
+        args: List[Any] = []
+
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if min_id is not None:
+            clauses.append("id >= ?")
+            args.append(min_id)
+        if before_id is not None:
+            clauses.append("id < ?")
+            args.append(before_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        args.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM {self.table} {where} ORDER BY id DESC LIMIT ?",
+                args
+            ).fetchall()
+
+        records = []
+        for summary, payload in rows:
+            record = loads(summary)
+            if payload:
+                record.update(loads(payload))
+            records.append(record)
+        return records
+
+    def count(self, status: Optional[str] = None) -> int:
+        with self._lock:
+            if status is None:
+                row = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            else:
+                row = self._conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE status = ?", (status,)).fetchone()
+        return row[0]
+
+    def purge_finished(self, before: float) -> List[str]:
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        condition = f"status IN ({placeholders}) AND updated_at < ?"
+        args = (*FINISHED_STATUSES, before)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                rows = self._conn.execute(f"SELECT id FROM {self.table} WHERE {condition}", args).fetchall()
+                self._conn.execute(f"DELETE FROM {self.table} WHERE {condition}", args)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+class TaskStore:
+    """
+    Task records behind a bounded LRU cache.
+
+    Writes go through to the backend; reads of recently touched tasks (the
+    ones being polled) are served from memory. Finished tasks are removed
+    from both once they are older than the configured TTL. Callers can await
+    a task finishing with wait() instead of polling.
+    """
+
+    def __init__(self, backend: TaskBackend, cache_size: int = 1000, finished_ttl: Optional[float] = None):
+        self.backend = backend
+        self.cache_size = cache_size
+        self.finished_ttl = finished_ttl
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Futures resolved when a task reaches a finished status
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+
+    def _remember(self, task_id: str, record: Dict[str, Any]) -> None:
+        self._cache[task_id] = record
+        self._cache.move_to_end(task_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        record = self._cache.get(task_id)
+        if record is not None:
+            self._cache.move_to_end(task_id)
+            return record
+
+        record = self.backend.get(task_id)
+        if record is not None:
+            self._remember(task_id, record)
+        return record
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def put(self, task_id: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Create or replace a task record.
+
+        Args:
+            task_id: The task identifier
+            record: The task fields; id, created_at and updated_at are filled in
+
+        Returns:
+            The stored record
+        """
+        now = time.time()
+        existing = self.get(task_id)
+
+        record = dict(record)
+        record["id"] = task_id
+        record["created_at"] = existing["created_at"] if existing else record.get("start_time", now)
+        record["updated_at"] = now
+
+        self.backend.put(task_id, record)
+        self._remember(task_id, record)
+        if record.get("status") in FINISHED_STATUSES and task_id in self._waiters:
+            self._notify(task_id)
+        return record
+
+    def update(self, task_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Merge fields into an existing record"""
+        existing = self.get(task_id)
+        if existing is None:
+            return None
+        return self.put(task_id, {**existing, **fields})
+
+    def delete(self, task_id: str) -> Optional[Dict[str, Any]]:
+        record = self.get(task_id)
+        self._cache.pop(task_id, None)
+        if record is not None:
+            self.backend.delete(task_id)
+        if task_id in self._waiters:
+            self._notify(task_id)
+        return record
+
+    @staticmethod
+    def etag(record: Dict[str, Any]) -> str:
+        """Entity tag for a record; changes on every write"""
+        return f'"{record["id"]}-{record["updated_at"]:.6f}"'
+
+    def _notify(self, task_id: str) -> None:
+        for waiter in self._waiters.pop(task_id, []):
+            if waiter.done():
+                continue
+            loop = waiter.get_loop()
+            try:
+                in_loop = asyncio.get_running_loop() is loop
+            except RuntimeError:
+                in_loop = False
+            if in_loop:
+                waiter.set_result(None)
+            else:
+                # Written from a worker thread; futures may only be resolved on their loop
+                loop.call_soon_threadsafe(lambda waiter=waiter: waiter.done() or waiter.set_result(None))
+
+    async def wait(self, task_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a task to finish.
+
+        Args:
+            task_id: The task identifier
+            timeout: Seconds to wait at most
+
+        Returns:
+            The record once it is finished, or as it is when the timeout expires
+            (None if the task does not exist)
+        """
+        record = self.get(task_id)
+        if record is None or record.get("status") in FINISHED_STATUSES or timeout <= 0:
+            return record
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(task_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(task_id)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[task_id]
+        return self.get(task_id)
+
+    def waiting(self) -> int:
+        """Number of callers currently waiting for a task to finish"""
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def list(self, status: Optional[str] = None, since: Optional[float] = None, limit: int = 100,
+             cursor: Optional[str] = None, include_results: bool = False) -> Dict[str, Any]:
+        """
+        Page through tasks, newest first.
+
+        Args:
+            status: Only return tasks with this status
+            since: Only return tasks created at or after this epoch time
+            limit: Maximum number of tasks to return
+            cursor: The next_cursor value from a previous page
+            include_results: Include result payloads (omitted by default)
+
+        Returns:
+            A dict with the tasks and the cursor for the next page
+        """
+        min_id = task_id_floor(since) if since is not None else None
+
+        tasks = self.backend.query(status, min_id, limit, cursor or None, include_results)
+        next_cursor = tasks[-1]["id"] if len(tasks) == limit else None
+
+        return {"tasks": tasks, "next_cursor": next_cursor}
+
+    def count(self, status: Optional[str] = None) -> int:
+        return self.backend.count(status)
+
+    def evict_expired(self) -> int:
+        """Drop finished tasks older than the TTL; returns how many were removed"""
+        if self.finished_ttl is None:
+            return 0
+
+        expired = self.backend.purge_finished(time.time() - self.finished_ttl)
+        for task_id in expired:
+            self._cache.pop(task_id, None)
+
+        if expired:
+            logger.info(f"Evicted {len(expired)} finished tasks from {getattr(self.backend, 'table', 'store')}")
+        return len(expired)
+
+def create_task_store(backend: str, path: str, table: str, cache_size: int,
+                      finished_ttl: Optional[float]) -> TaskStore:
+    """
+    Build a task store from configuration.
+
+    Args:
+        backend: "sqlite" (default) or "memory"
+        path: SQLite database file
+        table: Table holding this store's records
+        cache_size: Maximum records kept in the in-memory LRU
+        finished_ttl: Seconds to keep finished tasks, or None to keep them forever
+    """
+    if backend == "memory":
+        task_backend: TaskBackend = MemoryTaskBackend()
+    elif backend == "sqlite":
+        task_backend = SQLiteTaskBackend(path, table)
+    else:
+        raise ValueError(f"Unsupported task store backend: {backend}")
+
+    return TaskStore(task_backend, cache_size=cache_size, finished_ttl=finished_ttl)
@@ -0,0 +1,343 @@
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+from utils.task_ids import task_id_hex
+
+logger = logging.getLogger("tracing")
+
+# Span the current coroutine is inside; new spans become its children
+current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+def trace_id_for(task_id: str) -> str:
+    """
+    OTLP trace ID (32 hex characters) for a task ID.
+
+    Task IDs are 128-bit ULIDs, so the trace ID is the same number in hex and
+    a trace can be looked up by its task ID. IDs that are not ULIDs (from
+    older clients) are hashed instead.
+    """
+    if len(task_id) == 26:
+        try:
+            return task_id_hex(task_id)
+        except KeyError:
+            pass
+    return hashlib.md5(task_id.encode("utf-8")).hexdigest()
+
+class Span:
+    """
+    A timed operation, split into named phases.
+
+    Phases record where a span's time went (dispatch, handler, serialization,
+    events); the same phase name may occur more than once and is totalled.
+    """
+
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "attributes",
+                 "start_time", "_start", "duration", "phases", "status", "error", "_token")
+
+    def __init__(self, tracer: "Tracer", trace_id: str, parent_id: Optional[str], name: str,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.phases: List[List[Any]] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._token: Optional[contextvars.Token] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block of work as one phase of this span"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append([name, started - self._start, time.perf_counter() - started])
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if self._token is not None:
+            try:
+                current_span.reset(self._token)
+            except ValueError:
+                # Ended from a different context (e.g. a workflow step ended by the scheduler
+                # loop); the context it was current in has already finished
+                pass
+            self._token = None
+        self.tracer._finish(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        totals: Dict[str, float] = {}
+        for name, _, duration in self.phases:
+            totals[name] = totals.get(name, 0.0) + duration
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "phases": [
+                {"name": name, "offset": round(offset, 6), "duration": round(duration, 6)}
+                for name, offset, duration in self.phases
+            ],
+            "phase_totals": {name: round(duration, 6) for name, duration in totals.items()}
+        }
+
+class SpanExporter:
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends one JSON object per span to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(span, default=str) + "\n" for span in spans))
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """
+    Posts spans as OTLP/HTTP JSON to {endpoint}/v1/traces.
+
+    Works with an OpenTelemetry collector or any local stand-in that accepts
+    the same payload.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "desktop-automation", timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _span(self, span: Dict[str, Any]) -> Dict[str, Any]:
+        start_ns = int(span["start_time"] * 1e9)
+        attributes = [self._attribute(key, value) for key, value in span["attributes"].items()]
+        attributes += [
+            self._attribute(f"phase.{name}.seconds", duration) for name, duration in span["phase_totals"].items()
+        ]
+        otlp_span = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int((span["duration"] or 0) * 1e9)),
+            "attributes": attributes,
+            "events": [
+                {
+                    "name": phase["name"],
+                    "timeUnixNano": str(start_ns + int(phase["offset"] * 1e9)),
+                    "attributes": [self._attribute("duration_seconds", phase["duration"])]
+                }
+                for phase in span["phases"]
+            ],
+            "status": {"code": 2, "message": span["error"] or ""} if span["status"] == "error" else {"code": 1}
+        }
+        if span["parent_id"]:
+            otlp_span["parentSpanId"] = span["parent_id"]
+        return otlp_span
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "automation-server"}, "spans": [self._span(span) for span in spans]}]
+            }]
+        }
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(body, default=str).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class Tracer:
+    """
+    Creates spans, keeps recent traces in memory and exports finished spans.
+
+    Finished spans are kept per trace (bounded to max_traces) for
+    GET /tasks/{id}/trace, and handed to the exporter in batches from a
+    background thread so exporting never blocks the event loop.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, max_traces: int = 500,
+                 export_interval: float = 1.0):
+        self.exporter = exporter
+        self.max_traces = max_traces
+        self.export_interval = export_interval
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._export_task: Optional[asyncio.Task] = None
+        self.exported = 0
+        self.export_errors = 0
+
+    def start_span(self, name: str, task_id: Optional[str] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """
+        Start a span and make it the current span.
+
+        Args:
+            name: Span name, e.g. "automate files.read_file"
+            task_id: Starts a new trace for this task; otherwise the span joins the current trace
+            attributes: Key/value details stored on the span
+
+        Returns:
+            The span; call end() (or use tracer.span(...)) to finish it
+        """
+        parent = current_span.get()
+        if task_id is not None:
+            trace_id, parent_id = trace_id_for(task_id), None
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+
+        span = Span(self, trace_id, parent_id, name, attributes)
+        span._token = current_span.set(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, task_id: Optional[str] = None,
+             attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+        span = self.start_span(name, task_id, attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            span.end()
+
+    def _finish(self, span: Span) -> None:
+        record = span.to_dict()
+        trace = self._traces.get(span.trace_id)
+        if trace is None:
+            trace = []
+            self._traces[span.trace_id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        trace.append(record)
+        if self.exporter is not None:
+            with self._lock:
+                self._pending.append(record)
+
+    def get_trace(self, task_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Spans of the trace for a task ID, oldest first"""
+        spans = self._traces.get(trace_id_for(task_id))
+        if spans is None:
+            return None
+        return sorted(spans, key=lambda span: span["start_time"])
+
+    def flush(self) -> None:
+        """Export pending spans now (blocking)"""
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans or self.exporter is None:
+            return
+        try:
+            self.exporter.export(spans)
+            self.exported += len(spans)
+        except Exception as e:
+            self.export_errors += 1
+            logger.warning(f"Could not export {len(spans)} spans: {str(e)}")
+
+    async def _export_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.export_interval)
+            if self._pending:
+                await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        if self.exporter is not None and self._export_task is None:
+            self._export_task = asyncio.create_task(self._export_loop())
+
+    def stop(self) -> None:
+        if self._export_task is not None:
+            self._export_task.cancel()
+            self._export_task = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "traces": len(self._traces),
+            "pending_export": len(self._pending),
+            "exported": self.exported,
+            "export_errors": self.export_errors
+        }
+
+def create_tracer(exporter: str = "jsonl", jsonl_path: str = "automation_traces.jsonl",
+                  otlp_endpoint: str = "http://localhost:4318", max_traces: int = 500) -> Tracer:
+    """
+    Build the tracer for the configured exporter.
+
+    Args:
+        exporter: "jsonl", "otlp" or "none" (keep traces in memory only)
+        jsonl_path: File spans are appended to for the jsonl exporter
+        otlp_endpoint: Base URL of the OTLP/HTTP collector
+        max_traces: Traces kept in memory for GET /tasks/{id}/trace
+    """
+    exporter = exporter.lower()
+    if exporter == "jsonl":
+        span_exporter: Optional[SpanExporter] = JsonlSpanExporter(jsonl_path)
+    elif exporter == "otlp":
+        span_exporter = OtlpHttpSpanExporter(otlp_endpoint)
+    elif exporter == "none":
+        span_exporter = None
+    else:
+        raise ValueError(f"Unsupported trace exporter: {exporter}")
+    return Tracer(span_exporter, max_traces=max_traces)
+
+def trace_phase(name: str):
+    """Time a phase of the current span, or do nothing outside a span"""
+    span = current_span.get()
+    if span is None:
+        return _NO_PHASE
+    return span.phase(name)
+
+class _NoPhase:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        return False
+
+_NO_PHASE = _NoPhase()
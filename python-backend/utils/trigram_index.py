@@ -0,0 +1,579 @@
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from array import array
+from itertools import accumulate
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from utils.content_search import SNIFF_BYTES, is_binary
+from utils.file_index import FileIndex
+from utils.fs_walk import WalkFilter
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+logger = logging.getLogger("trigram-index")
+
+# Posting lists are split into blocks of this many document IDs, so adding a
+# document only rewrites the last (small) block of each of its trigrams
+BLOCK_SIZE = 4096
+# Trigrams rewritten per compaction transaction; the lock is released between them
+COMPACT_CHUNK = 256
+_ID_ARRAY = "I" if array("I").itemsize == 4 else "L"
+
+def _deltas(ids: List[int], base: int = 0) -> array:
+    return array(_ID_ARRAY, (current - previous for previous, current in zip([base] + ids[:-1], ids)))
+
+def _encode(ids: List[int], base: int = 0) -> bytes:
+    """Ascending IDs as zlib-compressed 32-bit deltas"""
+    return zlib.compress(_deltas(ids, base).tobytes(), 6)
+
+def _decode(data: bytes) -> array:
+    deltas = array(_ID_ARRAY)
+    deltas.frombytes(zlib.decompress(data))
+    return deltas
+
+def trigrams(data: bytes) -> Set[bytes]:
+    """Distinct ASCII-lower-cased 3-byte sequences of a text"""
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+def _sequence(items: Any) -> List[List[bytes]]:
+    """
+    Literals a parsed regex sequence requires, as clauses: every clause must
+    hold and a clause holds when any one of its literals occurs.
+    """
+    clauses: List[List[bytes]] = []
+    run = bytearray()
+
+    def flush():
+        if len(run) >= 3:
+            clauses.append([bytes(run).lower()])
+        run.clear()
+
+    for op, value in items:
+        if op is sre_constants.LITERAL:
+            run.append(value)
+        elif op is sre_constants.AT:
+            # Anchors take no characters, so a literal run continues across them
+            continue
+        elif op is sre_constants.SUBPATTERN:
+            flush()
+            clauses.extend(_sequence(value[-1]))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            flush()
+            if value[0] >= 1:
+                clauses.extend(_sequence(value[2]))
+        elif op is sre_constants.BRANCH:
+            flush()
+            alternatives = []
+            for branch in value[1]:
+                single = [clause[0] for clause in _sequence(branch) if len(clause) == 1]
+                if not single:
+                    # One unconstrained alternative makes the whole branch unconstrained
+                    alternatives = []
+                    break
+                alternatives.append(max(single, key=len))
+            if alternatives:
+                clauses.append(alternatives)
+        else:
+            flush()
+    flush()
+    return clauses
+
+def required_literals(pattern: str, regex: bool) -> List[List[bytes]]:
+    """
+    Literals (of 3 bytes or more) any matching text must contain.
+
+    Returns:
+        Clauses that must all hold, each satisfied by any one of its
+        literals; empty when the pattern cannot be narrowed this way
+    """
+    encoded = pattern.encode("utf-8")
+    if not regex:
+        return [[encoded.lower()]] if len(encoded) >= 3 else []
+    try:
+        return _sequence(sre_parse.parse(encoded, 0))
+    except Exception:
+        return []
+
+class TrigramIndex:
+    """
+    Trigram inverted index over the text files of the file index.
+
+    Every text file up to max_file_size gets a document ID, and each of its
+    (ASCII case-folded) trigrams a posting: the IDs of the documents
+    containing it, stored in SQLite as blocks of zlib-compressed deltas.
+    The index follows the file index: its listeners queue changed and
+    removed paths, and a background thread re-reads changed files and
+    appends their postings in batches. A changed file gets a new ID; the
+    old one is dropped from the documents table at once and from the
+    postings by a periodic compaction.
+
+    Queries turn a substring or regex into the literals it requires and
+    intersect their posting lists; only the resulting candidates need to
+    be searched.
+    """
+
+    def __init__(self, path: str, file_index: FileIndex, max_file_size: int = 4 * 1024 * 1024,
+                 flush_interval: float = 2.0, flush_batch: int = 500):
+        self.path = path
+        self.file_index = file_index
+        self.max_file_size = max_file_size
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS trigram_docs (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS trigram_postings (
+                trigram BLOB NOT NULL,
+                block INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                last INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (trigram, block)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS trigram_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        meta = dict(self._conn.execute("SELECT key, value FROM trigram_meta"))
+        # IDs are never reused: posting lists only grow at the end and may still hold
+        # the IDs of deleted documents. Indexes written before next_id was saved
+        # recover it from the newest ID in any posting list.
+        self.next_id = meta.get("next_id") or max(
+            self._conn.execute("SELECT MAX(id) FROM trigram_docs").fetchone()[0] or 0,
+            self._conn.execute("SELECT MAX(last) FROM trigram_postings").fetchone()[0] or 0
+        ) + 1
+        self.dead = meta.get("dead", 0)
+        # Counted once here and kept current by every write, so stats() never scans the tables
+        self.document_count = self._conn.execute("SELECT COUNT(*) FROM trigram_docs").fetchone()[0]
+        self.trigram_count, self.posting_blocks, self.posting_bytes = self._conn.execute(
+            "SELECT COUNT(DISTINCT trigram), COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM trigram_postings"
+        ).fetchone()
+
+        self._queue: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        # Paths queued or read but not yet flushed; queries always include them as candidates
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # Roots whose documents are indexed or queued (and so counted as dirty)
+        self.ready: Set[str] = set()
+
+        self.documents_indexed = 0
+        self.flushes = 0
+        self.compactions = 0
+        self.queries = 0
+        file_index.listeners.append(self._on_files_changed)
+
+    # Change tracking
+
+    def _on_files_changed(self, changed: List[str], removed: List[str]) -> None:
+        with self._dirty_lock:
+            self._dirty.update(changed)
+        for path in removed:
+            self._queue.put(("remove", path))
+        for path in changed:
+            self._queue.put(("update", path))
+
+    def _sync(self, root: str) -> None:
+        """Queue every file whose indexed version differs from the file index (catches changes made while stopped)"""
+        with self._lock:
+            documents = {
+                path: (size, mtime) for path, size, mtime in self._conn.execute(
+                    "SELECT path, size, mtime FROM trigram_docs WHERE path >= ? AND path < ?",
+                    (root.rstrip(os.sep) + os.sep, root.rstrip(os.sep) + chr(ord(os.sep) + 1))
+                )
+            }
+        changed = []
+        for path, size, mtime in self.file_index.iter_files(root):
+            if documents.pop(path, None) != (size, mtime) and size <= self.max_file_size:
+                changed.append(path)
+        self._on_files_changed(changed, list(documents))
+
+    # Indexing
+
+    def _unchanged(self, path: str) -> bool:
+        """Whether the indexed version of a file is still current (the same change can be queued twice)"""
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime FROM trigram_docs WHERE path = ?", (path,)).fetchone()
+        return row is not None and tuple(row) == (stat_result.st_size, stat_result.st_mtime)
+
+    def _read_text(self, path: str) -> Optional[Tuple[bytes, os.stat_result]]:
+        try:
+            with open(path, "rb") as f:
+                stat_result = os.fstat(f.fileno())
+                if stat_result.st_size > self.max_file_size:
+                    return None
+                data = f.read()
+        except OSError:
+            return None
+        if is_binary(data[:SNIFF_BYTES]):
+            return None
+        return data, stat_result
+
+    def _run(self) -> None:
+        for root in self.file_index.roots:
+            while root not in self.file_index.ready and not self._stop.is_set():
+                self._stop.wait(0.5)
+            if self._stop.is_set():
+                return
+            self._sync(root)
+            self.ready.add(root)
+
+        removed: List[str] = []
+        updated: Dict[str, Tuple[int, float, Set[bytes]]] = {}
+        skipped: Set[str] = set()
+        last_flush = time.time()
+        while not self._stop.is_set():
+            try:
+                kind, path = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                kind = None
+            if kind == "remove":
+                removed.append(path)
+                updated.pop(path, None)
+            elif kind == "update" and self._unchanged(path):
+                skipped.add(path)
+            elif kind == "update":
+                text = self._read_text(path)
+                if text is None:
+                    # Gone, binary or too large: drop any earlier version
+                    removed.append(path)
+                    updated.pop(path, None)
+                    skipped.add(path)
+                else:
+                    data, stat_result = text
+                    updated[path] = (stat_result.st_size, stat_result.st_mtime, trigrams(data))
+            pending = len(updated) + len(removed)
+            # Flush full batches, and whatever is left once the queue runs dry
+            if pending and (pending >= self.flush_batch or
+                            (self._queue.empty() and time.time() - last_flush >= self.flush_interval)):
+                try:
+                    self._flush(updated, removed)
+                    self._clean(list(updated) + list(skipped))
+                except Exception as e:
+                    # Unwritten paths stay dirty, so queries keep treating them as candidates
+                    logger.error(f"Error writing trigram postings: {str(e)}", exc_info=True)
+                updated, removed, skipped = {}, [], set()
+                last_flush = time.time()
+            elif skipped and not pending:
+                self._clean(skipped)
+                skipped = set()
+
+    def _clean(self, paths: Iterable[str]) -> None:
+        with self._dirty_lock:
+            self._dirty.difference_update(paths)
+
+    def _flush(self, updated: Dict[str, Tuple[int, float, Set[bytes]]], removed: List[str]) -> None:
+        postings: Dict[bytes, List[int]] = {}
+        documents = []
+        for path, (size, mtime, grams) in updated.items():
+            documents.append((self.next_id, path, size, mtime))
+            for gram in grams:
+                postings.setdefault(gram, []).append(self.next_id)
+            self.next_id += 1
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                dropped = 0
+                grams = blocks = size = 0
+                for path in list(updated):
+                    dropped += self._conn.execute("DELETE FROM trigram_docs WHERE path = ?", (path,)).rowcount
+                for path in removed:
+                    # A removed path may be a directory; its documents go with it
+                    dropped += self._conn.execute("DELETE FROM trigram_docs WHERE path = ?", (path,)).rowcount
+                    prefix = path.rstrip(os.sep) + os.sep
+                    dropped += self._conn.execute(
+                            "DELETE FROM trigram_docs WHERE path >= ? AND path < ?",
+                            (prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+                        ).rowcount
+                self._conn.executemany("INSERT INTO trigram_docs (id, path, size, mtime) VALUES (?, ?, ?, ?)", documents)
+                for gram, ids in postings.items():
+                    new_gram, new_blocks, new_bytes = self._append(gram, ids)
+                    grams += new_gram
+                    blocks += new_blocks
+                    size += new_bytes
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO trigram_meta (key, value) VALUES (?, ?)",
+                    (("dead", self.dead + dropped), ("next_id", self.next_id))
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.dead += dropped
+            self.document_count += len(documents) - dropped
+            self.trigram_count += grams
+            self.posting_blocks += blocks
+            self.posting_bytes += size
+        self.documents_indexed += len(documents)
+        self.flushes += 1
+
+        if self.dead > max(1000, self.document_count // 2):
+            self.compact()
+
+    def _append(self, gram: bytes, ids: List[int]) -> Tuple[int, int, int]:
+        """
+        Add ascending IDs to a trigram's posting list (caller holds the lock, inside a transaction).
+
+        Returns:
+            The new trigrams (0 or 1), blocks and bytes it added
+        """
+        row = self._conn.execute(
+            "SELECT block, count, last, data FROM trigram_postings WHERE trigram = ? ORDER BY block DESC LIMIT 1", (gram,)
+        ).fetchone()
+        block, start, blocks, size = 0, 0, 0, 0
+        if row is not None:
+            block, count, last, data = row
+            room = BLOCK_SIZE - count
+            if room > 0:
+                head = ids[:room]
+                deltas = _decode(data)
+                deltas.extend(_deltas(head, last))
+                encoded = zlib.compress(deltas.tobytes(), 6)
+                self._conn.execute(
+                    "UPDATE trigram_postings SET count = ?, last = ?, data = ? WHERE trigram = ? AND block = ?",
+                    (count + len(head), head[-1], encoded, gram, block)
+                )
+                size += len(encoded) - len(data)
+                start = len(head)
+            block += 1
+        blocks, written = self._write_blocks(gram, ids[start:], block)
+        return int(row is None), blocks, size + written
+
+    def _write_blocks(self, gram: bytes, ids: List[int], block: int = 0) -> Tuple[int, int]:
+        """Insert IDs as new blocks numbered from block; returns the blocks and bytes written"""
+        blocks = size = 0
+        for offset in range(0, len(ids), BLOCK_SIZE):
+            chunk = ids[offset:offset + BLOCK_SIZE]
+            encoded = _encode(chunk)
+            self._conn.execute(
+                "INSERT INTO trigram_postings (trigram, block, count, last, data) VALUES (?, ?, ?, ?, ?)",
+                (gram, block + blocks, len(chunk), chunk[-1], encoded)
+            )
+            blocks += 1
+            size += len(encoded)
+        return blocks, size
+
+    def compact(self, chunk_size: int = COMPACT_CHUNK) -> bool:
+        """
+        Rewrite the posting lists without the IDs of removed or replaced documents.
+
+        Trigrams are rewritten in ranges of chunk_size, each in its own
+        transaction, and the lock is released between ranges, so a query
+        waits for at most one range. Queries in between see some lists
+        compacted and some not, which is harmless: a dead ID maps to no
+        document.
+
+        Returns:
+            Whether every list was rewritten (False when the index stopped first)
+        """
+        started = time.time()
+        dead = self.dead
+        live: Set[int] = set()
+        newest = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id FROM trigram_docs WHERE id > ? ORDER BY id LIMIT 50000", (newest,)
+                ).fetchall()
+            if not rows:
+                break
+            live.update(row[0] for row in rows)
+            newest = rows[-1][0]
+
+        rewritten = 0
+        after = b""
+        while True:
+            if self._stop.is_set():
+                logger.info(f"Compaction stopped after {rewritten} posting lists")
+                return False
+            with self._lock:
+                grams = [row[0] for row in self._conn.execute(
+                    "SELECT DISTINCT trigram FROM trigram_postings WHERE trigram > ? ORDER BY trigram LIMIT ?",
+                    (after, chunk_size)
+                )]
+                if not grams:
+                    break
+                removed = blocks = size = 0
+                self._conn.execute("BEGIN")
+                try:
+                    for gram in grams:
+                        ids: List[int] = []
+                        for (data,) in self._conn.execute(
+                            "SELECT data FROM trigram_postings WHERE trigram = ? ORDER BY block", (gram,)
+                        ):
+                            blocks -= 1
+                            size -= len(data)
+                            # IDs above the snapshot belong to documents added since it was taken
+                            ids.extend(doc_id for doc_id in accumulate(_decode(data)) if doc_id in live or doc_id > newest)
+                        self._conn.execute("DELETE FROM trigram_postings WHERE trigram = ?", (gram,))
+                        written_blocks, written = self._write_blocks(gram, ids)
+                        blocks += written_blocks
+                        size += written
+                        removed += not ids
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self.trigram_count -= removed
+                self.posting_blocks += blocks
+                self.posting_bytes += size
+            rewritten += len(grams)
+            after = grams[-1]
+
+        with self._lock:
+            # IDs dropped while compacting may still be in lists already rewritten
+            self.dead = max(0, self.dead - dead)
+            self._conn.execute("INSERT OR REPLACE INTO trigram_meta (key, value) VALUES ('dead', ?)", (self.dead,))
+        self.compactions += 1
+        logger.info(f"Compacted {rewritten} posting lists in {time.time() - started:.2f}s")
+        return True
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="trigram-index", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # Queries
+
+    def _ids(self, gram: bytes) -> List[int]:
+        ids: List[int] = []
+        for (data,) in self._conn.execute(
+            "SELECT data FROM trigram_postings WHERE trigram = ? ORDER BY block", (gram,)
+        ):
+            ids.extend(accumulate(_decode(data)))
+        return ids
+
+    def _literal_ids(self, literal: bytes) -> Set[int]:
+        grams = list(trigrams(literal))
+        placeholders = ",".join("?" * len(grams))
+        counts = dict(self._conn.execute(
+            f"SELECT trigram, SUM(count) FROM trigram_postings WHERE trigram IN ({placeholders}) GROUP BY trigram", grams
+        ).fetchall())
+        if len(counts) < len(grams):
+            return set()
+        # Intersect from the rarest trigram, so the working set only shrinks
+        grams.sort(key=lambda gram: counts[gram])
+        result = set(self._ids(grams[0]))
+        for gram in grams[1:]:
+            if not result:
+                break
+            result.intersection_update(self._ids(gram))
+        return result
+
+    def candidates(self, directory: str, pattern: str, regex: bool = False) -> Optional[List[str]]:
+        """
+        Files under a directory that may contain the pattern.
+
+        Args:
+            directory: Directory searched (recursively)
+            pattern: Substring or regex
+            regex: Whether pattern is a regex
+
+        Returns:
+            Candidate paths in path order (a superset of the matches, to be
+            verified, including files too large to index), or None when the pattern requires no literal of 3 or
+            more bytes and every file has to be searched
+        """
+        clauses = required_literals(pattern, regex)
+        if not clauses:
+            return None
+        self.queries += 1
+        with self._lock:
+            ids: Optional[Set[int]] = None
+            for clause in clauses:
+                matched: Set[int] = set()
+                for literal in clause:
+                    matched |= self._literal_ids(literal)
+                ids = matched if ids is None else ids & matched
+                if not ids:
+                    break
+            prefix = os.path.abspath(directory).rstrip(os.sep) + os.sep
+            paths: List[str] = []
+            id_list = sorted(ids or ())
+            for offset in range(0, len(id_list), 900):
+                chunk = id_list[offset:offset + 900]
+                paths.extend(row[0] for row in self._conn.execute(
+                    f"SELECT path FROM trigram_docs WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ))
+        with self._dirty_lock:
+            paths.extend(self._dirty)
+        # Files too large to index can still match
+        oversized = self.file_index.list(directory, True, WalkFilter(min_size=self.max_file_size + 1), None, sys.maxsize)
+        paths.extend(f["path"] for f in oversized)
+        return sorted({path for path in paths if path.startswith(prefix)})
+
+    def covers(self, directory: str) -> bool:
+        directory = os.path.abspath(directory)
+        return any(directory == root or directory.startswith(root.rstrip(os.sep) + os.sep) for root in self.ready)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": self.document_count,
+            "trigrams": self.trigram_count,
+            "posting_blocks": self.posting_blocks,
+            "posting_bytes": self.posting_bytes,
+            "dead_ids": self.dead,
+            "pending": self._queue.qsize(),
+            "documents_indexed": self.documents_indexed,
+            "flushes": self.flushes,
+            "compactions": self.compactions,
+            "queries": self.queries
+        }
+
+_index: Optional[TrigramIndex] = None
+
+def configure_trigram_index(path: str, file_index: Optional[FileIndex],
+                            max_file_size: int = 4 * 1024 * 1024) -> Optional[TrigramIndex]:
+    """
+    Create the process-wide trigram index over the file index's roots.
+
+    Args:
+        path: SQLite database file for documents and postings
+        file_index: The file index it follows; without one there is nothing to index
+        max_file_size: Larger files are left out (and always searched directly)
+    """
+    global _index
+    if file_index is None:
+        logger.warning("Content index enabled but no file index roots are configured; it stays off")
+        _index = None
+    else:
+        _index = TrigramIndex(path, file_index, max_file_size)
+    return _index
+
+def get_trigram_index() -> Optional[TrigramIndex]:
+    return _index
@@ -0,0 +1,192 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Set
+
+logger = logging.getLogger("worker-pool")
+
+class QueueFullError(Exception):
+    """Raised when the pool is at its maximum queue length"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class WorkItem:
+    """A queued unit of work; higher priority values run first"""
+
+    def __init__(self, task_id: str, target: str, payload: Dict[str, Any], priority: int = 0):
+        self.task_id = task_id
+        self.target = target
+        self.payload = payload
+        self.priority = priority
+        self.enqueued_at = time.time()
+        self.future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+
+class WorkerPool:
+    """
+    Per-target priority queues drained by a fixed number of workers each.
+
+    Each target gets its own queue and worker count, so a single-threaded
+    backend (e.g. one Outlook COM worker) never blocks file workers. The
+    total number of queued items is capped; submissions beyond it are
+    rejected with a Retry-After estimate instead of piling up. Queued and
+    running items can be cancelled by task ID.
+    """
+
+    def __init__(self, run: Callable[[WorkItem], Awaitable[Any]],
+                 on_cancelled: Optional[Callable[[WorkItem], None]] = None,
+                 target_workers: Optional[Dict[str, int]] = None, default_workers: int = 4,
+                 max_queue_length: int = 1000):
+        self._run = run
+        self._on_cancelled = on_cancelled
+        self._target_workers = target_workers or {}
+        self._default_workers = default_workers
+        self.max_queue_length = max_queue_length
+
+        self._queues: Dict[str, asyncio.PriorityQueue] = {}
+        self._workers: Dict[str, List[asyncio.Task]] = {}
+        self._queued: Dict[str, WorkItem] = {}
+        self._active: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+        self._counter = itertools.count()
+        # Moving average of run time per target, used for Retry-After
+        self._average_runtime: Dict[str, float] = {}
+        self.completed = 0
+        self.rejected = 0
+
+    def workers_for(self, target: str) -> int:
+        return max(1, self._target_workers.get(target, self._default_workers))
+
+    def _queue(self, target: str) -> asyncio.PriorityQueue:
+        queue = self._queues.get(target)
+        if queue is None:
+            queue = asyncio.PriorityQueue()
+            self._queues[target] = queue
+            self._workers[target] = [
+                asyncio.create_task(self._worker(target, queue)) for _ in range(self.workers_for(target))
+            ]
+        return queue
+
+    def retry_after(self, target: str) -> int:
+        """Seconds until a slot is likely to free up for the target"""
+        runtime = self._average_runtime.get(target, 1.0)
+        depth = sum(1 for item in self._queued.values() if item.target == target)
+        return max(1, math.ceil(runtime * (depth + 1) / self.workers_for(target)))
+
+    def submit(self, task_id: str, target: str, payload: Dict[str, Any], priority: int = 0) -> "asyncio.Future[None]":
+        """
+        Queue work for a target.
+
+        Args:
+            task_id: The task identifier, used for cancellation
+            target: The automation target whose workers should run it
+            payload: Data passed through to the run callback
+            priority: Higher values are dequeued first
+
+        Returns:
+            A future resolved when the item has finished, failed or been cancelled
+
+        Raises:
+            QueueFullError: If the pool is at its maximum queue length
+        """
+        if len(self._queued) >= self.max_queue_length:
+            self.rejected += 1
+            raise QueueFullError(
+                f"Automation queue is full ({self.max_queue_length} tasks waiting)",
+                self.retry_after(target)
+            )
+
+        item = WorkItem(task_id, target, payload, priority)
+        self._queued[task_id] = item
+        self._queue(target).put_nowait((-priority, next(self._counter), item))
+        return item.future
+
+    def cancel(self, task_id: str) -> Optional[str]:
+        """
+        Cancel a queued or running item.
+
+        Returns:
+            "queued" or "running" for the state the item was cancelled in, or None if unknown
+        """
+        item = self._queued.pop(task_id, None)
+        if item is not None:
+            # Left in the heap and skipped when a worker reaches it
+            self._cancelled.add(task_id)
+            if self._on_cancelled is not None:
+                self._on_cancelled(item)
+            if not item.future.done():
+                item.future.set_result(None)
+            return "queued"
+
+        task = self._active.get(task_id)
+        if task is not None:
+            task.cancel()
+            return "running"
+
+        return None
+
+    async def _worker(self, target: str, queue: asyncio.PriorityQueue) -> None:
+        while True:
+            _, _, item = await queue.get()
+            try:
+                if item.task_id in self._cancelled:
+                    self._cancelled.discard(item.task_id)
+                    continue
+                self._queued.pop(item.task_id, None)
+
+                started = time.time()
+                job = asyncio.create_task(self._run(item))
+                self._active[item.task_id] = job
+                # asyncio.wait never raises for the job, so only cancelling this worker propagates
+                await asyncio.wait({job})
+                self._active.pop(item.task_id, None)
+
+                runtime = time.time() - started
+                previous = self._average_runtime.get(target)
+                self._average_runtime[target] = runtime if previous is None else 0.8 * previous + 0.2 * runtime
+                self.completed += 1
+
+                if job.cancelled():
+                    if self._on_cancelled is not None:
+                        self._on_cancelled(item)
+                elif job.exception() is not None:
+                    logger.error(f"Unhandled error in task {item.task_id}: {job.exception()}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker for {target} failed on {item.task_id}: {str(e)}", exc_info=True)
+            finally:
+                if not item.future.done():
+                    item.future.set_result(None)
+                queue.task_done()
+
+    async def stop(self) -> None:
+        for workers in self._workers.values():
+            for worker in workers:
+                worker.cancel()
+        for job in list(self._active.values()):
+            job.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        queued_by_target: Dict[str, int] = {}
+        for item in self._queued.values():
+            queued_by_target[item.target] = queued_by_target.get(item.target, 0) + 1
+
+        return {
+            "queued": len(self._queued),
+            "running": len(self._active),
+            "max_queue_length": self.max_queue_length,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "targets": {
+                target: {
+                    "workers": len(workers),
+                    "queued": queued_by_target.get(target, 0),
+                    "average_runtime": round(self._average_runtime.get(target, 0.0), 4)
+                }
+                for target, workers in self._workers.items()
+            }
+        }
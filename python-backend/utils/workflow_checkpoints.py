@@ -0,0 +1,101 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List
+
+from utils.serialization import dumps, loads
+
+logger = logging.getLogger("workflow-checkpoints")
+
+class CheckpointLog:
+    """
+    Durable per-step results of running workflows.
+
+    Each finished step is written as its own row the moment it completes,
+    so a workflow interrupted by a crash or restart can be resumed from the
+    steps it already finished instead of being rerun from the start.
+    Checkpoints are tied to the plan hash they were written under and are
+    ignored if the workflow definition changes.
+    """
+
+    def __init__(self, path: str, table: str = "workflow_checkpoints"):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                workflow_id TEXT NOT NULL,
+                step_id TEXT NOT NULL,
+                plan_hash TEXT NOT NULL,
+                success INTEGER NOT NULL,
+                entry TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (workflow_id, step_id)
+            )
+        """)
+        self.writes = 0
+
+    def record(self, workflow_id: str, plan_hash: str, step_id: str, entry: Dict[str, Any]) -> None:
+        """
+        Store a finished step's result entry, replacing any earlier attempt.
+
+        Args:
+            workflow_id: The workflow's task ID
+            plan_hash: Hash of the plan the step ran under
+            step_id: The step ID
+            entry: The step's result entry (success, result or error)
+        """
+        with self._lock:
+            self._conn.execute(
+                f"""
+                INSERT OR REPLACE INTO {self.table} (workflow_id, step_id, plan_hash, success, entry, recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (workflow_id, step_id, plan_hash, int(bool(entry.get("success"))), dumps(entry).decode("utf-8"), time.time())
+            )
+            self.writes += 1
+
+    def completed(self, workflow_id: str, plan_hash: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Successful step entries of a workflow, by step ID.
+
+        Args:
+            workflow_id: The workflow's task ID
+            plan_hash: Only checkpoints written under this plan are returned
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT step_id, entry FROM {self.table} WHERE workflow_id = ? AND plan_hash = ? AND success = 1",
+                (workflow_id, plan_hash)
+            ).fetchall()
+        return {step_id: loads(entry) for step_id, entry in rows}
+
+    def clear(self, workflow_id: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE workflow_id = ?", (workflow_id,))
+        return cursor.rowcount
+
+    def purge(self, before: float) -> List[str]:
+        """Drop checkpoints of workflows not updated since the given epoch time"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT workflow_id FROM {self.table} GROUP BY workflow_id HAVING MAX(recorded_at) < ?",
+                (before,)
+            ).fetchall()
+            for (workflow_id,) in rows:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE workflow_id = ?", (workflow_id,))
+        if rows:
+            logger.info(f"Purged checkpoints of {len(rows)} workflows")
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            workflows, steps = self._conn.execute(
+                f"SELECT COUNT(DISTINCT workflow_id), COUNT(*) FROM {self.table}"
+            ).fetchone()
+        return {"workflows": workflows, "steps": steps, "writes": self.writes}
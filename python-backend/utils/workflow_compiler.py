@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Set, Tuple, Type, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
+
+from utils.action_registry import ActionRegistry, ActionHandler
+from utils.workflow_engine import TEMPLATE_PATTERN, referenced_steps
+
+logger = logging.getLogger("workflow-compiler")
+
+# Parameter types reported by the action registry -> python types for validation
+_PARAMETER_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "array": list,
+    "object": dict
+}
+
+class WorkflowValidationError(ValueError):
+    """Raised when a workflow definition cannot be compiled into a plan"""
+
+@dataclass(frozen=True, eq=False)
+class PlanStep:
+    index: int
+    id: str
+    name: str
+    target: str
+    action: str
+    handler: ActionHandler
+    # Treated as read-only: templates are resolved into a new dict per run
+    parameters: Dict[str, Any]
+    depends_on: Tuple[str, ...]
+    dependents: Tuple[str, ...]
+    continue_on_error: bool
+    pass_result_to_next: bool
+    # On resume, reuse the checkpointed result instead of running the step again
+    replay: bool
+    has_templates: bool
+
+@dataclass(frozen=True, eq=False)
+class WorkflowPlan:
+    """Immutable, validated execution plan for a workflow definition"""
+    plan_hash: str
+    name: str
+    steps: Tuple[PlanStep, ...]
+    # Step ids in a valid execution order
+    order: Tuple[str, ...]
+    max_concurrency: int
+
+    @property
+    def total_steps(self) -> int:
+        return len(self.steps)
+
+def workflow_hash(workflow: Dict[str, Any]) -> str:
+    """Content hash of a workflow definition, independent of key order"""
+    canonical = json.dumps(workflow, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _is_template(value: Any) -> bool:
+    return isinstance(value, str) and "{{" in value and TEMPLATE_PATTERN.search(value) is not None
+
+class WorkflowCompiler:
+    """
+    Validates workflow definitions and compiles them into WorkflowPlans.
+
+    Targets and actions are resolved against the action registry once, step
+    parameters are validated with a pydantic model built from each action's
+    parameter description, and the dependency graph is checked and ordered.
+    Plans (and validation failures) are cached by content hash, so a
+    resubmitted definition skips all of this.
+    """
+
+    def __init__(self, registry: ActionRegistry, default_concurrency: int = 4, cache_size: int = 256):
+        self.registry = registry
+        self.default_concurrency = default_concurrency
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Union[WorkflowPlan, WorkflowValidationError]]" = OrderedDict()
+        self._models: Dict[Tuple[str, str], Type[BaseModel]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached_plans": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def compile(self, workflow: Dict[str, Any]) -> WorkflowPlan:
+        """
+        Return the execution plan for a workflow, compiling it on first sight.
+
+        Args:
+            workflow: The workflow definition ({"name": ..., "steps": [...]})
+
+        Returns:
+            The cached or newly compiled plan
+
+        Raises:
+            WorkflowValidationError: If the workflow is invalid
+        """
+        plan_hash = workflow_hash(workflow)
+        cached = self._cache.get(plan_hash)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(plan_hash)
+            if isinstance(cached, WorkflowValidationError):
+                raise cached
+            return cached
+
+        self.misses += 1
+        try:
+            compiled: Union[WorkflowPlan, WorkflowValidationError] = self._compile(plan_hash, workflow)
+        except WorkflowValidationError as e:
+            compiled = e
+
+        self._cache[plan_hash] = compiled
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        if isinstance(compiled, WorkflowValidationError):
+            raise compiled
+        return compiled
+
+    def _parameter_model(self, target: str, action: str) -> Type[BaseModel]:
+        key = (target, action)
+        model = self._models.get(key)
+        if model is None:
+            fields: Dict[str, Any] = {}
+            for name, spec in self.registry.describe(target, action)["parameters"].items():
+                python_type = _PARAMETER_TYPES.get(spec["type"])
+                # Defaults are checked for presence below; the model only checks types
+                fields[name] = (Optional[python_type] if python_type else Any, None)
+            model = create_model(
+                f"{target}_{action}_parameters",
+                __config__=ConfigDict(extra="allow"),
+                **fields
+            )
+            self._models[key] = model
+        return model
+
+    def _validate_parameters(self, step_label: str, target: str, action: str, parameters: Dict[str, Any]) -> None:
+        description = self.registry.describe(target, action)
+        for name, spec in description["parameters"].items():
+            if spec["required"] and parameters.get(name) in (None, "", [], {}):
+                raise WorkflowValidationError(f"{step_label} is missing required parameter: {name}")
+
+        # Template values are only known at run time; validate everything else now
+        literal = {key: value for key, value in parameters.items() if not _is_template(value)}
+        try:
+            self._parameter_model(target, action).model_validate(literal)
+        except ValidationError as e:
+            problems = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            raise WorkflowValidationError(f"{step_label} has invalid parameters: {problems}")
+
+    def _compile(self, plan_hash: str, workflow: Dict[str, Any]) -> WorkflowPlan:
+        steps = workflow.get("steps") or []
+        if not isinstance(steps, list) or not steps:
+            raise WorkflowValidationError("Workflow must contain at least one step")
+
+        # If any step declares depends_on the workflow is a DAG; otherwise steps run in order
+        dag_mode = any(isinstance(step, dict) and "depends_on" in step for step in steps)
+        raw_steps: List[Dict[str, Any]] = []
+        seen: Set[str] = set()
+
+        for index, step in enumerate(steps, start=1):
+            if not isinstance(step, dict):
+                raise WorkflowValidationError(f"Step {index} must be an object")
+            if not step.get("target") or not step.get("action"):
+                raise WorkflowValidationError(f"Step {index} must include target and action")
+
+            step_id = str(step.get("id") or f"step{index}")
+            if step_id in seen:
+                raise WorkflowValidationError(f"Duplicate step id: {step_id}")
+            seen.add(step_id)
+            step_label = f"Step {step_id}"
+
+            target = str(step["target"]).lower()
+            action = str(step["action"]).lower()
+            try:
+                handler = self.registry.resolve(target, action)
+            except ValueError as e:
+                raise WorkflowValidationError(f"{step_label}: {str(e)}")
+
+            parameters = step.get("parameters") or {}
+            if not isinstance(parameters, dict):
+                raise WorkflowValidationError(f"{step_label} parameters must be an object")
+            self._validate_parameters(step_label, target, action, parameters)
+
+            if dag_mode:
+                depends_on = step.get("depends_on") or []
+                if isinstance(depends_on, str):
+                    depends_on = [depends_on]
+            else:
+                depends_on = [raw_steps[-1]["id"]] if raw_steps else []
+
+            references = referenced_steps(parameters)
+            raw_steps.append({
+                "index": index,
+                "id": step_id,
+                "name": step.get("name", f"Step {index}"),
+                "target": target,
+                "action": action,
+                "handler": handler,
+                "parameters": parameters,
+                # Referencing another step's output also makes it a dependency
+                "depends_on": tuple(dict.fromkeys([str(dep) for dep in depends_on] + sorted(references))),
+                "continue_on_error": bool(step.get("continue_on_error", False)),
+                "pass_result_to_next": bool(step.get("pass_result_to_next", False)),
+                "replay": bool(step.get("replay", True)),
+                "has_templates": bool(references) or any(_is_template(value) for value in parameters.values())
+            })
+
+        dependents: Dict[str, List[str]] = {step["id"]: [] for step in raw_steps}
+        for step in raw_steps:
+            for dependency in step["depends_on"]:
+                if dependency not in seen:
+                    raise WorkflowValidationError(f"Step {step['id']} depends on unknown step: {dependency}")
+                if dependency == step["id"]:
+                    raise WorkflowValidationError(f"Step {step['id']} depends on itself")
+                dependents[dependency].append(step["id"])
+
+        order = _topological_order(raw_steps, dependents)
+
+        try:
+            max_concurrency = int(workflow.get("max_concurrency", self.default_concurrency))
+        except (TypeError, ValueError):
+            raise WorkflowValidationError("max_concurrency must be an integer")
+
+        return WorkflowPlan(
+            plan_hash=plan_hash,
+            name=workflow.get("name", "Unnamed Workflow"),
+            steps=tuple(
+                PlanStep(dependents=tuple(dependents[step["id"]]), **step) for step in raw_steps
+            ),
+            order=order,
+            max_concurrency=max(1, max_concurrency)
+        )
+
+def _topological_order(steps: List[Dict[str, Any]], dependents: Dict[str, List[str]]) -> Tuple[str, ...]:
+    remaining = {step["id"]: len(step["depends_on"]) for step in steps}
+    ready = deque(step["id"] for step in steps if not step["depends_on"])
+    order: List[str] = []
+
+    while ready:
+        step_id = ready.popleft()
+        order.append(step_id)
+        for dependent in dependents[step_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+
+    if len(order) != len(steps):
+        cyclic = sorted(step_id for step_id, count in remaining.items() if count > 0)
+        raise WorkflowValidationError(f"Workflow has a dependency cycle between steps: {', '.join(cyclic)}")
+    return tuple(order)
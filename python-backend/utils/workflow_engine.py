@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import re
+from typing import Dict, Any, Optional, Callable, Awaitable, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from utils.workflow_compiler import PlanStep, WorkflowPlan
+
+logger = logging.getLogger("workflow-engine")
+
+# {{steps.<id>.result.<path>}} references to earlier step outputs
+TEMPLATE_PATTERN = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+
+# Runs one plan step with its resolved parameters
+StepExecutor = Callable[["PlanStep", Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+def lookup_path(context: Dict[str, Any], path: str) -> Any:
+    """Follow a dotted path such as steps.ocr1.result.text through dicts and lists"""
+    value: Any = context
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.lstrip("-").isdigit() and -len(value) <= int(part) < len(value):
+            value = value[int(part)]
+        else:
+            raise ValueError(f"Unresolved workflow reference: {{{{{path}}}}}")
+    return value
+
+def resolve_templates(value: Any, context: Dict[str, Any]) -> Any:
+    """
+    Substitute {{...}} references in step parameters.
+
+    A string that is exactly one reference is replaced by the referenced
+    value itself (keeping lists and dicts intact); references embedded in
+    longer strings are interpolated as text.
+
+    Args:
+        value: A parameter value, searched recursively
+        context: The values references resolve against, e.g. {"steps": {...}}
+
+    Returns:
+        The value with every reference substituted
+    """
+    if isinstance(value, str):
+        if "{{" not in value:
+            return value
+        match = TEMPLATE_PATTERN.fullmatch(value)
+        if match:
+            return lookup_path(context, match.group(1))
+
+        def interpolate(inner: re.Match) -> str:
+            resolved = lookup_path(context, inner.group(1))
+            return json.dumps(resolved, default=str) if isinstance(resolved, (dict, list)) else str(resolved)
+
+        return TEMPLATE_PATTERN.sub(interpolate, value)
+
+    if isinstance(value, dict):
+        return {key: resolve_templates(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_templates(item, context) for item in value]
+    return value
+
+def referenced_steps(value: Any) -> Set[str]:
+    """Collect the step IDs named by {{steps.<id>...}} references"""
+    found: Set[str] = set()
+    if isinstance(value, str):
+        for match in TEMPLATE_PATTERN.finditer(value):
+            parts = match.group(1).split(".")
+            if len(parts) > 1 and parts[0] == "steps":
+                found.add(parts[1])
+    elif isinstance(value, dict):
+        for item in value.values():
+            found |= referenced_steps(item)
+    elif isinstance(value, list):
+        for item in value:
+            found |= referenced_steps(item)
+    return found
+
+async def run_workflow(plan: "WorkflowPlan", execute_step: StepExecutor,
+                       on_step_start: Optional[Callable[["PlanStep"], None]] = None,
+                       on_step_end: Optional[Callable[["PlanStep", Dict[str, Any]], None]] = None,
+                       replay: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Execute a compiled workflow plan, running independent branches concurrently.
+
+    A step starts as soon as all of its dependencies have finished, subject
+    to the plan's max_concurrency, so the workflow takes as long as its
+    slowest branch rather than the sum of every step. A failed step stops
+    new steps from starting unless it allows continue_on_error; steps that
+    never ran are reported as skipped. Steps with an entry in replay (from
+    the checkpoints of an interrupted run) are not executed again; their
+    stored result is used as if they had just finished.
+
+    Args:
+        plan: The compiled workflow plan
+        execute_step: Coroutine running a plan step with its resolved parameters
+        on_step_start: Called with a step just before it runs
+        on_step_end: Called with a step and its result entry when it finishes
+        replay: Successful result entries of steps that already ran, by step ID
+
+    Returns:
+        A dict with per-step results in workflow order and completion counts
+    """
+    by_id = {step.id: step for step in plan.steps}
+    remaining = {step.id: len(step.depends_on) for step in plan.steps}
+
+    context: Dict[str, Any] = {"steps": {}}
+    results: Dict[str, Dict[str, Any]] = {}
+    semaphore = asyncio.Semaphore(plan.max_concurrency)
+    running: Dict[asyncio.Task, "PlanStep"] = {}
+    ready = [step for step in plan.steps if not step.depends_on]
+    stopped = False
+    replay = replay or {}
+
+    async def run_step(step: "PlanStep") -> Dict[str, Any]:
+        async with semaphore:
+            if on_step_start is not None:
+                on_step_start(step)
+
+            parameters = resolve_templates(step.parameters, context) if step.has_templates else dict(step.parameters)
+            for dependency in step.depends_on:
+                if by_id[dependency].pass_result_to_next and dependency in context["steps"]:
+                    parameters["previous_result"] = context["steps"][dependency].get("result")
+
+            return await execute_step(step, parameters)
+
+    def finish(step: "PlanStep", entry: Dict[str, Any]) -> None:
+        results[step.id] = entry
+        if on_step_end is not None:
+            on_step_end(step, entry)
+
+        for dependent in step.dependents:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(by_id[dependent])
+
+    try:
+        while ready or running:
+            while ready and not stopped:
+                step = ready.pop(0)
+                checkpoint = replay.get(step.id)
+                if checkpoint is not None:
+                    # Finished before the interruption: reuse the stored output
+                    result = checkpoint.get("result")
+                    context["steps"][step.id] = {"success": True, "result": result}
+                    finish(step, {"step": step.index, "id": step.id, "name": step.name,
+                                  "success": True, "result": result, "replayed": True})
+                else:
+                    running[asyncio.create_task(run_step(step))] = step
+            ready = []
+
+            if not running:
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step = running.pop(task)
+                entry = {"step": step.index, "id": step.id, "name": step.name}
+                try:
+                    result = task.result()
+                    entry.update(success=True, result=result)
+                    context["steps"][step.id] = {"success": True, "result": result}
+                except Exception as e:
+                    logger.error(f"Error in workflow step {step.id}: {str(e)}", exc_info=True)
+                    entry.update(success=False, error=str(e))
+                    context["steps"][step.id] = {"success": False, "error": str(e)}
+                    if not step.continue_on_error:
+                        stopped = True
+
+                finish(step, entry)
+    finally:
+        for task in running:
+            task.cancel()
+
+    ordered = []
+    for step in plan.steps:
+        ordered.append(results.get(step.id) or {
+            "step": step.index,
+            "id": step.id,
+            "name": step.name,
+            "success": False,
+            "skipped": True
+        })
+
+    return {
+        "results": ordered,
+        "steps_completed": sum(1 for entry in ordered if entry["success"]),
+        "steps_replayed": sum(1 for entry in ordered if entry.get("replayed")),
+        "total_steps": plan.total_steps,
+        "stopped": stopped
+    }